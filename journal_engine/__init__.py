@@ -1 +1,7 @@
 # This file makes journal_engine a package
+import pandas as pd
+
+# The engine relies on pandas copy-on-write: a function that needs a private frame
+# takes ``frame.copy(deep=False)`` (or a filtered selection) and only the columns it
+# writes are materialized. Callers' frames are never mutated through shared blocks.
+pd.set_option("mode.copy_on_write", True)
@@ -1,26 +1,53 @@
+import concurrent.futures
+import gzip
+import json
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..config import (
     API_HEADERS,
     API_KEY,
+    SNAPSHOT_UPLOAD_ENCODING,
     WORKER_API_URL_PORTFOLIO,
     WORKER_API_URL_RECORDS,
 )
 from ..models import PortfolioSnapshot
+from ..run_metrics import RUN_METRICS
+from .record_columns import RecordColumns
 
 
 REQUEST_TIMEOUT: Tuple[float, float] = (5.0, 30.0)
 RECORD_PAGE_LIMIT = 1_000
 MAX_RECORD_PAGES = 2_000
 MAX_RECORD_COUNT = 1_000_000
+# Record ids are D1 INTEGER primary keys; the pager keeps them in an int64 buffer.
+MAX_RECORD_ID = 2**63 - 1
 JOB_BENCHMARK_RE = re.compile(r"^[A-Z0-9.^=\-]{1,24}$")
 VERIFIED_JOB_CONTEXT_ENV = "CALCULATION_JOB_CONTEXT_VERIFIED"
 
+# One pooled keep-alive session per client. The pool is sized for the runner's
+# bounded per-user prefetch concurrency rather than for the record pager alone.
+SESSION_POOL_CONNECTIONS = 4
+SESSION_POOL_MAXSIZE = 16
+# Only idempotent reads are retried. Worker writes (snapshot upload, record
+# delete) are never replayed after a request may have reached the Worker, so a
+# lost response still surfaces as a failure instead of a silent duplicate write.
+READ_RETRY_TOTAL = 3
+READ_RETRY_BACKOFF_SECONDS = 0.5
+READ_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_METHODS = frozenset({"GET"})
+SNAPSHOT_UPLOAD_ENCODINGS = ("identity", "gzip", "deflate")
+SNAPSHOT_COMPRESSION_LEVEL = 6
+
 
 class CloudflareAPIError(RuntimeError):
     """Raised when the Worker API cannot provide a verified result."""
@@ -52,10 +79,136 @@ def _verified_job_benchmark_for_user(user_email: str) -> Optional[str]:
     return benchmark
 
 
+def encode_snapshot_payload(payload: Dict[str, Any], encoding: str) -> bytes:
+    """Serialize an upload payload as strict JSON and apply a body encoding."""
+    if encoding not in SNAPSHOT_UPLOAD_ENCODINGS:
+        raise ValueError(f"unsupported snapshot upload encoding: {encoding}")
+    body = json.dumps(
+        payload,
+        allow_nan=False,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=SNAPSHOT_COMPRESSION_LEVEL, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(body, SNAPSHOT_COMPRESSION_LEVEL)
+    return body
+
+
+def build_worker_session() -> requests.Session:
+    """Return a pooled keep-alive session with a GET-only retry policy."""
+    retry = Retry(
+        total=READ_RETRY_TOTAL,
+        connect=READ_RETRY_TOTAL,
+        read=READ_RETRY_TOTAL,
+        status=READ_RETRY_TOTAL,
+        other=0,
+        backoff_factor=READ_RETRY_BACKOFF_SECONDS,
+        status_forcelist=READ_RETRY_STATUS_CODES,
+        allowed_methods=RETRYABLE_METHODS,
+        respect_retry_after_header=True,
+        # Return the final response so callers keep their explicit status checks
+        # and status-bearing error messages.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=SESSION_POOL_CONNECTIONS,
+        pool_maxsize=SESSION_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class CloudflareClient:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        upload_encoding: str = SNAPSHOT_UPLOAD_ENCODING,
+    ) -> None:
         self.logger = logging.getLogger(__name__)
         self.api_base_url = WORKER_API_URL_RECORDS.rsplit("/api/", 1)[0]
+        self.session = session if session is not None else build_worker_session()
+        if upload_encoding not in SNAPSHOT_UPLOAD_ENCODINGS:
+            raise ValueError(f"unsupported snapshot upload encoding: {upload_encoding}")
+        self.upload_encoding = upload_encoding
+        self._latency_lock = threading.Lock()
+        self._endpoint_latency: Dict[str, Dict[str, float]] = {}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request(self, method: str, endpoint: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send one Worker request through the pooled session and record its latency."""
+        body = kwargs.get("data")
+        request_bytes = len(body) if isinstance(body, (bytes, bytearray)) else 0
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code != 200
+            return response
+        finally:
+            self._record_latency(
+                endpoint,
+                time.perf_counter() - started,
+                failed,
+                request_bytes,
+            )
+
+    def _record_latency(
+        self,
+        endpoint: str,
+        elapsed: float,
+        failed: bool,
+        request_bytes: int = 0,
+    ) -> None:
+        with self._latency_lock:
+            stats = self._endpoint_latency.setdefault(
+                endpoint,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "request_bytes": 0,
+                },
+            )
+            stats["calls"] += 1
+            if failed:
+                stats["errors"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            stats["request_bytes"] += request_bytes
+        RUN_METRICS.inc("worker_requests_total", endpoint=endpoint)
+        RUN_METRICS.inc("worker_request_errors_total", float(failed), endpoint=endpoint)
+        RUN_METRICS.inc("worker_request_seconds_sum", elapsed, endpoint=endpoint)
+        RUN_METRICS.set_max("worker_request_seconds_max", elapsed, endpoint=endpoint)
+        RUN_METRICS.inc("worker_request_bytes_total", request_bytes, endpoint=endpoint)
+
+    def endpoint_latency(self) -> Dict[str, Dict[str, float]]:
+        """Return a copy of per-endpoint call, error and latency counters."""
+        with self._latency_lock:
+            return {
+                endpoint: dict(stats)
+                for endpoint, stats in sorted(self._endpoint_latency.items())
+            }
+
+    def log_endpoint_latency(self) -> None:
+        for endpoint, stats in self.endpoint_latency().items():
+            calls = int(stats["calls"])
+            self.logger.info(
+                "Worker API latency [endpoint=%s,calls=%s,errors=%s,avg_ms=%.1f,max_ms=%.1f,request_bytes=%s]",
+                endpoint,
+                calls,
+                int(stats["errors"]),
+                stats["total_seconds"] / calls * 1000.0 if calls else 0.0,
+                stats["max_seconds"] * 1000.0,
+                int(stats["request_bytes"]),
+            )
 
     @staticmethod
     def _headers(target_user_id: Optional[str] = None) -> Dict[str, str]:
@@ -76,23 +229,161 @@ class CloudflareClient:
             raise CloudflareAPIError(f"{operation} returned a non-object JSON payload")
         return payload
 
-    def fetch_records(self, target_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Fetch every records page and fail closed on inconsistent pagination."""
+    @staticmethod
+    def _accumulate_record_page(
+        columns: RecordColumns,
+        page_records: List[Any],
+        seen_record_ids: Set[int],
+    ) -> None:
+        """Validate one page's records and append them to ``columns`` (pager worker)."""
+        for record in page_records:
+            if not isinstance(record, dict):
+                raise CloudflareAPIError("交易紀錄 API 包含非物件紀錄")
+            record_id = record.get("id")
+            if (
+                not isinstance(record_id, int)
+                or isinstance(record_id, bool)
+                or record_id <= 0
+                or record_id > MAX_RECORD_ID
+            ):
+                raise CloudflareAPIError("交易紀錄 API 包含無效 record id")
+            if record_id in seen_record_ids:
+                raise CloudflareAPIError("交易紀錄 API 跨頁回傳重複紀錄")
+            seen_record_ids.add(record_id)
+        columns.append_page(page_records)
+
+    def fetch_records(
+        self,
+        target_user_id: Optional[str] = None,
+    ) -> Union[RecordColumns, List[Dict[str, Any]]]:
+        """Fetch every records page and fail closed on inconsistent pagination.
+
+        Each page's cursor envelope is checked on this thread so the next request
+        can be sent at once; record validation and column accumulation of the
+        page run on a single pager worker while that request is in flight. A
+        page's record errors are raised before the next page's envelope is
+        trusted, so failures surface in page order. The legacy single-page format
+        is returned as the decoded list.
+        """
         self.logger.info("正在連線至交易紀錄 API")
-        records: List[Dict[str, Any]] = []
+        columns = RecordColumns()
+        record_count = 0
         cursor: Optional[str] = None
         seen_cursors = set()
-        seen_record_ids = set()
+        seen_record_ids: Set[int] = set()
+        pending: Optional[concurrent.futures.Future] = None
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="records-page",
+        ) as executor:
+            for page_number in range(1, MAX_RECORD_PAGES + 1):
+                params: Dict[str, Any] = {"limit": RECORD_PAGE_LIMIT}
+                if cursor:
+                    params["cursor"] = cursor
+                try:
+                    response = self._request(
+                        "GET",
+                        "records",
+                        WORKER_API_URL_RECORDS,
+                        headers=self._headers(target_user_id),
+                        params=params,
+                        timeout=REQUEST_TIMEOUT,
+                    )
+                except requests.RequestException as exc:
+                    raise CloudflareAPIError("交易紀錄 API 連線失敗") from exc
+                finally:
+                    if pending is not None:
+                        pending.result()
+                        pending = None
+
+                if response.status_code != 200:
+                    raise CloudflareAPIError(
+                        f"交易紀錄 API 回應失敗 [status={response.status_code}]"
+                    )
+
+                payload = self._decode_json(response, "交易紀錄 API")
+                if payload.get("success") is not True:
+                    raise CloudflareAPIError("交易紀錄 API 未回傳 success=true")
+
+                page_records = payload.get("data")
+                page = payload.get("page")
+                if not isinstance(page_records, list):
+                    raise CloudflareAPIError("交易紀錄 API 的 data 欄位不是陣列")
+                if page is None and page_number == 1 and cursor is None:
+                    if len(page_records) >= RECORD_PAGE_LIMIT:
+                        raise CloudflareAPIError("舊版交易紀錄 API 可能已截斷資料")
+                    self.logger.warning("交易紀錄 API 使用舊版單頁格式")
+                    self.logger.info("成功取得 %s 筆交易紀錄", len(page_records))
+                    return page_records
+                if not isinstance(page, dict):
+                    raise CloudflareAPIError("交易紀錄 API 缺少分頁資訊")
+
+                count = page.get("count")
+                limit = page.get("limit")
+                has_more = page.get("has_more")
+                next_cursor = page.get("next_cursor")
+                if not isinstance(count, int) or count != len(page_records):
+                    raise CloudflareAPIError("交易紀錄 API 分頁筆數不一致")
+                if not isinstance(limit, int) or limit < 1 or limit > RECORD_PAGE_LIMIT:
+                    raise CloudflareAPIError("交易紀錄 API 分頁上限無效")
+                if not isinstance(has_more, bool):
+                    raise CloudflareAPIError("交易紀錄 API has_more 無效")
+                if has_more:
+                    if not isinstance(next_cursor, str) or not next_cursor:
+                        raise CloudflareAPIError("交易紀錄 API 缺少 next_cursor")
+                    if next_cursor in seen_cursors:
+                        raise CloudflareAPIError("交易紀錄 API 發生 cursor 循環")
+                    seen_cursors.add(next_cursor)
+                elif next_cursor is not None:
+                    raise CloudflareAPIError("交易紀錄 API 結束頁仍回傳 cursor")
+
+                record_count += len(page_records)
+                if record_count > MAX_RECORD_COUNT:
+                    raise CloudflareAPIError("交易紀錄 API 回傳筆數超過安全上限")
+                pending = executor.submit(
+                    self._accumulate_record_page,
+                    columns,
+                    page_records,
+                    seen_record_ids,
+                )
+                self.logger.info(
+                    "交易紀錄 API 第 %s 頁完成：本頁 %s 筆，累計 %s 筆",
+                    page_number,
+                    len(page_records),
+                    record_count,
+                )
+                if not has_more:
+                    pending.result()
+                    self.logger.info("成功取得 %s 筆交易紀錄", record_count)
+                    return columns
+                cursor = next_cursor
+
+        raise CloudflareAPIError("交易紀錄 API 分頁數超過安全上限")
 
-        for page_number in range(1, MAX_RECORD_PAGES + 1):
-            params: Dict[str, Any] = {"limit": RECORD_PAGE_LIMIT}
-            if cursor:
-                params["cursor"] = cursor
+    def fetch_record_changes(
+        self,
+        after_change: int,
+        target_user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch record changes with ``change_seq > after_change`` in sequence order.
+
+        Each change is ``{"change_seq", "id", "record"}``; ``record`` is the current
+        row for inserts and edits and ``None`` for deletes (incremental mirror sync).
+        """
+        if not isinstance(after_change, int) or isinstance(after_change, bool) or after_change < 0:
+            raise ValueError("after_change must be a non-negative integer")
+        changes: List[Dict[str, Any]] = []
+        position = after_change
+
+        for _ in range(MAX_RECORD_PAGES):
             try:
-                response = requests.get(
+                response = self._request(
+                    "GET",
+                    "records",
                     WORKER_API_URL_RECORDS,
                     headers=self._headers(target_user_id),
-                    params=params,
+                    params={"limit": RECORD_PAGE_LIMIT, "after_change": position},
                     timeout=REQUEST_TIMEOUT,
                 )
             except requests.RequestException as exc:
@@ -102,66 +393,55 @@ class CloudflareClient:
                 raise CloudflareAPIError(
                     f"交易紀錄 API 回應失敗 [status={response.status_code}]"
                 )
-
             payload = self._decode_json(response, "交易紀錄 API")
             if payload.get("success") is not True:
                 raise CloudflareAPIError("交易紀錄 API 未回傳 success=true")
 
-            page_records = payload.get("data")
+            page_changes = payload.get("data")
             page = payload.get("page")
-            if not isinstance(page_records, list):
+            if not isinstance(page_changes, list):
                 raise CloudflareAPIError("交易紀錄 API 的 data 欄位不是陣列")
-            if page is None and page_number == 1 and cursor is None:
-                if len(page_records) >= RECORD_PAGE_LIMIT:
-                    raise CloudflareAPIError("舊版交易紀錄 API 可能已截斷資料")
-                self.logger.warning("交易紀錄 API 使用舊版單頁格式")
-                self.logger.info("成功取得 %s 筆交易紀錄", len(page_records))
-                return page_records
-            if not isinstance(page, dict):
-                raise CloudflareAPIError("交易紀錄 API 缺少分頁資訊")
-
+            if not isinstance(page, dict) or "next_after_change" not in page:
+                raise CloudflareAPIError("交易紀錄 API 不支援 after_change 變更分頁")
             count = page.get("count")
-            limit = page.get("limit")
             has_more = page.get("has_more")
-            next_cursor = page.get("next_cursor")
-            if not isinstance(count, int) or count != len(page_records):
+            next_after_change = page.get("next_after_change")
+            if not isinstance(count, int) or count != len(page_changes):
                 raise CloudflareAPIError("交易紀錄 API 分頁筆數不一致")
-            if not isinstance(limit, int) or limit < 1 or limit > RECORD_PAGE_LIMIT:
-                raise CloudflareAPIError("交易紀錄 API 分頁上限無效")
             if not isinstance(has_more, bool):
                 raise CloudflareAPIError("交易紀錄 API has_more 無效")
-            if has_more:
-                if not isinstance(next_cursor, str) or not next_cursor:
-                    raise CloudflareAPIError("交易紀錄 API 缺少 next_cursor")
-                if next_cursor in seen_cursors:
-                    raise CloudflareAPIError("交易紀錄 API 發生 cursor 循環")
-                seen_cursors.add(next_cursor)
-            elif next_cursor is not None:
-                raise CloudflareAPIError("交易紀錄 API 結束頁仍回傳 cursor")
-
-            for record in page_records:
-                if not isinstance(record, dict):
-                    raise CloudflareAPIError("交易紀錄 API 包含非物件紀錄")
-                record_id = record.get("id")
-                if not isinstance(record_id, int) or isinstance(record_id, bool) or record_id <= 0:
-                    raise CloudflareAPIError("交易紀錄 API 包含無效 record id")
-                if record_id in seen_record_ids:
-                    raise CloudflareAPIError("交易紀錄 API 跨頁回傳重複紀錄")
-                seen_record_ids.add(record_id)
 
-            records.extend(page_records)
-            if len(records) > MAX_RECORD_COUNT:
+            for change in page_changes:
+                if not isinstance(change, dict):
+                    raise CloudflareAPIError("交易紀錄 API 包含非物件變更")
+                change_seq = change.get("change_seq")
+                record_id = change.get("id")
+                record = change.get("record")
+                if not isinstance(change_seq, int) or isinstance(change_seq, bool):
+                    raise CloudflareAPIError("交易紀錄 API 包含無效 change_seq")
+                if (
+                    not isinstance(record_id, int)
+                    or isinstance(record_id, bool)
+                    or record_id > MAX_RECORD_ID
+                ):
+                    raise CloudflareAPIError("交易紀錄 API 包含無效 record id")
+                if record is not None and (not isinstance(record, dict) or record.get("id") != record_id):
+                    raise CloudflareAPIError("交易紀錄 API 變更紀錄與 id 不一致")
+                # Sequences strictly increase across the feed, which also rules out
+                # duplicates and changes at or below the requested position.
+                if change_seq <= position:
+                    raise CloudflareAPIError("交易紀錄 API 變更序號未遞增")
+                position = change_seq
+
+            changes.extend(page_changes)
+            if len(changes) > MAX_RECORD_COUNT:
                 raise CloudflareAPIError("交易紀錄 API 回傳筆數超過安全上限")
-            self.logger.info(
-                "交易紀錄 API 第 %s 頁完成：本頁 %s 筆，累計 %s 筆",
-                page_number,
-                len(page_records),
-                len(records),
-            )
             if not has_more:
-                self.logger.info("成功取得 %s 筆交易紀錄", len(records))
-                return records
-            cursor = next_cursor
+                if next_after_change is not None:
+                    raise CloudflareAPIError("交易紀錄 API 結束頁仍回傳 next_after_change")
+                return changes
+            if not page_changes or next_after_change != position:
+                raise CloudflareAPIError("交易紀錄 API next_after_change 不一致")
 
         raise CloudflareAPIError("交易紀錄 API 分頁數超過安全上限")
 
@@ -171,7 +451,9 @@ class CloudflareClient:
         if not target:
             raise CloudflareAPIError("cash-events target user is required")
         try:
-            response = requests.get(
+            response = self._request(
+                "GET",
+                "cash-events",
                 f"{self.api_base_url}/api/cash-events",
                 headers=self._headers(target),
                 timeout=REQUEST_TIMEOUT,
@@ -205,7 +487,9 @@ class CloudflareClient:
             raise CloudflareAPIError("calculation job context lookup requires a job id")
 
         try:
-            response = requests.get(
+            response = self._request(
+                "GET",
+                "calculation-job",
                 f"{self.api_base_url}/api/calculation-jobs/{job_id}",
                 headers={"X-API-KEY": API_KEY},
                 timeout=REQUEST_TIMEOUT,
@@ -244,6 +528,83 @@ class CloudflareClient:
 
         return target_user_id, benchmark
 
+    def list_queued_calculation_jobs(self) -> List[Dict[str, str]]:
+        """Return the Worker's oldest queued calculation jobs with owner and benchmark."""
+        try:
+            response = self._request(
+                "GET",
+                "calculation-jobs",
+                f"{self.api_base_url}/api/calculation-jobs",
+                headers={"X-API-KEY": API_KEY},
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            raise CloudflareAPIError("calculation job queue read failed") from exc
+
+        if response.status_code != 200:
+            raise CloudflareAPIError(
+                f"calculation job queue read failed [status={response.status_code}]"
+            )
+        payload = self._decode_json(response, "calculation job queue API")
+        if payload.get("success") is not True or not isinstance(payload.get("jobs"), list):
+            raise CloudflareAPIError("calculation job queue API did not return success=true")
+
+        jobs = []
+        for job in payload["jobs"]:
+            if not isinstance(job, dict):
+                raise CloudflareAPIError("calculation job queue API returned an invalid job")
+            job_id = str(job.get("id") or "").strip()
+            target_user_id = str(job.get("target_user_id") or "").strip().lower()
+            benchmark = str(job.get("benchmark") or "").strip().upper()
+            if not job_id or not target_user_id or "@" not in target_user_id:
+                raise CloudflareAPIError("calculation job queue API omitted a valid owner")
+            if not JOB_BENCHMARK_RE.fullmatch(benchmark):
+                raise CloudflareAPIError("calculation job queue API returned an invalid benchmark")
+            if job.get("status") != "queued":
+                raise CloudflareAPIError("calculation job queue API returned a non-queued job")
+            jobs.append(
+                {
+                    "id": job_id,
+                    "target_user_id": target_user_id,
+                    "benchmark": benchmark,
+                    "created_at": str(job.get("created_at") or ""),
+                }
+            )
+        return jobs
+
+    def report_calculation_job_status(
+        self,
+        calculation_job_id: str,
+        status: str,
+        error_code: str = "",
+    ) -> bool:
+        """Transition one durable job; False means the Worker rejected the transition."""
+        payload: Dict[str, Any] = {"job_id": calculation_job_id, "status": status}
+        if error_code:
+            payload["error_code"] = error_code
+        try:
+            response = self._request(
+                "POST",
+                "calculation-job-status",
+                f"{self.api_base_url}/api/calculation-jobs/status",
+                json=payload,
+                headers={"X-API-KEY": API_KEY},
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            raise CloudflareAPIError("calculation job status update failed") from exc
+
+        if response.status_code in (404, 409):
+            return False
+        if response.status_code != 200:
+            raise CloudflareAPIError(
+                f"calculation job status update failed [status={response.status_code}]"
+            )
+        result = self._decode_json(response, "calculation job status API")
+        if result.get("success") is not True:
+            raise CloudflareAPIError("calculation job status API did not return success=true")
+        return True
+
     def resolve_calculation_job_target(self, calculation_job_id: str) -> str:
         """Backward-compatible owner-only wrapper for isolated callers/tests."""
         target_user_id, _benchmark = self.resolve_calculation_job_context(calculation_job_id)
@@ -253,7 +614,9 @@ class CloudflareClient:
         """Delete one transaction record; retain bool semantics for existing callers."""
         self.logger.info("正在刪除記錄 ID: %s", record_id)
         try:
-            response = requests.delete(
+            response = self._request(
+                "DELETE",
+                "records-delete",
                 WORKER_API_URL_RECORDS,
                 json={"id": record_id},
                 headers=self._headers(),
@@ -314,7 +677,9 @@ class CloudflareClient:
             return verified_benchmark
 
         try:
-            response = requests.get(
+            response = self._request(
+                "GET",
+                "user-settings",
                 f"{self.api_base_url}/api/user-settings",
                 headers={
                     "X-API-KEY": API_KEY,
@@ -366,17 +731,17 @@ class CloudflareClient:
             "data": snapshot_data,
         }
 
-        try:
-            response = requests.post(
-                WORKER_API_URL_PORTFOLIO,
-                json=payload,
-                headers=self._headers(),
-                timeout=REQUEST_TIMEOUT,
+        encoding = self.upload_encoding
+        response = self._post_snapshot(payload, encoding, masked_user)
+        if response.status_code == 415 and encoding != "identity":
+            # The Worker rejects an unknown Content-Encoding before storing anything,
+            # so resending the same snapshot as plain JSON cannot duplicate a write.
+            self.logger.warning(
+                "Worker 不接受 %s 編碼的投資組合上傳，改用未壓縮 JSON",
+                encoding,
             )
-        except requests.RequestException as exc:
-            raise CloudflareAPIError(
-                f"投資組合上傳失敗 [user={masked_user}]"
-            ) from exc
+            self.upload_encoding = "identity"
+            response = self._post_snapshot(payload, "identity", masked_user)
 
         if response.status_code != 200:
             raise CloudflareAPIError(
@@ -391,3 +756,39 @@ class CloudflareClient:
 
         self.logger.info("%s 的投資組合快照上傳成功", masked_user)
         return True
+
+    def _post_snapshot(
+        self,
+        payload: Dict[str, Any],
+        encoding: str,
+        masked_user: str,
+    ) -> requests.Response:
+        try:
+            body = encode_snapshot_payload(payload, encoding)
+        except ValueError as exc:
+            raise CloudflareAPIError(
+                f"投資組合上傳失敗 [user={masked_user}]"
+            ) from exc
+
+        headers = self._headers()
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        self.logger.info(
+            "投資組合快照 payload [user=%s,encoding=%s,bytes=%s]",
+            masked_user,
+            encoding,
+            len(body),
+        )
+        try:
+            return self._request(
+                "POST",
+                "portfolio",
+                WORKER_API_URL_PORTFOLIO,
+                data=body,
+                headers=headers,
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            raise CloudflareAPIError(
+                f"投資組合上傳失敗 [user={masked_user}]"
+            ) from exc
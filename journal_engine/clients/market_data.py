@@ -5,7 +5,6 @@ from datetime import datetime, timedelta
 
 import pandas as pd
 import pytz
-import yfinance as yf
 
 from ..config import (
     DEFAULT_FX_RATE,
@@ -14,6 +13,8 @@ from ..config import (
     FX_USD_QUOTE_SYMBOLS,
 )
 from ..core.currency_detector import CurrencyDetector
+from ..run_metrics import RUN_METRICS
+from ..tracing import TRACER
 from .auto_price_selector import AutoPriceSelector
 
 
@@ -24,6 +25,13 @@ SELECTED_PRICE_REFETCH_ATTEMPTS = 2
 SELECTED_PRICE_REFETCH_DELAY_SECONDS = 1.0
 
 
+def load_yfinance():
+    """Import yfinance on first use; its dependency tree dominates engine startup."""
+    import yfinance
+
+    return yfinance
+
+
 class MarketDataClient:
     @staticmethod
     def _coerce_twd_per_usd(rate):
@@ -90,8 +98,12 @@ class MarketDataClient:
         self.price_metadata_by_symbol = {}
         self.realtime_overlay_symbols = set()
 
+    def _ticker(self, symbol: str):
+        """Return the provider handle for ``symbol``; offline profiling overrides this."""
+        return load_yfinance().Ticker(symbol)
+
     def _download_fx_history(self, quote_symbol: str, start_date, *, usd_twd=False):
-        ticker = yf.Ticker(quote_symbol)
+        ticker = self._ticker(quote_symbol)
         history = ticker.history(start=start_date - timedelta(days=5))
         if history.empty or 'Close' not in history.columns:
             return pd.Series(dtype=float), ticker
@@ -239,7 +251,7 @@ class MarketDataClient:
             if quote_date <= last_date:
                 return hist, False
 
-            work = hist.copy(deep=True)
+            work = hist.copy(deep=False)
             if VALUATION_SOURCE_COLUMN not in work.columns:
                 work[VALUATION_SOURCE_COLUMN] = 'market'
             if VALUATION_SOURCE_DATE_COLUMN not in work.columns:
@@ -424,7 +436,8 @@ class MarketDataClient:
             for ticker in tickers
             if str(ticker or '').strip()
         }
-        self._download_currency_fx(required_currencies, start_date)
+        with TRACER.span("market.fx", "market", currencies=len(required_currencies)):
+            self._download_currency_fx(required_currencies, start_date)
 
         all_tickers = list(set([t for t in tickers if t] + ['SPY']))
 
@@ -439,7 +452,7 @@ class MarketDataClient:
                     # Construct a fresh Ticker on each attempt. The retry requests the
                     # same provider, date range, adjustment mode, and action fields;
                     # it never fills, drops, substitutes, or repairs a provider row.
-                    ticker_obj = yf.Ticker(t)
+                    ticker_obj = self._ticker(t)
                     hist = ticker_obj.history(
                         start=start_date,
                         auto_adjust=False,
@@ -527,6 +540,7 @@ class MarketDataClient:
                             return first_invalid_result
 
                     if attempt < SELECTED_PRICE_REFETCH_ATTEMPTS:
+                        RUN_METRICS.inc("price_refetch_total")
                         print(
                             f"[{t}] selected price 含 NaN；將以相同 provider/參數 "
                             f"fresh re-fetch ({attempt + 1}/{SELECTED_PRICE_REFETCH_ATTEMPTS})"
@@ -548,19 +562,24 @@ class MarketDataClient:
             # mutating financial semantics here.
             return last_result
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_ticker = {executor.submit(fetch_single_ticker, t): t for t in all_tickers}
-            for future in concurrent.futures.as_completed(future_to_ticker):
-                result = future.result()
-                if result:
-                    ticker, data, metadata, realtime_overlay_applied = result
-                    if data is not None:
-                        self.market_data[ticker] = data
-                        if metadata:
-                            self.price_metadata_by_symbol[ticker] = metadata
-                        if realtime_overlay_applied:
-                            self.realtime_overlay_symbols.add(ticker)
-                        print(f"[{ticker}] 下載成功")
+        def traced_fetch(t):
+            with TRACER.span("market.fetch", "market"):
+                return fetch_single_ticker(t)
+
+        with TRACER.span("market.tickers", "market", tickers=len(all_tickers)):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+                future_to_ticker = {executor.submit(traced_fetch, t): t for t in all_tickers}
+                for future in concurrent.futures.as_completed(future_to_ticker):
+                    result = future.result()
+                    if result:
+                        ticker, data, metadata, realtime_overlay_applied = result
+                        if data is not None:
+                            self.market_data[ticker] = data
+                            if metadata:
+                                self.price_metadata_by_symbol[ticker] = metadata
+                            if realtime_overlay_applied:
+                                self.realtime_overlay_symbols.add(ticker)
+                            print(f"[{ticker}] 下載成功")
 
         return self.market_data, self.fx_rates
 
@@ -570,7 +589,7 @@ class MarketDataClient:
         - 估值價格一律使用 Close（split-adjusted price return）。
         - 配息不做價格復權，配息效果由 DIV 記錄或市場配息偵測入帳。
         """
-        df = df.copy()
+        df = df.copy(deep=False)
 
         selector = AutoPriceSelector(symbol, df)
         df['Close_Adjusted'] = selector.get_adjusted_price_series()
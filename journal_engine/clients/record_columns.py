@@ -0,0 +1,87 @@
+"""Column-wise accumulation of Worker record pages.
+
+The records pager appends each validated page here instead of extending one list
+of per-record dicts, so a million-record pull keeps one list per field rather than
+a million dicts, and the DataFrame is built from columns. ``id`` is validated as a
+positive integer by the pager and is kept in a typed int64 buffer. The remaining
+fields stay as the decoded JSON values: ``main.prepare_transactions`` owns their
+coercion and its error messages.
+
+A field missing from a record is NaN and an explicit ``null`` is ``None``, which
+matches ``pd.DataFrame(list_of_dicts)`` so both inputs normalize identically.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+_MISSING = np.nan
+RECORD_ID_COLUMN = "id"
+
+
+class RecordColumns:
+    """Typed id buffer plus one value list per record field, in first-seen order."""
+
+    def __init__(self) -> None:
+        self._ids = array("q")
+        self._columns: Dict[str, List[Any]] = {}
+        self._order: Dict[str, None] = {}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append_page(self, page_records: List[Mapping[str, Any]]) -> None:
+        """Append one page of records that all carry a validated integer ``id``."""
+        if not page_records:
+            return
+        page_keys: Dict[str, None] = {}
+        for record in page_records:
+            if record.keys() != page_keys.keys():
+                page_keys.update(dict.fromkeys(record))
+
+        for key in page_keys:
+            self._order.setdefault(key)
+            if key == RECORD_ID_COLUMN:
+                self._ids.extend(record[RECORD_ID_COLUMN] for record in page_records)
+                continue
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = [_MISSING] * self._rows
+            column.extend([record.get(key, _MISSING) for record in page_records])
+
+        self._rows += len(page_records)
+        for column in self._columns.values():
+            if len(column) < self._rows:
+                column.extend([_MISSING] * (self._rows - len(column)))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Return the records as dicts again, without the fields a record lacked."""
+        ids = self._ids.tolist()
+        fields = [
+            (key, None if key == RECORD_ID_COLUMN else self._columns[key])
+            for key in self._order
+        ]
+        records = []
+        for row in range(self._rows):
+            record: Dict[str, Any] = {}
+            for key, column in fields:
+                value = ids[row] if column is None else column[row]
+                if value is not _MISSING:
+                    record[key] = value
+            records.append(record)
+        return records
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build the records DataFrame straight from the column buffers."""
+        data: Dict[str, Any] = {}
+        for key in self._order:
+            if key == RECORD_ID_COLUMN:
+                data[key] = np.frombuffer(self._ids, dtype=np.int64).copy()
+            else:
+                data[key] = self._columns[key]
+        return pd.DataFrame(data, index=pd.RangeIndex(self._rows))
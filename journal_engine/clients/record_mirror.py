@@ -0,0 +1,171 @@
+"""Durable local SQLite mirror of Worker records for incremental all-user runs.
+
+The mirror stores every record as its Worker JSON plus the last applied position
+of the Worker's record change feed. Every insert, update and delete of a record
+takes the next ``change_seq`` (migration 0007), so a run pulls only changes above
+that position through ``GET /api/records?after_change=``: current rows for inserts
+and edits, tombstones for deletes. A targeted run also replaces one user's rows,
+and a periodic full verification rebuilds the mirror from a complete pull as a
+consistency check (see ``main.load_mirrored_records``).
+
+The file holds user financial records; keep it on the runner's private disk.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .record_columns import RecordColumns
+
+MIRROR_SCHEMA_VERSION = "2"
+# Version 1 tracked an id high-water mark that never saw edits or deletes; such a
+# mirror is emptied and rebuilt from the change feed rather than trusted.
+_RESET_SCHEMA_VERSIONS = frozenset({"1"})
+_LOAD_BATCH_ROWS = 1_000
+
+
+class RecordMirrorError(RuntimeError):
+    """Raised when the mirror file is unreadable or from another schema."""
+
+
+def _user_key(user_id: Any) -> str:
+    return str(user_id or "").strip().casefold()
+
+
+class RecordMirror:
+    """One SQLite file: ``records(id, user_key, record)`` plus ``mirror_state``."""
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._connection = sqlite3.connect(path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS records ("
+                    "id INTEGER PRIMARY KEY, user_key TEXT NOT NULL, record TEXT NOT NULL)"
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_records_user_key ON records (user_key)"
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS mirror_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO mirror_state (key, value) VALUES ('schema_version', ?)",
+                    (MIRROR_SCHEMA_VERSION,),
+                )
+        except sqlite3.Error as exc:
+            raise RecordMirrorError(f"record mirror unavailable: {type(exc).__name__}") from exc
+        schema_version = self._state("schema_version")
+        if schema_version in _RESET_SCHEMA_VERSIONS:
+            self._reset()
+        elif schema_version != MIRROR_SCHEMA_VERSION:
+            self.close()
+            raise RecordMirrorError("record mirror schema version mismatch")
+
+    def __enter__(self) -> "RecordMirror":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _state(self, key: str) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT value FROM mirror_state WHERE key = ?",
+            (key,),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._connection.execute(
+            "INSERT INTO mirror_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _reset(self) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM records")
+            self._connection.execute("DELETE FROM mirror_state")
+            self._set_state("schema_version", MIRROR_SCHEMA_VERSION)
+
+    def change_position(self) -> int:
+        """Return the last applied ``change_seq`` of the Worker's record change feed."""
+        return int(self._state("change_seq") or 0)
+
+    def last_verified_at(self) -> Optional[float]:
+        value = self._state("verified_at")
+        return None if value is None else float(value)
+
+    def record_count(self) -> int:
+        return int(self._connection.execute("SELECT COUNT(*) FROM records").fetchone()[0])
+
+    def _upsert(self, records: Iterable[Dict[str, Any]]) -> None:
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO records (id, user_key, record) VALUES (?, ?, ?)",
+            (
+                (
+                    int(record["id"]),
+                    _user_key(record.get("user_id")),
+                    json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+                )
+                for record in records
+            ),
+        )
+
+    def apply_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """Apply feed changes in sequence order and advance the change position."""
+        if not changes:
+            return
+        with self._connection:
+            for change in changes:
+                record = change["record"]
+                if record is None:
+                    self._connection.execute("DELETE FROM records WHERE id = ?", (int(change["id"]),))
+                else:
+                    self._upsert([record])
+            position = max(int(change["change_seq"]) for change in changes)
+            if position > self.change_position():
+                self._set_state("change_seq", str(position))
+
+    def replace_all(self, records: List[Dict[str, Any]], verified_at: float) -> None:
+        """Replace the mirror with a complete pull and mark it verified.
+
+        The change position is left alone: the caller applies the feed just before
+        the pull, and any change made while the pull was paging has a higher
+        sequence, so the next sync replays it over the pulled rows.
+        """
+        with self._connection:
+            self._connection.execute("DELETE FROM records")
+            self._upsert(records)
+            self._set_state("verified_at", repr(float(verified_at)))
+
+    def replace_user(self, user_id: str, records: List[Dict[str, Any]]) -> None:
+        """Replace one user's rows with a fresh complete pull of that user.
+
+        The change position is left alone: other users may still have unseen
+        changes, and replaying this user's changes over fresh rows is harmless.
+        """
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM records WHERE user_key = ?",
+                (_user_key(user_id),),
+            )
+            self._upsert(records)
+
+    def load(self) -> RecordColumns:
+        """Return every mirrored record, in id order, as pager-style columns."""
+        columns = RecordColumns()
+        cursor = self._connection.execute("SELECT record FROM records ORDER BY id")
+        while True:
+            batch = cursor.fetchmany(_LOAD_BATCH_ROWS)
+            if not batch:
+                return columns
+            columns.append_page([json.loads(row[0]) for row in batch])
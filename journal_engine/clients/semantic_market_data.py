@@ -33,9 +33,13 @@ import threading
 from typing import Any
 
 import pandas as pd
-import yfinance as yf
 
-from .market_data import VALUATION_SOURCE_COLUMN, VALUATION_SOURCE_DATE_COLUMN, MarketDataClient
+from .market_data import (
+    VALUATION_SOURCE_COLUMN,
+    VALUATION_SOURCE_DATE_COLUMN,
+    MarketDataClient,
+)
+from ..run_metrics import RUN_METRICS
 from .yahoo_intraday_evidence import (
     INTRADAY_EVIDENCE_INTERVALS,
     YahooIntradayEvidenceError,
@@ -103,7 +107,7 @@ class SemanticMarketDataClient(MarketDataClient):
     ):
         if frame is None or frame.empty:
             return None
-        work = frame.copy(deep=True)
+        work = frame.copy(deep=False)
         index = pd.to_datetime(work.index, errors="coerce")
         if index.isna().any() or index.tz is None:
             return None
@@ -354,7 +358,7 @@ class SemanticMarketDataClient(MarketDataClient):
             )
             return frame, ()
 
-        normalized_frame = frame.copy(deep=True)
+        normalized_frame = frame.copy(deep=False)
         normalized_index = pd.to_datetime(normalized_frame.index, errors="coerce")
         if normalized_index.isna().any():
             return frame, ()
@@ -386,7 +390,7 @@ class SemanticMarketDataClient(MarketDataClient):
             try:
                 evidence_session = YahooIntradayEvidenceSession(
                     str(symbol),
-                    ticker_factory=yf.Ticker,
+                    ticker_factory=self._ticker,
                     intervals=_SEMANTIC_INTRADAY_INTERVALS,
                 )
             except Exception as exc:
@@ -437,7 +441,7 @@ class SemanticMarketDataClient(MarketDataClient):
         if not staged:
             return frame, ()
 
-        work = normalized_frame.copy(deep=True)
+        work = normalized_frame.copy(deep=False)
         for event_date, values in staged.items():
             for column, value in values.items():
                 work.at[event_date, column] = value
@@ -476,7 +480,7 @@ class SemanticMarketDataClient(MarketDataClient):
         current_signature = cls._dividend_action_only_signature(frame)
         if not signature or current_signature != signature:
             return frame, False
-        work = frame.copy(deep=True)
+        work = frame.copy(deep=False)
         original_attrs = dict(frame.attrs)
         if VALUATION_SOURCE_COLUMN not in work.columns:
             work[VALUATION_SOURCE_COLUMN] = "market"
@@ -517,6 +521,7 @@ class SemanticMarketDataClient(MarketDataClient):
                 continue
             recovered, recovered_dates = self._recover_with_exact_date_intraday_evidence(str(symbol), frame)
             if recovered_dates:
+                RUN_METRICS.inc("semantic_recovered_rows_total", len(recovered_dates))
                 self.market_data[symbol] = recovered
                 metadata = dict(recovered.attrs.get("price_provenance") or {})
                 if metadata:
@@ -26,7 +26,6 @@ from contextlib import contextmanager
 from typing import Any, Iterator
 
 import pandas as pd
-from yfinance.data import YfData
 
 INTRADAY_EVIDENCE_INTERVALS = ("1h", "15m")
 _INTRADAY_REQUEST_TIMEOUT_SECONDS = 10.0
@@ -95,6 +94,8 @@ class YahooIntradayEvidenceSession:
     @staticmethod
     def _clear_yfinance_history_response_cache() -> None:
         try:
+            from yfinance.data import YfData
+
             cache_get = YfData().cache_get
             cache_clear = cache_get.cache_clear
         except Exception as exc:
@@ -13,6 +13,32 @@ WORKER_API_URL_PORTFOLIO = f'{WORKER_BASE_URL}/api/portfolio'
 # 讀取環境變數 (GitHub Secrets)
 API_KEY = os.environ.get("API_KEY", "")
 
+# Snapshot upload body encoding: identity (plain JSON), gzip or deflate.
+# Compressed uploads fall back to identity if the Worker answers 415.
+SNAPSHOT_UPLOAD_ENCODING = os.environ.get('SNAPSHOT_UPLOAD_ENCODING', 'identity').strip().lower() or 'identity'
+
+# Canonical Daily P&L reconciliation: "reuse" consumes the calculator's end-state
+# record; "independent" rebuilds quantities, flows and prices from the ledger for audits.
+DAILY_PNL_RECONCILIATION_MODE = os.environ.get('DAILY_PNL_RECONCILIATION_MODE', 'reuse').strip().lower() or 'reuse'
+
+# Deterministic user sharding for all-user sweeps: this process handles the users
+# whose normalized-id hash falls in shard SWEEP_SHARD_INDEX of SWEEP_SHARD_COUNT.
+SWEEP_SHARD_INDEX = os.environ.get('SWEEP_SHARD_INDEX', '0').strip() or '0'
+SWEEP_SHARD_COUNT = os.environ.get('SWEEP_SHARD_COUNT', '1').strip() or '1'
+
+# Run metrics in the Prometheus text exposition format. RUN_METRICS_PATH writes the
+# file (for example a workflow artifact); RUN_METRICS_PUSH_URL PUTs it to a
+# Pushgateway-compatible endpoint such as http://127.0.0.1:9091/metrics/job/journal_engine.
+RUN_METRICS_PATH = os.environ.get('RUN_METRICS_PATH', '').strip()
+RUN_METRICS_PUSH_URL = os.environ.get('RUN_METRICS_PUSH_URL', '').strip()
+
+# Local SQLite mirror of Worker records for all-user runs (empty disables it). Runs
+# pull only the record inserts, edits and deletes made since the mirror's last
+# applied change sequence; targeted runs also refresh their user's mirrored rows.
+# The full set is re-verified against the Worker every RECORD_MIRROR_VERIFY_SECONDS.
+RECORD_MIRROR_PATH = os.environ.get('RECORD_MIRROR_PATH', '').strip()
+RECORD_MIRROR_VERIFY_SECONDS = os.environ.get('RECORD_MIRROR_VERIFY_SECONDS', '21600').strip() or '21600'
+
 # API Headers
 API_HEADERS = {
     "X-API-KEY": API_KEY,
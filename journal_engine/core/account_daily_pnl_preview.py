@@ -550,6 +550,6 @@ def attach_account_daily_pnl_preview(
         market_client=market_client,
         calculation_as_of=calculation_as_of,
     )
-    payload = snapshot.model_dump(mode="python")
+    payload = dict(snapshot)
     payload["account_daily_pnl_preview"] = preview
     return PortfolioSnapshotWithAccountPreviews.model_validate(payload)
@@ -0,0 +1,265 @@
+"""Engine-owned daily cash-inclusive account-value history.
+
+R2.6A publishes account value for the current snapshot only.  This module extends
+the same authorities to every calculator valuation date so charts can plot true
+account value: securities value comes from the ``all`` group's columnar history,
+cash balances from the complete shadow cash ledger, and TWD conversion from the
+engine's daily ``fx_rates_by_currency`` series.
+
+Each currency's balance is its opening balance plus a cumulative sum of later
+movements, aligned to the trading dates with ``searchsorted``; FX uses the last
+rate on or before each date, like ``MarketDataClient.get_fx_snapshot``.  Gating
+matches the current preview: an incomplete ledger or a cash currency without an
+FX series makes the whole history unavailable.  A date before a currency's
+opening balance or before its first FX rate publishes no cash or account value
+rather than assuming zero.
+"""
+
+from __future__ import annotations
+
+from itertools import accumulate
+import math
+from typing import Literal, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field, StrictBool, model_validator
+
+from .account_daily_pnl_preview import PortfolioSnapshotWithAccountPreviews
+from .cash_ledger import ShadowCashLedgerEntry, ShadowCashLedgerReport
+from .history_columns import HistoryColumns
+
+
+ACCOUNT_VALUE_HISTORY_METHOD = "securities_plus_authoritative_cash_history_v1"
+ACCOUNT_VALUE_HISTORY_FX_POLICY = "engine_daily_fx_asof_v1"
+
+
+class AccountValueHistoryCashSeries(BaseModel):
+    """One cash currency's daily native balance, FX and TWD value."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    currency: str
+    balance_native: list[Optional[float]]
+    fx_twd_per_native: list[Optional[float]]
+    value_twd: list[Optional[float]]
+
+
+class AccountValueHistory(BaseModel):
+    """Additive daily account-value contract aligned to ``groups['all'].history``."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    history_version: Literal[1] = 1
+    status: Literal["ready", "unavailable"]
+    base_currency: Literal["TWD"] = "TWD"
+    method: Literal["securities_plus_authoritative_cash_history_v1"] = ACCOUNT_VALUE_HISTORY_METHOD
+    fx_policy: Literal["engine_daily_fx_asof_v1"] = ACCOUNT_VALUE_HISTORY_FX_POLICY
+    cash_ledger_complete: StrictBool
+    dates: list[str] = Field(default_factory=list)
+    securities_value_twd: list[float] = Field(default_factory=list)
+    cash_value_twd: list[Optional[float]] = Field(default_factory=list)
+    account_value_twd: list[Optional[float]] = Field(default_factory=list)
+    cash_series: list[AccountValueHistoryCashSeries] = Field(default_factory=list)
+    reason: Optional[
+        Literal[
+            "history_unavailable",
+            "cash_evidence_unavailable",
+            "cash_ledger_incomplete",
+            "cash_fx_unavailable",
+        ]
+    ] = None
+    missing_cash_fx_currencies: list[str] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def validate_state(self) -> "AccountValueHistory":
+        if self.status == "ready":
+            if not self.cash_ledger_complete:
+                raise ValueError("ready account-value history requires complete cash ledger")
+            if self.reason is not None or self.missing_cash_fx_currencies:
+                raise ValueError("ready account-value history cannot carry unavailable reason")
+            length = len(self.dates)
+            if not length:
+                raise ValueError("ready account-value history requires dates")
+            series_lengths = {
+                len(self.securities_value_twd),
+                len(self.cash_value_twd),
+                len(self.account_value_twd),
+                *(
+                    len(values)
+                    for series in self.cash_series
+                    for values in (series.balance_native, series.fx_twd_per_native, series.value_twd)
+                ),
+            }
+            if series_lengths != {length}:
+                raise ValueError("account-value history series must align to dates")
+            if any(
+                (cash is None) != (account is None)
+                for cash, account in zip(self.cash_value_twd, self.account_value_twd)
+            ):
+                raise ValueError("account value requires the same day's cash value")
+        else:
+            if self.reason is None:
+                raise ValueError("unavailable account-value history requires a reason")
+            if self.dates or self.cash_value_twd or self.account_value_twd or self.cash_series:
+                raise ValueError("unavailable account-value history cannot publish series")
+        return self
+
+
+class PortfolioSnapshotWithAccountValueHistory(PortfolioSnapshotWithAccountPreviews):
+    """Backward-compatible snapshot extension; Worker stores snapshot JSON opaquely."""
+
+    account_value_history: AccountValueHistory
+
+
+def _unavailable(
+    reason: str,
+    *,
+    cash_ledger_complete: bool,
+    missing_cash_fx_currencies: list[str] | None = None,
+) -> AccountValueHistory:
+    return AccountValueHistory(
+        status="unavailable",
+        cash_ledger_complete=cash_ledger_complete,
+        reason=reason,
+        missing_cash_fx_currencies=sorted(set(missing_cash_fx_currencies or [])),
+    )
+
+
+def _optional_floats(values: np.ndarray) -> list[Optional[float]]:
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+def _movements_by_currency(
+    report: ShadowCashLedgerReport,
+) -> dict[str, list[ShadowCashLedgerEntry]]:
+    movements: dict[str, list[ShadowCashLedgerEntry]] = {}
+    for entry in report.entries:
+        if not entry.baseline:
+            movements.setdefault(entry.currency, []).append(entry)
+    return movements
+
+
+def _balance_series(
+    opening_date: str,
+    opening_balance,
+    movements: list[ShadowCashLedgerEntry],
+    days: np.ndarray,
+) -> np.ndarray:
+    """Return the native balance at each day's close, NaN before the opening date.
+
+    Matches ``account_daily_pnl_preview._balance_as_of``: movements on or before
+    the opening date are absorbed by the baseline.  Report entries are sorted by
+    date, so one cumulative sum serves every valuation date.
+    """
+    later = [entry for entry in movements if entry.date > opening_date]
+    balances = np.asarray(
+        [float(value) for value in accumulate(
+            (entry.amount for entry in later),
+            initial=opening_balance,
+        )],
+        dtype=np.float64,
+    )
+    movement_days = np.asarray([entry.date for entry in later], dtype="datetime64[D]")
+    result = balances[np.searchsorted(movement_days, days, side="right")]
+    result[days < np.datetime64(opening_date, "D")] = np.nan
+    return result
+
+
+def _fx_series(series: pd.Series, days: np.ndarray) -> np.ndarray:
+    """Return the last finite positive rate on or before each day, else NaN."""
+    values = pd.to_numeric(series, errors="coerce").dropna().sort_index()
+    index = pd.DatetimeIndex(values.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    rate_days = index.normalize().to_numpy(dtype="datetime64[D]")
+    rates = values.to_numpy(dtype=np.float64)
+    positions = np.searchsorted(rate_days, days, side="right") - 1
+    result = np.where(positions >= 0, rates[np.maximum(positions, 0)], np.nan)
+    result[~(np.isfinite(result) & (result > 0))] = np.nan
+    return result
+
+
+def build_account_value_history(
+    *,
+    history: Optional[HistoryColumns],
+    cash_report: Optional[ShadowCashLedgerReport],
+    fx_rates_by_currency: Mapping[str, pd.Series] | None,
+) -> AccountValueHistory:
+    """Build a fail-closed daily account-value series from reviewed authorities."""
+
+    cash_ledger_complete = bool(cash_report and cash_report.complete)
+    if history is None or not len(history):
+        return _unavailable("history_unavailable", cash_ledger_complete=cash_ledger_complete)
+    if cash_report is None:
+        return _unavailable("cash_evidence_unavailable", cash_ledger_complete=False)
+    if not cash_report.complete:
+        return _unavailable("cash_ledger_incomplete", cash_ledger_complete=False)
+
+    fx_by_currency = dict(fx_rates_by_currency or {})
+    missing_currencies = [
+        summary.currency
+        for summary in cash_report.currencies
+        if summary.currency != "TWD"
+        and (fx_by_currency.get(summary.currency) is None or fx_by_currency[summary.currency].empty)
+    ]
+    if missing_currencies:
+        return _unavailable(
+            "cash_fx_unavailable",
+            cash_ledger_complete=True,
+            missing_cash_fx_currencies=missing_currencies,
+        )
+
+    days = history.dates.astype("datetime64[D]")
+    movements = _movements_by_currency(cash_report)
+    cash_value = np.zeros(len(days), dtype=np.float64)
+    cash_series: list[AccountValueHistoryCashSeries] = []
+    for summary in cash_report.currencies:
+        balances = _balance_series(
+            summary.opening_date,
+            summary.opening_balance,
+            movements.get(summary.currency, []),
+            days,
+        )
+        if summary.currency == "TWD":
+            rates = np.ones(len(days), dtype=np.float64)
+        else:
+            rates = _fx_series(fx_by_currency[summary.currency], days)
+        values = balances * rates
+        # NaN propagates, so a day missing any currency publishes no cash total.
+        cash_value += values
+        cash_series.append(AccountValueHistoryCashSeries(
+            currency=summary.currency,
+            balance_native=_optional_floats(balances),
+            fx_twd_per_native=_optional_floats(rates),
+            value_twd=_optional_floats(values),
+        ))
+
+    return AccountValueHistory(
+        status="ready",
+        cash_ledger_complete=True,
+        dates=history.date_strings(),
+        securities_value_twd=history.total_value.tolist(),
+        cash_value_twd=_optional_floats(cash_value),
+        account_value_twd=_optional_floats(history.total_value + cash_value),
+        cash_series=cash_series,
+    )
+
+
+def attach_account_value_history(
+    snapshot: PortfolioSnapshotWithAccountPreviews,
+    *,
+    history: Optional[HistoryColumns],
+    cash_report: Optional[ShadowCashLedgerReport],
+    fx_rates_by_currency: Mapping[str, pd.Series] | None,
+) -> PortfolioSnapshotWithAccountValueHistory:
+    """Attach the daily account-value history; ``history`` is ``groups['all']``'s columns."""
+
+    account_history = build_account_value_history(
+        history=history,
+        cash_report=cash_report,
+        fx_rates_by_currency=fx_rates_by_currency,
+    )
+    payload = dict(snapshot)
+    payload["account_value_history"] = account_history
+    return PortfolioSnapshotWithAccountValueHistory.model_validate(payload)
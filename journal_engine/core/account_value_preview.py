@@ -23,6 +23,7 @@ from pydantic import BaseModel, ConfigDict, Field, StrictBool, model_validator
 
 from ..models import PortfolioSnapshot
 from .cash_ledger import ShadowCashLedgerReport
+from .history_columns import HistoryColumns
 
 
 ACCOUNT_VALUE_PREVIEW_METHOD = "securities_plus_authoritative_cash_v1"
@@ -237,21 +238,30 @@ class _SnapshotHistoryFxMarket:
         except ValueError:
             return None
 
+    @staticmethod
+    def _fx_rows(history: Any) -> list[tuple[Any, Any, Any]]:
+        """Return ``(date, _raw_fx_rates, legacy rate)`` per history row."""
+        if isinstance(history, HistoryColumns):
+            return list(zip(history.date_strings(), history.fx_rates, history.fx_rate.tolist()))
+        return [
+            (row.get("date"), row.get("_raw_fx_rates"), row.get("_raw_fx_rate", row.get("fx_rate")))
+            for row in history or []
+        ]
+
     def _lookup(self, value_date: Any) -> dict[str, float]:
         target = self._normalized_date(value_date)
         if not target:
             return {"TWD": 1.0}
 
-        histories = [list(self.snapshot.history or [])]
+        histories = [self.snapshot.history]
         group = self.snapshot.groups.get("all")
         if group is not None:
-            histories.append(list(group.history or []))
+            histories.append(group.history)
 
         for history in histories:
-            for row in reversed(history):
-                if self._normalized_date(row.get("date")) != target:
+            for row_date, raw, legacy_rate in reversed(self._fx_rows(history)):
+                if self._normalized_date(row_date) != target:
                     continue
-                raw = row.get("_raw_fx_rates")
                 if isinstance(raw, Mapping):
                     result = {"TWD": 1.0}
                     for currency, value in raw.items():
@@ -259,7 +269,7 @@ class _SnapshotHistoryFxMarket:
                         if rate is not None:
                             result[str(currency)] = float(rate)
                     return result
-                legacy = _positive_fx(row.get("_raw_fx_rate", row.get("fx_rate")))
+                legacy = _positive_fx(legacy_rate)
                 if legacy is not None:
                     return {"TWD": 1.0, "USD": float(legacy)}
         return {"TWD": 1.0}
@@ -297,7 +307,7 @@ def attach_account_value_preview(
         cash_report=cash_report,
         fx_context=fx_context,
     )
-    payload = snapshot.model_dump(mode="python")
+    payload = dict(snapshot)
     payload["account_value_preview"] = preview
     extended = PortfolioSnapshotWithAccountValuePreview.model_validate(payload)
 
@@ -9,19 +9,30 @@ from ..config import BASE_CURRENCY, DEFAULT_FX_RATE
 from .transaction_analyzer import TransactionAnalyzer, PositionSnapshot
 from .daily_pnl_helper import DailyPnLHelper
 from .currency_detector import CurrencyDetector
+from .daily_pnl_attribution import GroupEndState, attribution_row, build_daily_attribution
 from .dividend_policy import (
     UnsupportedDividendPolicyError,
     reviewed_dividend_net_multiplier,
     reviewed_dividend_withholding_rate,
 )
-from .performance_metrics import annotate_twr_history, calculate_xirr_metric
+from .history_columns import HistoryColumnsBuilder
+from .performance_metrics import (
+    build_period_prefixes,
+    calculate_risk_metrics,
+    calculate_xirr_metric,
+    link_twr_columns,
+    standard_period_table,
+)
 from .validator import PortfolioValidator
+from ..tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
 class PortfolioCalculator:
     def __init__(self, transactions_df, market_client, benchmark_ticker="SPY", api_client=None, oversell_policy="CLAMP", calculation_now=None):
-        self.df = transactions_df
+        # Own a shallow copy: split back-adjustment writes Qty/Price in place, and under
+        # copy-on-write only the written columns are materialized, never the caller's.
+        self.df = transactions_df.copy(deep=False)
         self.market = market_client
         self.benchmark_ticker = benchmark_ticker
         self.api_client = api_client
@@ -216,23 +227,24 @@ class PortfolioCalculator:
         final_groups_data = {}
         for group_name in groups_to_calc:
             if group_name == 'all':
-                group_df = self.df.copy()
+                group_df = self.df
             else:
                 mask = self.df['Tag'].apply(
                     lambda x: group_name in [t.strip() for t in (x or '').replace(';', ',').split(',')]
                 )
-                group_df = self.df[mask].copy()
+                group_df = self.df[mask]
             
             if group_df.empty: continue
 
-            group_start_date = group_df['Date'].min()
-            group_end_date = self._run_now().replace(tzinfo=None)
-            group_date_range = self._get_trading_date_range(group_df, group_start_date, group_end_date)
+            with TRACER.span("group", "calculator", group=group_name, rows=len(group_df)):
+                group_start_date = group_df['Date'].min()
+                group_end_date = self._run_now().replace(tzinfo=None)
+                group_date_range = self._get_trading_date_range(group_df, group_start_date, group_end_date)
 
-            group_result = self._calculate_single_portfolio(
-                group_df, group_date_range, current_fx, group_name,
-                current_stage, stage_desc, benchmark_tax_rate
-            )
+                group_result = self._calculate_single_portfolio(
+                    group_df, group_date_range, current_fx, group_name,
+                    current_stage, stage_desc, benchmark_tax_rate
+                )
             final_groups_data[group_name] = group_result
 
         all_data = final_groups_data.get('all')
@@ -301,34 +313,8 @@ class PortfolioCalculator:
             prev_date -= timedelta(days=1)
         return pd.Timestamp(prev_date).normalize()
 
-    @classmethod
-    def _calculate_modified_dietz_return(cls, beginning_value: float, ending_value: float, cashflows: list[float], weights: list[float] = None) -> float:
-        """Calculate Modified Dietz return for a sub-period.
-        r = (V1 - V0 - ΣCF) / (V0 + Σ(w_i * CF_i))
-        """
-        if beginning_value < 0:
-            return 0.0
-
-        if not cashflows:
-            return (ending_value - beginning_value) / beginning_value if beginning_value > 1e-9 else 0.0
-
-        if weights is None:
-            weights = [0.5] * len(cashflows)
-
-        weighted_cashflows = sum(w * cf for w, cf in zip(weights, cashflows))
-        denominator = beginning_value + weighted_cashflows
-
-        if abs(denominator) < 1e-9:
-            return 0.0
-
-        numerator = ending_value - beginning_value - sum(cashflows)
-        r = numerator / denominator
-        if not np.isfinite(r):
-            return 0.0
-        return r
-
     def _calculate_single_portfolio(self, df, date_range, current_fx, group_name="unknown", current_stage="CLOSED", stage_desc="Markets Closed", benchmark_tax_rate=0.0):
-        df = df.copy()
+        df = df.copy(deep=False)
         for col in ['Commission', 'Tax']:
             if col not in df.columns:
                 df[col] = 0.0
@@ -344,21 +330,22 @@ class PortfolioCalculator:
         total_realized_pnl_twd = 0.0
         realized_pnl_by_symbol = defaultdict(float)
         realized_cost_by_symbol = defaultdict(float)
-        history_data = []
+        history = HistoryColumnsBuilder()
         confirmed_dividends = set()
         dividend_history = []
         anomalies = []
         anomaly_keys = set()
         xirr_cashflows = []
         
-        cumulative_twr_factor = 1.0
         last_market_value_twd = 0.0
 
         benchmark_cum_factor = 1.0
+        # (date, {symbol: (price, fx)}) for the last two valuation days.
+        recent_valuations = deque(maxlen=2)
         benchmark_last_val_twd = None
         benchmark_started = False
 
-        div_txs = df[df['Type'] == 'DIV'].copy()
+        div_txs = df[df['Type'] == 'DIV']
         for _, row in div_txs.iterrows():
             key = f"{row['Symbol']}_{row['Date'].strftime('%Y-%m-%d')}"
             confirmed_dividends.add(key)
@@ -374,21 +361,20 @@ class PortfolioCalculator:
                 benchmark_last_val_twd = prev_benchmark_val_twd
                 benchmark_started = True
 
-            history_data.append({
-                "date": prev_trading_day.strftime('%Y-%m-%d'), "total_value": 0,
-                "invested": 0, "net_profit": 0, "realized_pnl": 0, "unrealized_pnl": 0,
-                "twr": 0.0, "benchmark_twr": 0.0, "fx_rate": round(current_fx, 4),
-                "_raw_fx_rate": current_fx,
-                "_raw_fx_rates": self._serialize_fx_context(
+            history.append_baseline(
+                prev_trading_day.strftime('%Y-%m-%d'),
+                current_fx,
+                self._serialize_fx_context(
                     self._get_fx_context(prev_trading_day, current_fx),
                     current_fx,
                 ),
-                "net_cashflow_twd": 0, "daily_pnl_formula_twd": 0
-            })
+            )
 
+        day_phases = TRACER.phases("day_loop")
         for d in date_range:
             current_date = d.date()
 
+            day_phases.begin("fx_benchmark")
             if hasattr(self.market, 'get_fx_snapshot'):
                 fx_context = self._get_fx_context(d, current_fx)
                 fx = self._legacy_usd_reference_fx(fx_context, current_fx)
@@ -428,7 +414,8 @@ class PortfolioCalculator:
 
             begin_qtys_for_dividend = {sym: h['qty'] for sym, h in holdings.items()}
 
-            daily_txns = df[df['Date'].dt.date == current_date].copy()
+            day_phases.begin("transactions")
+            daily_txns = df[df['Date'].dt.date == current_date]
             
             if not daily_txns.empty:
                 priority_map = {'BUY': 1, 'DIV': 2, 'SELL': 3}
@@ -442,7 +429,6 @@ class PortfolioCalculator:
                 daily_txns = daily_txns.sort_values(by=sort_cols, kind='stable')
             
             daily_net_cashflow_twd = 0.0
-            daily_cashflows_for_dietz = []
             
             for _, row in daily_txns.iterrows():
                 sym = row['Symbol']
@@ -464,7 +450,6 @@ class PortfolioCalculator:
                     invested_capital += cost_twd
                     xirr_cashflows.append({'date': d, 'amount': -cost_twd})
                     daily_net_cashflow_twd += cost_twd
-                    daily_cashflows_for_dietz.append(cost_twd)
 
                 elif row['Type'] == 'SELL':
                     if not fifo_queues.get(sym) or not fifo_queues[sym]:
@@ -518,7 +503,6 @@ class PortfolioCalculator:
                     realized_cost_by_symbol[sym] += cost_sold_twd
                     xirr_cashflows.append({'date': d, 'amount': proceeds_twd})
                     daily_net_cashflow_twd -= proceeds_twd
-                    daily_cashflows_for_dietz.append(-proceeds_twd)
 
                 elif row['Type'] == 'DIV':
                     effective_fx = self._get_effective_fx_rate(sym, fx_context)
@@ -527,8 +511,8 @@ class PortfolioCalculator:
                     realized_pnl_by_symbol[sym] += div_twd
                     xirr_cashflows.append({'date': d, 'amount': div_twd})
                     daily_net_cashflow_twd -= div_twd
-                    daily_cashflows_for_dietz.append(-div_twd)
 
+            day_phases.begin("dividends")
             date_str = d.strftime('%Y-%m-%d')
             for sym, h_data in holdings.items():
                 eligible_qty = begin_qtys_for_dividend.get(sym, 0.0)
@@ -589,52 +573,45 @@ class PortfolioCalculator:
                     realized_pnl_by_symbol[sym] += total_net_twd
                     xirr_cashflows.append({'date': d, 'amount': total_net_twd})
                     daily_net_cashflow_twd -= total_net_twd
-                    daily_cashflows_for_dietz.append(-total_net_twd)
 
+            day_phases.begin("valuation")
             current_market_value_twd = 0.0
+            day_valuations = {}
             
             for sym, h in holdings.items():
                 if h['qty'] > 1e-6:
                     price, effective_fx = self._get_asset_effective_price_and_fx(sym, current_date, current_fx)
+                    day_valuations[sym] = (price, effective_fx)
                     current_market_value_twd += h['qty'] * price * effective_fx
+            recent_valuations.append((current_date, day_valuations))
             
-            period_hpr_factor = 1.0
-            if last_market_value_twd > 1e-9:
-                period_return = self._calculate_modified_dietz_return(
-                    beginning_value=last_market_value_twd,
-                    ending_value=current_market_value_twd,
-                    cashflows=daily_cashflows_for_dietz,
-                )
-                period_hpr_factor = 1.0 + period_return
-            elif current_market_value_twd > 1e-9 and daily_net_cashflow_twd > 1e-9:
-                period_hpr_factor = current_market_value_twd / daily_net_cashflow_twd
-
-            if not np.isfinite(period_hpr_factor):
-                period_hpr_factor = 1.0
-            
-            cumulative_twr_factor *= period_hpr_factor
-            prev_market_value_twd = last_market_value_twd
             last_market_value_twd = current_market_value_twd
             
             unrealized_pnl = current_market_value_twd - sum(h['cost_basis_twd'] for h in holdings.values() if h['qty'] > 1e-6)
             total_pnl = unrealized_pnl + total_realized_pnl_twd
 
-            history_data.append({
-                "date": date_str, "total_value": round(current_market_value_twd, 0),
-                "invested": round(invested_capital, 0), "net_profit": round(total_pnl, 0),
-                "realized_pnl": round(total_realized_pnl_twd, 0), "unrealized_pnl": round(unrealized_pnl, 0),
-                "twr": round((cumulative_twr_factor - 1) * 100, 2), 
-                "benchmark_twr": round(benchmark_twr, 2),
-                "fx_rate": round(float(fx), 4),
-                "_raw_fx_rate": float(fx),
-                "_raw_fx_rates": self._serialize_fx_context(fx_context, fx),
-                "net_cashflow_twd": round(-daily_net_cashflow_twd, 0),
-                "_raw_total_value": current_market_value_twd,
-                "_raw_net_cashflow_twd": -daily_net_cashflow_twd,
-                "daily_pnl_formula_twd": round(current_market_value_twd - prev_market_value_twd + (-daily_net_cashflow_twd), 0) if prev_market_value_twd > 1e-9 else round(current_market_value_twd + (-daily_net_cashflow_twd), 0)
-            })
-
-        twr_reliability = annotate_twr_history(history_data)
+            history.append_day(
+                date_str,
+                total_value=current_market_value_twd,
+                invested=invested_capital,
+                net_profit=total_pnl,
+                realized_pnl=total_realized_pnl_twd,
+                unrealized_pnl=unrealized_pnl,
+                benchmark_twr=benchmark_twr,
+                fx_rate=float(fx),
+                fx_rates=self._serialize_fx_context(fx_context, fx),
+                net_cashflow_twd=-daily_net_cashflow_twd,
+            )
+        day_phases.end()
+
+        # Daily Modified Dietz periods (midpoint-weighted net flow) are linked in one
+        # vectorized pass over the finished value/cash-flow columns.
+        history_columns = history.build()
+        twr_reliability = link_twr_columns(history_columns)
+        risk_metrics = calculate_risk_metrics(history_columns, twr_reliability)
+        period_returns = standard_period_table(build_period_prefixes(history_columns))
+        # Only the last two days are read here; the snapshot publishes the columns.
+        history_tail = history_columns.to_records(-2)
         if twr_reliability.status == "undefined":
             logger.warning(
                 "[%s] Linked TWR reliability is undefined from %s: reason=%s",
@@ -650,29 +627,29 @@ class PortfolioCalculator:
         today = tw_now.date()
         pnl_base_date = today
         pnl_prev_date = None
-        if history_data:
+        if history_tail:
             try:
-                pnl_base_date = pd.to_datetime(history_data[-1]['date']).date()
-                if len(history_data) >= 2:
-                    pnl_prev_date = pd.to_datetime(history_data[-2]['date']).date()
+                pnl_base_date = pd.to_datetime(history_tail[-1]['date']).date()
+                if len(history_tail) >= 2:
+                    pnl_prev_date = pd.to_datetime(history_tail[-2]['date']).date()
             except Exception as e:
                 logger.debug(f"Failed to derive pnl dates from history: {e}")
 
         last_fx_used = current_fx
         prev_fx_used = current_fx
-        if len(history_data) >= 2:
-            last_fx_used = history_data[-1].get(
+        if len(history_tail) >= 2:
+            last_fx_used = history_tail[-1].get(
                 '_raw_fx_rates',
-                history_data[-1].get('_raw_fx_rate', history_data[-1].get('fx_rate', current_fx)),
+                history_tail[-1].get('_raw_fx_rate', history_tail[-1].get('fx_rate', current_fx)),
             )
-            prev_fx_used = history_data[-2].get(
+            prev_fx_used = history_tail[-2].get(
                 '_raw_fx_rates',
-                history_data[-2].get('_raw_fx_rate', history_data[-2].get('fx_rate', current_fx)),
+                history_tail[-2].get('_raw_fx_rate', history_tail[-2].get('fx_rate', current_fx)),
             )
-        elif len(history_data) == 1:
-            last_fx_used = history_data[-1].get(
+        elif len(history_tail) == 1:
+            last_fx_used = history_tail[-1].get(
                 '_raw_fx_rates',
-                history_data[-1].get('_raw_fx_rate', history_data[-1].get('fx_rate', current_fx)),
+                history_tail[-1].get('_raw_fx_rate', history_tail[-1].get('fx_rate', current_fx)),
             )
             prev_fx_used = last_fx_used
 
@@ -711,6 +688,8 @@ class PortfolioCalculator:
         except Exception as e:
             logger.debug(f"Failed to add transaction symbols to candidates: {e}")
 
+        attribution = build_daily_attribution(df, pnl_base_date)
+
         daily_pnl_total_raw = 0.0
         daily_pnl_tw_raw = 0.0
         daily_pnl_us_raw = 0.0
@@ -738,24 +717,12 @@ class PortfolioCalculator:
                 effective_fx = self._get_effective_fx_rate(sym, last_fx_used)
                 prev_effective_fx = self._get_effective_fx_rate(sym, prev_fx_used)
 
-            sym_txs = df[(df['Symbol'] == sym) & (df['Date'].dt.date == pnl_base_date)]
-            buy_cost_twd = 0.0
-            sell_proceeds_twd = 0.0
-            div_income_twd = 0.0
-            buy_qty = 0.0
-            sell_qty = 0.0
-            
-            for _, r in sym_txs.iterrows():
-                if r['Type'] == 'BUY':
-                    cost_usd = (r['Qty'] * r['Price']) + r['Commission'] + r['Tax']
-                    buy_cost_twd += cost_usd * effective_fx
-                    buy_qty += r['Qty']
-                elif r['Type'] == 'SELL':
-                    proceeds_usd = (r['Qty'] * r['Price']) - r['Commission'] - r['Tax']
-                    sell_proceeds_twd += proceeds_usd * effective_fx
-                    sell_qty += r['Qty']
-                elif r['Type'] == 'DIV':
-                    div_income_twd += (r['Qty'] * r['Price']) * effective_fx
+            sym_flows = attribution_row(attribution, sym)
+            buy_cost_twd = sym_flows['buy_cost_native'] * effective_fx
+            sell_proceeds_twd = sym_flows['sell_proceeds_native'] * effective_fx
+            div_income_twd = sym_flows['dividend_native'] * effective_fx
+            buy_qty = sym_flows['buy_qty']
+            sell_qty = sym_flows['sell_qty']
 
             end_qty = h['qty']
             begin_qty = end_qty - buy_qty + sell_qty
@@ -793,9 +760,7 @@ class PortfolioCalculator:
                     holding_daily_pnl += old_qty_retained * (curr_p * effective_fx - prev_p * prev_effective_fx)
                 
                 if new_qty_retained > 0:
-                    buy_txs = sym_txs[sym_txs['Type'] == 'BUY'
-                    ]
-                    buy_cost_usd_total = (buy_txs['Qty'] * buy_txs['Price'] + buy_txs['Commission'] + buy_txs['Tax']).sum() if not buy_txs.empty else 0.0
+                    buy_cost_usd_total = sym_flows['buy_cost_native']
                     avg_buy_price = buy_cost_usd_total / buy_qty if buy_qty > 0 else curr_p
                     holding_daily_pnl += new_qty_retained * (curr_p - avg_buy_price) * effective_fx
 
@@ -809,13 +774,8 @@ class PortfolioCalculator:
                 # non-TWD securities, not only USD securities.
                 daily_pnl_us_raw += (total_daily_pnl - fx_pnl_contribution)
 
-            try:
-                if (not h.get('tag')) and (not sym_txs.empty):
-                    tags = sym_txs['Tag'].dropna()
-                    if not tags.empty:
-                        h['tag'] = tags.iloc[0]
-            except Exception as e:
-                logger.debug(f"Failed to get tag for {sym}: {e}")
+            if (not h.get('tag')) and sym_flows['base_date_rows'] > 0 and not pd.isna(sym_flows['first_tag']):
+                h['tag'] = sym_flows['first_tag']
 
             cost = h['cost_basis_twd']
             current_holdings_cost_sum += cost
@@ -840,9 +800,9 @@ class PortfolioCalculator:
         final_holdings.sort(key=lambda x: x.market_value_twd, reverse=True)
         
         daily_pnl_formula_twd = None
-        if len(history_data) >= 2:
-            last_day = history_data[-1]
-            prev_day = history_data[-2]
+        if len(history_tail) >= 2:
+            last_day = history_tail[-1]
+            prev_day = history_tail[-2]
             daily_pnl_formula_twd = (
                 (last_day.get('_raw_total_value', last_day.get('total_value', 0)) - 
                  prev_day.get('_raw_total_value', prev_day.get('total_value', 0))) +
@@ -859,10 +819,10 @@ class PortfolioCalculator:
             )
         self.validator.validate_daily_balance(holdings, invested_capital, current_holdings_cost_sum)
 
-        xirr_terminal_date = history_data[-1]['date'] if history_data else None
+        xirr_terminal_date = history_tail[-1]['date'] if history_tail else None
         xirr_terminal_value_raw = (
-            float(history_data[-1].get('_raw_total_value', last_market_value_twd))
-            if history_data
+            float(history_tail[-1].get('_raw_total_value', last_market_value_twd))
+            if history_tail
             else 0.0
         )
         xirr_metric = calculate_xirr_metric(
@@ -889,8 +849,8 @@ class PortfolioCalculator:
         
         daily_pnl_base_value = None
         daily_pnl_roi_percent = None
-        if len(history_data) >= 2:
-            prev_day_data = history_data[-2]  
+        if len(history_tail) >= 2:
+            prev_day_data = history_tail[-2]  
             daily_pnl_base_value = prev_day_data.get('total_value', 0)
             if daily_pnl_base_value and daily_pnl_base_value > 0:
                 daily_pnl_roi_percent = round((display_daily_pnl / daily_pnl_base_value) * 100, 2)
@@ -899,7 +859,7 @@ class PortfolioCalculator:
             total_value=round(current_total_value, 0),
             invested_capital=round(current_invested, 0),
             total_pnl=round(current_total_pnl, 0),
-            twr=history_data[-1]['twr'] if history_data else 0,
+            twr=history_tail[-1]['twr'] if history_tail else 0,
             twr_status=twr_reliability.status,
             twr_reason=twr_reliability.reason,
             twr_invalid_since=twr_reliability.invalid_since,
@@ -909,7 +869,20 @@ class PortfolioCalculator:
             xirr_asof_date=xirr_metric.asof_date,
             xirr_cashflow_conventional=xirr_metric.cashflow_conventional,
             realized_pnl=round(total_realized_pnl_twd, 0),
-            benchmark_twr=history_data[-1]['benchmark_twr'] if history_data else 0,
+            benchmark_twr=history_tail[-1]['benchmark_twr'] if history_tail else 0,
+            risk_status=risk_metrics.status,
+            risk_reason=risk_metrics.reason,
+            risk_periods=risk_metrics.periods,
+            volatility_percent=risk_metrics.volatility_percent,
+            rolling_volatility_percent=risk_metrics.rolling_volatility_percent,
+            max_drawdown_percent=risk_metrics.max_drawdown_percent,
+            max_drawdown_peak_date=risk_metrics.max_drawdown_peak_date,
+            max_drawdown_trough_date=risk_metrics.max_drawdown_trough_date,
+            sharpe_ratio=risk_metrics.sharpe_ratio,
+            sortino_ratio=risk_metrics.sortino_ratio,
+            beta=risk_metrics.beta,
+            correlation=risk_metrics.correlation,
+            tracking_error_percent=risk_metrics.tracking_error_percent,
             daily_pnl_twd=round(display_daily_pnl, 0),
             daily_pnl_breakdown=(
                 {
@@ -926,14 +899,32 @@ class PortfolioCalculator:
             daily_pnl_base_value=round(daily_pnl_base_value, 0) if daily_pnl_base_value else None
         )
         
-        self.validator.validate_twr_calculation(history_data)
+        self.validator.validate_twr_calculation(history_columns)
         if pnl_deviation <= 5:
             self.validator.validate_daily_pnl_breakdown(
                 display_daily_pnl, daily_pnl_tw_raw, daily_pnl_us_raw, daily_pnl_fx_raw
             )
         
-        return PortfolioGroupData(
-            summary=summary, holdings=final_holdings, history=history_data,
+        end_state = GroupEndState(
+            base_date=pnl_base_date,
+            prev_date=pnl_prev_date,
+            symbols=tuple(sorted(set(df['Symbol'].astype(str).str.upper()))),
+            attribution=attribution,
+            confirmed_dividends=frozenset(confirmed_dividends),
+            valuations={
+                (sym, value_date): valuation
+                for value_date, day_valuations in recent_valuations
+                for sym, valuation in day_valuations.items()
+            },
+            valuation_current_fx=current_fx,
+            fx_context_aware=hasattr(self.market, 'get_fx_snapshot'),
+        )
+
+        return PortfolioGroupData.from_history_columns(
+            history_columns,
+            end_state=end_state,
+            summary=summary, holdings=final_holdings,
             pending_dividends=[DividendRecord(**d) for d in dividend_history if d['status']=='pending'],
             anomalies=anomalies,
+            period_returns=period_returns,
         )
@@ -9,6 +9,12 @@ An opening balance is a baseline state, not a movement.  Earlier movements are
 retained as audit evidence but are absorbed by the baseline.  A movement on the
 same calendar date as the opening balance is intentionally ambiguous because
 R2.3 stores only ``event_date`` and R2.2 transaction chronology is not activated.
+
+Transaction frames are normalized column-wise.  Amounts are exact int64
+micro-units per currency and per-currency sums run on those integers.  A value
+that is not exact in micro-units, a product or sum that could overflow int64, or
+a frame the column path cannot validate falls back to the original per-row
+``Decimal`` derivation, so the report is identical.
 """
 
 from __future__ import annotations
@@ -21,6 +27,7 @@ from numbers import Number
 import re
 from typing import Any, Iterable, Mapping, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -32,6 +39,13 @@ SUPPORTED_CASH_EVENT_TYPES = frozenset({
 })
 CASH_CURRENCY_RE = re.compile(r"^[A-Z]{3}$")
 DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+MICRO_UNITS = 10 ** 6
+AMOUNT_EXPONENT = -6
+# Inputs stay below 2**53 micro-units so float64 holds them exactly; products,
+# amounts and sums stay below 2**62 so int64 arithmetic cannot wrap.
+_EXACT_FLOAT_LIMIT = float(2 ** 53)
+_INT64_AMOUNT_LIMIT = float(2 ** 62)
+_INT64_MAX = 2 ** 63 - 1
 
 
 class ShadowCashLedgerError(RuntimeError):
@@ -123,15 +137,18 @@ def build_shadow_cash_ledger(
     denomination and R2.4A has no reviewed settlement-normalization rule.
     """
 
-    tx_entries, tx_issues, tx_rows, resolved_tx_rows = _normalize_transactions(
+    tx_entries, tx_units, tx_issues, tx_rows, resolved_tx_rows = _normalize_transactions(
         transactions_df
     )
     cash_entries, cash_rows = _normalize_cash_events(cash_events)
+    cash_units = [_amount_units(entry.amount) for entry in cash_entries]
 
-    entries = tuple(sorted(
-        (*tx_entries, *cash_entries),
-        key=_entry_sort_key,
-    ))
+    ordered = sorted(
+        zip((*tx_entries, *cash_entries), (*tx_units, *cash_units)),
+        key=lambda pair: _entry_sort_key(pair[0]),
+    )
+    entries = tuple(entry for entry, _ in ordered)
+    units = [amount_units for _, amount_units in ordered]
     issues = list(tx_issues)
 
     if not entries and not issues:
@@ -144,7 +161,7 @@ def build_shadow_cash_ledger(
             detail="No authoritative cash facts are available; cash cannot be assumed to be zero.",
         ))
 
-    summaries, coverage_issues = _summarize_currencies(entries)
+    summaries, coverage_issues = _summarize_currencies(entries, units)
     issues.extend(coverage_issues)
     issues.sort(key=_issue_sort_key)
 
@@ -161,7 +178,13 @@ def build_shadow_cash_ledger(
 
 def _normalize_transactions(
     transactions_df: pd.DataFrame,
-) -> tuple[list[ShadowCashLedgerEntry], list[ShadowCashLedgerIssue], int, int]:
+) -> tuple[
+    list[ShadowCashLedgerEntry],
+    list[Optional[int]],
+    list[ShadowCashLedgerIssue],
+    int,
+    int,
+]:
     if not isinstance(transactions_df, pd.DataFrame):
         raise ShadowCashLedgerInputError("transaction ledger must be a DataFrame")
 
@@ -175,9 +198,235 @@ def _normalize_transactions(
         )
 
     if transactions_df.empty:
-        return [], [], 0, 0
+        return [], [], [], 0, 0
 
     ids = _normalize_unique_ids(transactions_df["id"], "transaction")
+    columns = _transaction_columns(transactions_df)
+    if columns is None:
+        # The per-row path owns every input error message and its precedence.
+        entries, issues, resolved = _normalize_transaction_rows(transactions_df, ids)
+        return entries, [None] * len(entries), issues, len(transactions_df), resolved
+
+    dates, types, quantities, prices, commissions, taxes = columns
+    currencies, currency_valid = _transaction_currencies(transactions_df["currency"])
+    entries: list[ShadowCashLedgerEntry] = []
+    entry_units: list[Optional[int]] = []
+    issues: list[ShadowCashLedgerIssue] = []
+
+    raw_currencies = transactions_df["currency"].tolist()
+    for position in np.flatnonzero(~currency_valid).tolist():
+        issues.append(_transaction_currency_issue(
+            raw_currencies[position],
+            source_id=ids[position],
+            date=dates[position],
+        ))
+
+    qty_units, qty_exact = _micro_units(quantities)
+    price_units, price_exact = _micro_units(prices)
+    commission_units, commission_exact = _micro_units(np.abs(commissions))
+    tax_units, tax_exact = _micro_units(np.abs(taxes))
+    fees_units = commission_units + tax_units
+
+    is_buy = types == "BUY"
+    is_div = types == "DIV"
+    unresolved_div = currency_valid & is_div & ((commissions != 0) | (taxes != 0))
+    for position in np.flatnonzero(unresolved_div).tolist():
+        issues.append(ShadowCashLedgerIssue(
+            code="DIVIDEND_ECONOMICS_UNRESOLVED",
+            source="TRANSACTION",
+            source_id=ids[position],
+            date=dates[position],
+            currency=currencies[position],
+            detail=(
+                "DIV cash is only authoritative when Price already represents the "
+                "net cash amount and Commission/Tax are zero."
+            ),
+        ))
+
+    resolved = currency_valid & ~unresolved_div
+    # qty * price in micro-units is whole * price + fraction * price / 10**6; the
+    # fractional product must divide evenly and every term must fit int64.
+    whole_qty, fraction_qty = np.divmod(qty_units, MICRO_UNITS)
+    fraction_product = fraction_qty * price_units
+    price_float = price_units.astype(np.float64)
+    magnitude = (
+        whole_qty.astype(np.float64) * price_float
+        + fraction_qty.astype(np.float64) * price_float
+        + fees_units.astype(np.float64)
+    )
+    fixed = (
+        qty_exact & price_exact & commission_exact & tax_exact
+        & (magnitude < _INT64_AMOUNT_LIMIT)
+        & (fraction_product % MICRO_UNITS == 0)
+    )
+    gross_units = np.where(
+        fixed,
+        whole_qty * price_units + fraction_product // MICRO_UNITS,
+        0,
+    )
+    fee_amount_units = np.where(fixed & ~is_div, fees_units, 0)
+    amount_units = np.where(
+        is_buy,
+        -(gross_units + fee_amount_units),
+        gross_units - fee_amount_units,
+    )
+
+    rows = np.flatnonzero(resolved)
+    for position, txn_type, is_fixed, units in zip(
+        rows.tolist(),
+        types[rows].tolist(),
+        fixed[rows].tolist(),
+        amount_units[rows].tolist(),
+    ):
+        if is_fixed:
+            amount = _units_to_decimal(units)
+        else:
+            # Inexact in micro-units or able to overflow int64: exact Decimal path.
+            units = None
+            amount = _transaction_amount(
+                txn_type,
+                _decimal(quantities[position], f"transaction {ids[position]} quantity"),
+                _decimal(prices[position], f"transaction {ids[position]} price"),
+                abs(_decimal(commissions[position], f"transaction {ids[position]} commission")),
+                abs(_decimal(taxes[position], f"transaction {ids[position]} tax")),
+            )
+        entries.append(ShadowCashLedgerEntry(
+            date=dates[position],
+            currency=currencies[position],
+            source="TRANSACTION",
+            source_id=ids[position],
+            event_type=txn_type,
+            amount=amount,
+            baseline=False,
+        ))
+        entry_units.append(units)
+
+    return entries, entry_units, issues, len(transactions_df), len(rows)
+
+
+def _transaction_columns(
+    transactions_df: pd.DataFrame,
+) -> Optional[tuple[list[str], np.ndarray, Any, Any, Any, Any]]:
+    """Return validated column arrays, or ``None`` when a row needs the row path.
+
+    Anything the per-row path would reject, or would coerce through ``str()``,
+    returns ``None`` so that path raises its own error.  Numeric columns come back
+    as finite float64 arrays.
+    """
+    raw_dates = transactions_df["Date"]
+    if not pd.api.types.is_datetime64_any_dtype(raw_dates.dtype) or raw_dates.isna().any():
+        return None
+    if isinstance(raw_dates.dtype, pd.DatetimeTZDtype):
+        raw_dates = raw_dates.dt.tz_localize(None)
+    days = raw_dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    dates = np.datetime_as_string(days, unit="D").tolist()
+
+    raw_types = transactions_df["Type"]
+    if pd.api.types.infer_dtype(raw_types, skipna=False) != "string":
+        return None
+    codes, labels = pd.factorize(raw_types)
+    normalized_labels = np.asarray([label.strip().upper() for label in labels], dtype=object)
+    if not set(normalized_labels.tolist()) <= SUPPORTED_TRANSACTION_TYPES:
+        return None
+    types = normalized_labels[codes]
+
+    numeric = []
+    for column in ("Qty", "Price", "Commission", "Tax"):
+        values = _finite_float_column(transactions_df[column])
+        if values is None:
+            return None
+        numeric.append(values)
+    quantities, prices, commissions, taxes = numeric
+    if not (quantities > 0).all() or not (prices >= 0).all():
+        return None
+    return dates, types, quantities, prices, commissions, taxes
+
+
+def _finite_float_column(values: pd.Series) -> Optional[np.ndarray]:
+    kind = values.dtype.kind
+    if kind == "f" and values.dtype.itemsize == 8:
+        array = values.to_numpy()
+    elif kind in "iu":
+        array = values.to_numpy(dtype=np.float64)
+        if (np.abs(array) >= _EXACT_FLOAT_LIMIT / MICRO_UNITS).any():
+            return None
+    else:
+        return None
+    if not np.isfinite(array).all():
+        return None
+    return array
+
+
+def _transaction_currencies(values: pd.Series) -> tuple[list[Optional[str]], np.ndarray]:
+    """Return stripped currencies and the rows whose currency is a cash currency."""
+    codes, labels = pd.factorize(values)
+    normalized = [str(label).strip() for label in labels]
+    label_valid = np.asarray(
+        [bool(CASH_CURRENCY_RE.fullmatch(value)) for value in normalized],
+        dtype=bool,
+    )
+    valid = np.zeros(len(codes), dtype=bool)
+    present = codes >= 0
+    valid[present] = label_valid[codes[present]]
+    currencies = [None if code < 0 else normalized[code] for code in codes.tolist()]
+    return currencies, valid
+
+
+def _micro_units(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return int64 micro-units and the mask of values they represent exactly.
+
+    A float is exact when it is the nearest float to ``units / 10**6``; below
+    ``2**53`` micro-units that decimal is also its shortest ``repr``, which is
+    what ``Decimal(str(value))`` parses on the row path.
+    """
+    with np.errstate(over="ignore", invalid="ignore"):
+        scaled = np.rint(values * MICRO_UNITS)
+        exact = (np.abs(scaled) < _EXACT_FLOAT_LIMIT) & (scaled / MICRO_UNITS == values)
+    return np.where(exact, scaled, 0).astype(np.int64), exact
+
+
+def _units_to_decimal(units: int) -> Decimal:
+    return Decimal(units).scaleb(AMOUNT_EXPONENT)
+
+
+def _amount_units(amount: Decimal) -> Optional[int]:
+    """Return ``amount`` in exact int64 units, or ``None`` when it has no such form."""
+    sign, digits, exponent = amount.as_tuple()
+    if not isinstance(exponent, int):
+        return None
+    coefficient = int("".join(map(str, digits))) if digits else 0
+    shift = exponent - AMOUNT_EXPONENT
+    if shift >= 0:
+        units = coefficient * 10 ** shift
+    else:
+        units, remainder = divmod(coefficient, 10 ** -shift)
+        if remainder:
+            return None
+    if units > _INT64_MAX:
+        return None
+    return -units if sign else units
+
+
+def _transaction_amount(
+    txn_type: str,
+    qty: Decimal,
+    price: Decimal,
+    commission: Decimal,
+    tax: Decimal,
+) -> Decimal:
+    if txn_type == "BUY":
+        return -(qty * price + commission + tax)
+    if txn_type == "SELL":
+        # Cash follows the persisted trade economics, not the holdings engine's
+        # compatibility oversell clamp.  A recorded SELL is an actual cash fact.
+        return qty * price - commission - tax
+    return qty * price  # confirmed DIV record
+
+
+def _normalize_transaction_rows(
+    transactions_df: pd.DataFrame,
+    ids: list[int],
+) -> tuple[list[ShadowCashLedgerEntry], list[ShadowCashLedgerIssue], int]:
     entries: list[ShadowCashLedgerEntry] = []
     issues: list[ShadowCashLedgerIssue] = []
     resolved = 0
@@ -232,14 +481,7 @@ def _normalize_transactions(
             ))
             continue
 
-        if txn_type == "BUY":
-            amount = -(qty * price + commission + tax)
-        elif txn_type == "SELL":
-            # Cash follows the persisted trade economics, not the holdings engine's
-            # compatibility oversell clamp.  A recorded SELL is an actual cash fact.
-            amount = qty * price - commission - tax
-        else:  # confirmed DIV record
-            amount = qty * price
+        amount = _transaction_amount(txn_type, qty, price, commission, tax)
 
         entries.append(ShadowCashLedgerEntry(
             date=date,
@@ -252,7 +494,7 @@ def _normalize_transactions(
         ))
         resolved += 1
 
-    return entries, issues, len(transactions_df), resolved
+    return entries, issues, resolved
 
 
 def _normalize_cash_events(
@@ -334,24 +576,27 @@ def _normalize_cash_events(
 
 def _summarize_currencies(
     entries: tuple[ShadowCashLedgerEntry, ...],
+    units: list[Optional[int]],
 ) -> tuple[list[ShadowCashCurrencySummary], list[ShadowCashLedgerIssue]]:
     summaries: list[ShadowCashCurrencySummary] = []
     issues: list[ShadowCashLedgerIssue] = []
-    currencies = sorted({entry.currency for entry in entries})
+    by_currency: dict[str, list[tuple[ShadowCashLedgerEntry, Optional[int]]]] = {}
+    for entry, amount_units in zip(entries, units):
+        by_currency.setdefault(entry.currency, []).append((entry, amount_units))
 
-    for currency in currencies:
-        currency_entries = [entry for entry in entries if entry.currency == currency]
-        openings = [entry for entry in currency_entries if entry.baseline]
+    for currency in sorted(by_currency):
+        currency_entries = by_currency[currency]
+        openings = [entry for entry, _ in currency_entries if entry.baseline]
         if len(openings) > 1:
             # Normally prevented while normalizing cash events, retained as an invariant.
             raise ShadowCashLedgerInputError(
                 f"multiple opening balances exist for {currency}"
             )
-        movements = [entry for entry in currency_entries if not entry.baseline]
-        net_all = sum((entry.amount for entry in movements), Decimal("0"))
+        movements = [pair for pair in currency_entries if not pair[0].baseline]
+        net_all = _sum_amounts(movements)
 
         if not openings:
-            earliest = min((entry.date for entry in movements), default=None)
+            earliest = min((entry.date for entry, _ in movements), default=None)
             issues.append(ShadowCashLedgerIssue(
                 code="MISSING_OPENING_BALANCE",
                 source="CURRENCY",
@@ -377,10 +622,10 @@ def _summarize_currencies(
             continue
 
         opening = openings[0]
-        before = [entry for entry in movements if entry.date < opening.date]
-        same_day = [entry for entry in movements if entry.date == opening.date]
-        after = [entry for entry in movements if entry.date > opening.date]
-        movement_since = sum((entry.amount for entry in after), Decimal("0"))
+        before = [pair for pair in movements if pair[0].date < opening.date]
+        same_day = [pair for pair in movements if pair[0].date == opening.date]
+        after = [pair for pair in movements if pair[0].date > opening.date]
+        movement_since = _sum_amounts(after)
 
         if same_day:
             issues.append(ShadowCashLedgerIssue(
@@ -416,6 +661,16 @@ def _summarize_currencies(
     return summaries, issues
 
 
+def _sum_amounts(pairs: list[tuple[ShadowCashLedgerEntry, Optional[int]]]) -> Decimal:
+    """Sum entry amounts in int64 units, or in Decimal when that could be inexact."""
+    units = [amount_units for _, amount_units in pairs]
+    if units and None not in units:
+        array = np.fromiter(units, dtype=np.int64, count=len(units))
+        if float(np.abs(array).max()) * len(array) < _INT64_AMOUNT_LIMIT:
+            return _units_to_decimal(int(array.sum()))
+    return sum((entry.amount for entry, _ in pairs), Decimal("0"))
+
+
 def _transaction_currency_issue(
     raw_currency: Any,
     *,
@@ -464,6 +719,13 @@ def _transaction_currency_issue(
 
 
 def _normalize_unique_ids(values: Iterable[Any], label: str) -> list[int]:
+    if isinstance(values, pd.Series) and values.dtype.kind in "iu":
+        array = values.to_numpy()
+        if (array <= 0).any():
+            raise ShadowCashLedgerInputError(f"{label} id must be a positive integer")
+        if len(pd.unique(array)) != len(array):
+            raise ShadowCashLedgerInputError(f"{label} ids must be unique")
+        return array.tolist()
     ids = []
     for raw in values:
         if isinstance(raw, bool):
@@ -0,0 +1,235 @@
+"""Per-symbol Daily P&L attribution inputs shared by calculator and reconciler.
+
+Both the calculator's final Daily P&L block and the canonical reconciler need,
+for every symbol, the base-date buy/sell/dividend cash flows and the quantity
+held before and after the base date. This module derives all of them from one
+ordered pass over the ledger plus a single grouped aggregation of base-date rows,
+instead of filtering and replaying the ledger once per symbol.
+
+Amounts are kept in the symbol's native currency; callers apply their own
+valuation or cash-flow FX.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+
+QTY_EPSILON = 1e-9
+
+ATTRIBUTION_COLUMNS = (
+    "begin_qty",
+    "end_qty",
+    "buy_qty",
+    "sell_qty",
+    "executed_sell_qty",
+    "buy_cost_native",
+    "buy_fee_tax_native",
+    "sell_proceeds_native",
+    "executed_sell_proceeds_native",
+    "executed_sell_fee_tax_native",
+    "dividend_native",
+    "base_date_rows",
+    "first_tag",
+)
+
+_TRANSACTION_PRIORITY = {"BUY": 1, "DIV": 2, "SELL": 3}
+
+
+@dataclass(frozen=True)
+class GroupEndState:
+    """Compact calculator state consumed by the canonical Daily P&L reconciler.
+
+    ``attribution`` is the table built by :func:`build_daily_attribution` for the
+    group ledger and base date, so it already holds begin/end quantities and
+    executed SELL quantities after the oversell clamp. ``valuations`` keeps the
+    ``(price, fx)`` pairs the calculator used for symbols held at the close of
+    ``prev_date`` and ``base_date``.
+    """
+
+    base_date: date
+    prev_date: Optional[date]
+    symbols: tuple[str, ...]
+    attribution: pd.DataFrame
+    confirmed_dividends: frozenset[str]
+    valuations: Mapping[tuple[str, date], tuple[float, float]]
+    valuation_current_fx: float
+    fx_context_aware: bool
+
+    def valuation(
+        self,
+        symbol: str,
+        value_date: date,
+        current_fx: float,
+    ) -> Optional[tuple[float, float]]:
+        """Return the recorded price/FX if it is valid for ``current_fx``.
+
+        Currency-aware market clients ignore the scalar fallback FX, so recorded
+        values are always reusable there. Legacy scalar clients may value today's
+        foreign holdings with it, so a different fallback FX forces a re-query.
+        """
+        if not self.fx_context_aware and current_fx != self.valuation_current_fx:
+            return None
+        return self.valuations.get((symbol, value_date))
+
+
+def ordered_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Use the exact intraday precedence used by PortfolioCalculator.
+
+    PortfolioCalculator sorts each valuation day's rows by Timestamp, Sequence,
+    and then BUY -> DIV -> SELL. The normalized input is already stable by id,
+    so id is retained only as the final deterministic tie-breaker.
+    """
+    if df.empty:
+        return df.copy(deep=False)
+    ordered = df.copy(deep=False)
+    ordered["_priority"] = ordered["Type"].map(_TRANSACTION_PRIORITY).fillna(99)
+    sort_columns = ["Date"]
+    if "Timestamp" in ordered.columns:
+        sort_columns.append("Timestamp")
+    if "Sequence" in ordered.columns:
+        sort_columns.append("Sequence")
+    sort_columns.append("_priority")
+    if "id" in ordered.columns:
+        sort_columns.append("id")
+    return ordered.sort_values(sort_columns, kind="stable").drop(
+        columns=["_priority"]
+    )
+
+
+def _replay_quantities(
+    ordered: pd.DataFrame,
+    base_day: pd.Timestamp,
+) -> tuple[dict[Any, float], dict[Any, float], np.ndarray]:
+    """Replay holdings through the base date with SELL clamped to available qty.
+
+    Returns begin qty (before the first base-date row), end qty, and the executed
+    quantity of every row in ``ordered`` order.
+    """
+    days = pd.to_datetime(ordered["Date"]).dt.normalize()
+    through_base = (days <= base_day).to_numpy()
+    on_base = (days == base_day).to_numpy()
+    types = ordered["Type"].astype(str).str.upper().tolist()
+    requested = ordered["Qty"].astype(float).to_numpy()
+    executed = requested.copy()
+
+    quantities: dict[Any, float] = {}
+    begin: dict[Any, float] = {}
+    for index, (symbol, txn_type, qty_requested) in enumerate(
+        zip(ordered["Symbol"].tolist(), types, requested.tolist())
+    ):
+        if not through_base[index]:
+            continue
+        qty = quantities.get(symbol, 0.0)
+        if on_base[index] and symbol not in begin:
+            begin[symbol] = qty
+
+        if txn_type == "BUY":
+            qty += qty_requested
+        elif txn_type == "SELL":
+            executed_qty = min(max(qty, 0.0), qty_requested)
+            qty -= executed_qty
+            if abs(qty) < QTY_EPSILON:
+                qty = 0.0
+            executed[index] = executed_qty
+        elif txn_type != "DIV":
+            raise ValueError(f"Unsupported transaction type {txn_type}")
+        quantities[symbol] = qty
+
+    return begin, quantities, executed
+
+
+def build_daily_attribution(df: pd.DataFrame, base_date: date) -> pd.DataFrame:
+    """Return one row per symbol with base-date attribution inputs.
+
+    ``sell_qty``/``sell_proceeds_native`` use requested quantities (the legacy
+    calculator view), while the ``executed_sell_*`` columns apply the same
+    available-quantity clamp and pro-rata fee/tax as the calculator's FIFO
+    replay. Symbols without base-date rows carry zero flows.
+    """
+    if df.empty:
+        return pd.DataFrame(
+            columns=list(ATTRIBUTION_COLUMNS),
+            index=pd.Index([], name="Symbol"),
+        )
+
+    base_day = pd.Timestamp(base_date).normalize()
+    ordered = ordered_transactions(df)
+    begin, end, executed = _replay_quantities(ordered, base_day)
+
+    on_base = (pd.to_datetime(ordered["Date"]).dt.normalize() == base_day).to_numpy()
+    rows = ordered.loc[on_base]
+    executed_qty = executed[on_base]
+    txn_type = rows["Type"].astype(str).str.upper().to_numpy()
+    qty = rows["Qty"].astype(float).to_numpy()
+    price = rows["Price"].astype(float).to_numpy()
+
+    def fee_column(name: str) -> np.ndarray:
+        if name not in rows.columns:
+            return np.zeros(len(rows))
+        return pd.to_numeric(rows[name], errors="coerce").fillna(0.0).abs().to_numpy()
+
+    fee = fee_column("Commission")
+    tax = fee_column("Tax")
+    is_buy = txn_type == "BUY"
+    is_sell = txn_type == "SELL"
+    is_div = txn_type == "DIV"
+    gross = qty * price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(qty > 0, executed_qty / qty, 0.0)
+    executed_fee = fee * ratio
+    executed_tax = tax * ratio
+
+    flows = pd.DataFrame(
+        {
+            "Symbol": rows["Symbol"].to_numpy(),
+            "buy_qty": np.where(is_buy, qty, 0.0),
+            "sell_qty": np.where(is_sell, qty, 0.0),
+            "executed_sell_qty": np.where(is_sell, executed_qty, 0.0),
+            "buy_cost_native": np.where(is_buy, gross + fee + tax, 0.0),
+            "buy_fee_tax_native": np.where(is_buy, fee + tax, 0.0),
+            "sell_proceeds_native": np.where(is_sell, gross - fee - tax, 0.0),
+            "executed_sell_proceeds_native": np.where(
+                is_sell,
+                executed_qty * price - executed_fee - executed_tax,
+                0.0,
+            ),
+            "executed_sell_fee_tax_native": np.where(
+                is_sell,
+                executed_fee + executed_tax,
+                0.0,
+            ),
+            "dividend_native": np.where(is_div, gross, 0.0),
+            "base_date_rows": 1,
+            "first_tag": rows["Tag"].to_numpy() if "Tag" in rows.columns else None,
+        }
+    )
+    grouped = flows.groupby("Symbol", sort=False)
+    table = grouped.sum(numeric_only=True)
+    table["first_tag"] = grouped["first_tag"].first()
+
+    symbols = pd.Index(pd.unique(ordered["Symbol"]), name="Symbol")
+    table = table.reindex(symbols)
+    numeric = [column for column in ATTRIBUTION_COLUMNS if column not in ("begin_qty", "end_qty", "first_tag")]
+    table[numeric] = table[numeric].fillna(0.0)
+    table["base_date_rows"] = table["base_date_rows"].astype(int)
+    table["end_qty"] = [float(end.get(symbol, 0.0)) for symbol in symbols]
+    table["begin_qty"] = [
+        float(begin.get(symbol, end.get(symbol, 0.0))) for symbol in symbols
+    ]
+    return table[list(ATTRIBUTION_COLUMNS)]
+
+
+def attribution_row(table: pd.DataFrame, symbol: Any) -> dict[str, Any]:
+    """Return a symbol's attribution values, or zero flows if it has no rows."""
+    if symbol in table.index:
+        return table.loc[symbol].to_dict()
+    row: dict[str, Any] = {column: 0.0 for column in ATTRIBUTION_COLUMNS}
+    row["base_date_rows"] = 0
+    row["first_tag"] = None
+    return row
@@ -11,19 +11,25 @@ from dataclasses import dataclass
 from datetime import date
 import logging
 import math
-from typing import Any, Dict, List, Optional, Tuple
+from typing import AbstractSet, Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
 from ..config import DEFAULT_FX_RATE
 from .currency_detector import CurrencyDetector
+from .daily_pnl_attribution import (
+    QTY_EPSILON,
+    GroupEndState,
+    attribution_row,
+    build_daily_attribution,
+)
 from .dividend_policy import reviewed_dividend_net_multiplier
 
 
 logger = logging.getLogger(__name__)
 
 RECONCILIATION_TOLERANCE_TWD = 2.0
-QTY_EPSILON = 1e-9
+RECONCILIATION_MODES = ("reuse", "independent")
 
 
 class DailyPnLReconciliationError(RuntimeError):
@@ -76,7 +82,7 @@ class SymbolDailyPnL:
 
 def _group_transactions(df: pd.DataFrame, group_name: str) -> pd.DataFrame:
     if group_name == "all":
-        return df.copy(deep=True)
+        return df.copy(deep=False)
 
     def contains_group(value: Any) -> bool:
         tags = [
@@ -85,37 +91,26 @@ def _group_transactions(df: pd.DataFrame, group_name: str) -> pd.DataFrame:
         ]
         return group_name in [tag for tag in tags if tag]
 
-    return df[df["Tag"].apply(contains_group)].copy(deep=True)
-
-
-def _ordered_transactions(df: pd.DataFrame) -> pd.DataFrame:
-    """Use the exact intraday precedence used by PortfolioCalculator.
-
-    PortfolioCalculator sorts each valuation day's rows by Timestamp, Sequence,
-    and then BUY -> DIV -> SELL. The normalized input is already stable by id,
-    so id is retained only as the final deterministic tie-breaker.
-    """
-    if df.empty:
-        return df.copy(deep=True)
-    ordered = df.copy(deep=True)
-    priority = {"BUY": 1, "DIV": 2, "SELL": 3}
-    ordered["_priority"] = ordered["Type"].map(priority).fillna(99)
-    sort_columns = ["Date"]
-    if "Timestamp" in ordered.columns:
-        sort_columns.append("Timestamp")
-    if "Sequence" in ordered.columns:
-        sort_columns.append("Sequence")
-    sort_columns.append("_priority")
-    if "id" in ordered.columns:
-        sort_columns.append("id")
-    return ordered.sort_values(sort_columns, kind="stable").drop(
-        columns=["_priority"]
-    )
+    return df[df["Tag"].apply(contains_group)]
 
 
 def _history_formula(
     group_data: Any,
 ) -> Tuple[Optional[float], Optional[date], Optional[date]]:
+    columns = getattr(group_data, "history_columns", None)
+    if columns is not None:
+        if len(columns) == 0:
+            return None, None, None
+        dates = columns.dates[-2:].astype(object).tolist()
+        if len(columns) < 2:
+            return None, dates[-1], None
+        total = (
+            float(columns.total_value[-1])
+            - float(columns.total_value[-2])
+            + float(columns.net_cashflow_twd[-1])
+        )
+        return total, dates[-1], dates[-2]
+
     history = list(group_data.history or [])
     if not history:
         return None, None, None
@@ -151,6 +146,7 @@ def _price_and_fx(
     calculator: Any,
     symbol: str,
     value_date: date,
+    end_state: Optional[GroupEndState] = None,
 ) -> Tuple[float, float]:
     current_fx = (
         float(getattr(calculator.market, "realtime_fx_rate", 0.0) or 0.0)
@@ -160,11 +156,19 @@ def _price_and_fx(
         or float(getattr(calculator, "current_fx", 0.0) or 0.0)
         or 1.0
     )
-    price, fx = calculator._get_asset_effective_price_and_fx(
-        symbol,
-        value_date,
-        current_fx,
+    recorded = (
+        end_state.valuation(symbol, value_date, current_fx)
+        if end_state is not None
+        else None
     )
+    if recorded is not None:
+        price, fx = recorded
+    else:
+        price, fx = calculator._get_asset_effective_price_and_fx(
+            symbol,
+            value_date,
+            current_fx,
+        )
     price = float(price)
     fx = float(fx)
     if not math.isfinite(price) or price < 0:
@@ -204,96 +208,38 @@ def _cashflow_fx(calculator: Any, symbol: str, value_date: date) -> float:
     return fx
 
 
-def _replay_symbol(
-    symbol_df: pd.DataFrame,
-    base_date: date,
-) -> Tuple[float, float, List[Tuple[pd.Series, float]]]:
-    """Return begin qty, end qty and executed base-date transaction rows."""
-    qty = 0.0
-    begin_qty: Optional[float] = None
-    executed_rows: List[Tuple[pd.Series, float]] = []
-
-    for _, row in _ordered_transactions(symbol_df).iterrows():
-        row_date = pd.to_datetime(row["Date"]).date()
-        if row_date > base_date:
-            continue
-        if row_date == base_date and begin_qty is None:
-            begin_qty = qty
-
-        txn_type = str(row["Type"]).upper()
-        requested_qty = float(row["Qty"])
-        executed_qty = requested_qty
-        if txn_type == "BUY":
-            qty += requested_qty
-        elif txn_type == "SELL":
-            executed_qty = min(max(qty, 0.0), requested_qty)
-            qty -= executed_qty
-            if abs(qty) < QTY_EPSILON:
-                qty = 0.0
-        elif txn_type != "DIV":
-            raise DailyPnLReconciliationError(
-                f"Unsupported transaction type {txn_type}"
-            )
-
-        if row_date == base_date:
-            executed_rows.append((row, executed_qty))
-
-    if begin_qty is None:
-        begin_qty = qty
-    return float(begin_qty), float(qty), executed_rows
-
-
 def _confirmed_dividend_keys(df: pd.DataFrame) -> set[str]:
-    keys: set[str] = set()
     div_rows = df[df["Type"] == "DIV"]
-    for _, row in div_rows.iterrows():
-        row_date = pd.to_datetime(row["Date"]).strftime("%Y-%m-%d")
-        keys.add(f"{row['Symbol']}_{row_date}")
-    return keys
+    if div_rows.empty:
+        return set()
+    row_dates = pd.to_datetime(div_rows["Date"]).dt.strftime("%Y-%m-%d")
+    return set((div_rows["Symbol"].astype(str) + "_" + row_dates).tolist())
 
 
 def _symbol_component(
     calculator: Any,
-    symbol_df: pd.DataFrame,
+    attribution: Dict[str, Any],
     symbol: str,
     base_date: date,
     prev_date: date,
-    confirmed_dividends: set[str],
+    confirmed_dividends: AbstractSet[str],
+    end_state: Optional[GroupEndState] = None,
 ) -> SymbolDailyPnL:
-    begin_qty, end_qty, executed_rows = _replay_symbol(symbol_df, base_date)
-    end_price, end_fx = _price_and_fx(calculator, symbol, base_date)
-    begin_price, begin_fx = _price_and_fx(calculator, symbol, prev_date)
+    begin_qty = float(attribution["begin_qty"])
+    end_qty = float(attribution["end_qty"])
+    end_price, end_fx = _price_and_fx(calculator, symbol, base_date, end_state)
+    begin_price, begin_fx = _price_and_fx(calculator, symbol, prev_date, end_state)
     cashflow_fx = _cashflow_fx(calculator, symbol, base_date)
 
-    buy_cost_twd = 0.0
-    sell_proceeds_twd = 0.0
-    dividend_income_twd = 0.0
-    fee_tax_total_twd = 0.0
-
-    for row, executed_qty in executed_rows:
-        txn_type = str(row["Type"]).upper()
-        requested_qty = float(row["Qty"])
-        fee = abs(float(row.get("Commission", 0.0) or 0.0))
-        tax = abs(float(row.get("Tax", 0.0) or 0.0))
-        if txn_type == "BUY":
-            buy_cost_twd += (
-                requested_qty * float(row["Price"]) + fee + tax
-            ) * cashflow_fx
-            fee_tax_total_twd += (fee + tax) * cashflow_fx
-        elif txn_type == "SELL":
-            ratio = executed_qty / requested_qty if requested_qty > 0 else 0.0
-            executed_fee = fee * ratio
-            executed_tax = tax * ratio
-            sell_proceeds_twd += (
-                executed_qty * float(row["Price"])
-                - executed_fee
-                - executed_tax
-            ) * cashflow_fx
-            fee_tax_total_twd += (executed_fee + executed_tax) * cashflow_fx
-        elif txn_type == "DIV":
-            dividend_income_twd += (
-                requested_qty * float(row["Price"]) * cashflow_fx
-            )
+    buy_cost_twd = float(attribution["buy_cost_native"]) * cashflow_fx
+    sell_proceeds_twd = (
+        float(attribution["executed_sell_proceeds_native"]) * cashflow_fx
+    )
+    dividend_income_twd = float(attribution["dividend_native"]) * cashflow_fx
+    fee_tax_total_twd = (
+        float(attribution["buy_fee_tax_native"]) * cashflow_fx
+        + float(attribution["executed_sell_fee_tax_native"]) * cashflow_fx
+    )
 
     dividend_key = f"{symbol}_{base_date.isoformat()}"
     market_dividend = float(
@@ -417,37 +363,63 @@ def reconcile_group_daily_pnl(
     adjusted_df: pd.DataFrame,
     calculator: Any,
     tolerance_twd: float = RECONCILIATION_TOLERANCE_TWD,
+    *,
+    independent: bool = False,
 ) -> Dict[str, Any]:
+    """Reconcile one group's Daily P&L components to its history formula.
+
+    By default the calculator's end-state record supplies quantities, base-date
+    flows and the prices/FX it already queried. ``independent=True`` ignores
+    that record and rebuilds everything from ``adjusted_df`` for audits.
+    """
     formula_total, base_date, prev_date = _history_formula(group_data)
     if base_date is None or prev_date is None or formula_total is None:
         group_data.day_ledger = []
         return {"group": group_name, "status": "insufficient-history"}
 
-    group_df = _group_transactions(adjusted_df, group_name)
-    if group_df.empty:
-        group_data.day_ledger = []
-        return {"group": group_name, "status": "empty"}
+    end_state = None if independent else getattr(group_data, "end_state", None)
+    if end_state is not None and (
+        end_state.base_date != base_date or end_state.prev_date != prev_date
+    ):
+        end_state = None
+
+    if end_state is not None:
+        if not end_state.symbols:
+            group_data.day_ledger = []
+            return {"group": group_name, "status": "empty"}
+        confirmed_dividends: AbstractSet[str] = end_state.confirmed_dividends
+        attribution = end_state.attribution
+        symbols = list(end_state.symbols)
+    else:
+        group_df = _group_transactions(adjusted_df, group_name)
+        if group_df.empty:
+            group_data.day_ledger = []
+            return {"group": group_name, "status": "empty"}
+
+        confirmed_dividends = _confirmed_dividend_keys(group_df)
+        try:
+            attribution = build_daily_attribution(group_df, base_date)
+        except ValueError as exc:
+            raise DailyPnLReconciliationError(str(exc)) from exc
+        symbols = sorted(set(group_df["Symbol"].astype(str).str.upper()))
 
-    confirmed_dividends = _confirmed_dividend_keys(group_df)
-    symbols = sorted(set(group_df["Symbol"].astype(str).str.upper()))
     components: List[SymbolDailyPnL] = []
     for symbol in symbols:
-        symbol_df = group_df[group_df["Symbol"] == symbol]
+        symbol_attribution = attribution_row(attribution, symbol)
         component = _symbol_component(
             calculator,
-            symbol_df,
+            symbol_attribution,
             symbol,
             base_date,
             prev_date,
             confirmed_dividends,
+            end_state,
         )
         if (
             abs(component.begin_qty) > QTY_EPSILON
             or abs(component.end_qty) > QTY_EPSILON
             or abs(component.total_pnl_twd) > 0.005
-            or not symbol_df[
-                symbol_df["Date"].dt.date == base_date
-            ].empty
+            or symbol_attribution["base_date_rows"] > 0
         ):
             components.append(component)
 
@@ -518,6 +490,8 @@ def reconcile_snapshot_daily_pnl(
     adjusted_df: pd.DataFrame,
     calculator: Any,
     tolerance_twd: float = RECONCILIATION_TOLERANCE_TWD,
+    *,
+    independent: bool = False,
 ) -> List[Dict[str, Any]]:
     """Reconcile every group and synchronize root compatibility fields."""
     if snapshot is None or not getattr(snapshot, "groups", None):
@@ -537,6 +511,7 @@ def reconcile_snapshot_daily_pnl(
                 adjusted_df,
                 calculator,
                 tolerance_twd=tolerance_twd,
+                independent=independent,
             )
         )
 
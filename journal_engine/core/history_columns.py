@@ -0,0 +1,221 @@
+"""Columnar (struct-of-arrays) portfolio history.
+
+The calculator appends one entry per valuation day. Keeping each field in its own
+column avoids building a 15+ key dict per day and lets downstream metrics operate
+on NumPy arrays. Only unrounded values are stored; the rounded display fields and
+the legacy ``_raw_*`` duplicates are produced once by :meth:`HistoryColumns.to_records`,
+which emits exactly the per-day dicts published in snapshot ``history``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+
+# Values that are stored unrounded and published rounded to whole TWD.
+WHOLE_TWD_COLUMNS = (
+    "total_value",
+    "invested",
+    "net_profit",
+    "realized_pnl",
+    "unrealized_pnl",
+)
+
+TWR_ANNOTATION_COLUMNS = (
+    "twr_period_status",
+    "twr_period_reason",
+    "twr_status",
+    "twr_reason",
+    "twr_invalid_since",
+)
+
+# Matches the previous-day threshold used by the calculator's daily P&L formula.
+PREVIOUS_VALUE_EPSILON = 1e-9
+
+
+@dataclass
+class HistoryColumns:
+    """Per-group valuation history stored as parallel arrays.
+
+    ``has_baseline`` marks that row 0 is the synthetic pre-first-trade baseline,
+    which is published with integer zero values and without ``_raw_*`` fields.
+    """
+
+    dates: np.ndarray
+    total_value: np.ndarray
+    invested: np.ndarray
+    net_profit: np.ndarray
+    realized_pnl: np.ndarray
+    unrealized_pnl: np.ndarray
+    twr_factor: np.ndarray
+    benchmark_twr: np.ndarray
+    fx_rate: np.ndarray
+    net_cashflow_twd: np.ndarray
+    fx_rates: list[Any]
+    has_baseline: bool = False
+    twr_annotations: Optional[dict[str, list[Optional[str]]]] = field(default=None)
+
+    def __len__(self) -> int:
+        return int(self.dates.shape[0])
+
+    def date_strings(self) -> list[str]:
+        return np.datetime_as_string(self.dates, unit="D").tolist()
+
+    @property
+    def twr_percent(self) -> np.ndarray:
+        return (self.twr_factor - 1.0) * 100.0
+
+    @property
+    def daily_pnl_formula_twd(self) -> np.ndarray:
+        previous = np.concatenate(([0.0], self.total_value[:-1]))
+        return np.where(
+            previous > PREVIOUS_VALUE_EPSILON,
+            self.total_value - previous + self.net_cashflow_twd,
+            self.total_value + self.net_cashflow_twd,
+        )
+
+    def published_twr(self) -> list[float]:
+        """Return the rounded ``twr`` values exactly as published per row."""
+        return [round(value, 2) for value in self.twr_percent.tolist()]
+
+    def to_records(self, start: int = 0) -> list[dict[str, Any]]:
+        """Emit the legacy list-of-dicts history used by the snapshot JSON.
+
+        ``start`` selects rows like a slice start, so ``to_records(-2)`` builds only
+        the last two days.
+        """
+        length = len(self)
+        rows = range(length)[start:]
+        if not rows:
+            return []
+
+        dates = self.date_strings()
+        # Whole-TWD rounding is exact under np.round (round-half-even on the binary
+        # value), so it matches Python's round(x, 0) and can be vectorized. Fractional
+        # digits keep Python's correctly-rounded round() for byte-identical output.
+        whole = {name: np.round(getattr(self, name), 0).tolist() for name in WHOLE_TWD_COLUMNS}
+        net_cashflow_rounded = np.round(self.net_cashflow_twd, 0).tolist()
+        formula_rounded = np.round(self.daily_pnl_formula_twd, 0).tolist()
+        twr = self.published_twr()
+        benchmark_twr = [round(value, 2) for value in self.benchmark_twr.tolist()]
+        fx_raw = self.fx_rate.tolist()
+        total_raw = self.total_value.tolist()
+        net_cashflow_raw = self.net_cashflow_twd.tolist()
+        annotations = self.twr_annotations
+
+        records = []
+        for index in rows:
+            if index == 0 and self.has_baseline:
+                record = {
+                    "date": dates[0], "total_value": 0,
+                    "invested": 0, "net_profit": 0, "realized_pnl": 0, "unrealized_pnl": 0,
+                    "twr": 0.0, "benchmark_twr": 0.0, "fx_rate": round(fx_raw[0], 4),
+                    "_raw_fx_rate": fx_raw[0],
+                    "_raw_fx_rates": self.fx_rates[0],
+                    "net_cashflow_twd": 0, "daily_pnl_formula_twd": 0,
+                }
+            else:
+                record = {
+                    "date": dates[index],
+                    "total_value": whole["total_value"][index],
+                    "invested": whole["invested"][index],
+                    "net_profit": whole["net_profit"][index],
+                    "realized_pnl": whole["realized_pnl"][index],
+                    "unrealized_pnl": whole["unrealized_pnl"][index],
+                    "twr": twr[index],
+                    "benchmark_twr": benchmark_twr[index],
+                    "fx_rate": round(fx_raw[index], 4),
+                    "_raw_fx_rate": fx_raw[index],
+                    "_raw_fx_rates": self.fx_rates[index],
+                    "net_cashflow_twd": net_cashflow_rounded[index],
+                    "_raw_total_value": total_raw[index],
+                    "_raw_net_cashflow_twd": net_cashflow_raw[index],
+                    "daily_pnl_formula_twd": formula_rounded[index],
+                }
+            if annotations is not None:
+                for name in TWR_ANNOTATION_COLUMNS:
+                    record[name] = annotations[name][index]
+            records.append(record)
+        return records
+
+
+class HistoryColumnsBuilder:
+    """Accumulate daily history values in plain lists, then freeze them as arrays."""
+
+    def __init__(self) -> None:
+        self._dates: list[str] = []
+        self._columns: dict[str, list[float]] = {
+            name: []
+            for name in (
+                *WHOLE_TWD_COLUMNS,
+                "benchmark_twr",
+                "fx_rate",
+                "net_cashflow_twd",
+            )
+        }
+        self._fx_rates: list[Any] = []
+        self._has_baseline = False
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def append_baseline(self, date_str: str, fx_rate: float, fx_rates: Any) -> None:
+        """Append the zero-valued row that precedes the first trade."""
+        if self._dates:
+            raise ValueError("History baseline must be the first row")
+        self._has_baseline = True
+        self.append_day(
+            date_str,
+            total_value=0.0,
+            invested=0.0,
+            net_profit=0.0,
+            realized_pnl=0.0,
+            unrealized_pnl=0.0,
+            benchmark_twr=0.0,
+            fx_rate=fx_rate,
+            fx_rates=fx_rates,
+            net_cashflow_twd=0.0,
+        )
+
+    def append_day(
+        self,
+        date_str: str,
+        *,
+        total_value: float,
+        invested: float,
+        net_profit: float,
+        realized_pnl: float,
+        unrealized_pnl: float,
+        benchmark_twr: float,
+        fx_rate: float,
+        fx_rates: Any,
+        net_cashflow_twd: float,
+    ) -> None:
+        columns = self._columns
+        self._dates.append(date_str)
+        columns["total_value"].append(total_value)
+        columns["invested"].append(invested)
+        columns["net_profit"].append(net_profit)
+        columns["realized_pnl"].append(realized_pnl)
+        columns["unrealized_pnl"].append(unrealized_pnl)
+        columns["benchmark_twr"].append(benchmark_twr)
+        columns["fx_rate"].append(fx_rate)
+        columns["net_cashflow_twd"].append(net_cashflow_twd)
+        self._fx_rates.append(fx_rates)
+
+    def build(self) -> HistoryColumns:
+        arrays = {
+            name: np.asarray(values, dtype=np.float64)
+            for name, values in self._columns.items()
+        }
+        return HistoryColumns(
+            dates=np.asarray(self._dates, dtype="datetime64[D]"),
+            # Filled by performance_metrics.link_twr_columns once all days exist.
+            twr_factor=np.ones(len(self._dates), dtype=np.float64),
+            fx_rates=list(self._fx_rates),
+            has_baseline=self._has_baseline,
+            **arrays,
+        )
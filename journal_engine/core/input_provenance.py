@@ -180,7 +180,7 @@ def _normalize_market_frame(symbol: str, frame: pd.DataFrame) -> list[dict[str,
     if normalized_index.duplicated().any():
         raise CalculationManifestError(f"{symbol} market index contains duplicate dates")
 
-    work = frame.copy()
+    work = frame.copy(deep=False)
     work.index = normalized_index
     work = work.sort_index()
 
@@ -167,7 +167,7 @@ def _normalize_ledger(transactions_df: pd.DataFrame) -> pd.DataFrame:
             f"transaction ledger is missing required columns: {', '.join(missing)}"
         )
 
-    normalized = transactions_df.copy(deep=True)
+    normalized = transactions_df.copy(deep=False)
     if "Tag" not in normalized.columns:
         normalized["Tag"] = ""
     normalized["Tag"] = normalized["Tag"].fillna("")
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
 import math
 from typing import Any, Callable, Iterable, Optional
 
+import numpy as np
 import pandas as pd
-from pyxirr import xirr as pyxirr_xirr
+
+from .history_columns import HistoryColumns
 
 
 MAX_SUPPORTED_ABS_XIRR_PERCENT = 1_000_000.0
@@ -124,6 +126,199 @@ def calculate_modified_dietz_metric(
     return ModifiedDietzMetric(value, "ok", None)
 
 
+TWR_PERIOD_STATUSES = ("ok", "not_applicable", "undefined")
+TWR_PERIOD_REASONS = (
+    None,
+    "baseline",
+    "invalid_valuation",
+    "invalid_cashflow",
+    "negative_beginning_value",
+    "non_finite_return",
+    "non_finite_denominator",
+    "zero_denominator",
+    "invalid_bootstrap_factor",
+    "unfunded_value_from_zero",
+    "no_capital_exposure",
+    "zero_exposure_with_cashflow",
+)
+_STATUS_CODE = {status: code for code, status in enumerate(TWR_PERIOD_STATUSES)}
+_REASON_CODE = {reason: code for code, reason in enumerate(TWR_PERIOD_REASONS)}
+
+
+@dataclass(frozen=True)
+class LinkedTwrChain:
+    """Vectorized per-period Modified Dietz results and their linked product.
+
+    ``period_returns`` and ``cumulative_factor`` reproduce the calculator's legacy
+    numeric TWR, where an unavailable period contributes a factor of 1.0. The
+    ``status_codes``/``reason_codes`` arrays index ``TWR_PERIOD_STATUSES`` and
+    ``TWR_PERIOD_REASONS`` and carry the validity semantics of
+    :func:`calculate_modified_dietz_metric` with a single midpoint-weighted flow.
+    """
+
+    period_returns: np.ndarray
+    period_factors: np.ndarray
+    cumulative_factor: np.ndarray
+    status_codes: np.ndarray
+    reason_codes: np.ndarray
+    first_invalid_index: Optional[int]
+
+
+def link_twr_chain(
+    beginning_values: Any,
+    ending_values: Any,
+    net_cashflows: Any,
+    *,
+    epsilon: float = 1e-9,
+) -> LinkedTwrChain:
+    """Evaluate every Modified Dietz period and the linked TWR chain in one pass.
+
+    ``net_cashflows`` uses the Dietz external-flow sign (contributions positive).
+    All daily flows carry the production midpoint weight of 0.5. Period 0 is
+    evaluated like any other period; callers with a baseline row pass a zero
+    beginning and ending value for it, which yields a neutral factor.
+    """
+    begin = np.asarray(beginning_values, dtype=np.float64)
+    end = np.asarray(ending_values, dtype=np.float64)
+    flow = np.asarray(net_cashflows, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        numerator = end - begin - flow
+        denominator = begin + 0.5 * flow
+        raw_returns = numerator / denominator
+        simple_returns = (end - begin) / begin
+        bootstrap = end / flow
+
+    has_flow = np.abs(flow) > epsilon
+    valuation_ok = np.isfinite(begin) & np.isfinite(end)
+    flow_ok = np.isfinite(flow)
+    exposed = begin > epsilon
+
+    # Legacy numeric chain: unavailable periods are neutral rather than 0% returns.
+    period_returns = np.where(
+        exposed & np.isfinite(raw_returns) & (np.abs(denominator) >= epsilon),
+        raw_returns,
+        0.0,
+    )
+    period_factors = np.where(
+        exposed,
+        1.0 + period_returns,
+        np.where((end > epsilon) & (flow > epsilon), bootstrap, 1.0),
+    )
+    period_factors = np.where(np.isfinite(period_factors), period_factors, 1.0)
+
+    # Validity classification, first matching rule wins.
+    dietz_returns = np.where(has_flow, raw_returns, simple_returns)
+    conditions = [
+        ~valuation_ok,
+        ~flow_ok,
+        begin < -epsilon,
+        exposed & has_flow & ~np.isfinite(denominator),
+        exposed & has_flow & (np.abs(denominator) < epsilon),
+        exposed & ~np.isfinite(dietz_returns),
+        exposed,
+        (end > epsilon) & (flow > epsilon) & np.isfinite(bootstrap) & (bootstrap >= 0.0),
+        (end > epsilon) & (flow > epsilon),
+        end > epsilon,
+        ~has_flow,
+    ]
+    outcomes = [
+        ("undefined", "invalid_valuation"),
+        ("undefined", "invalid_cashflow"),
+        ("undefined", "negative_beginning_value"),
+        ("undefined", "non_finite_denominator"),
+        ("undefined", "zero_denominator"),
+        ("undefined", "non_finite_return"),
+        ("ok", None),
+        ("ok", None),
+        ("undefined", "invalid_bootstrap_factor"),
+        ("undefined", "unfunded_value_from_zero"),
+        ("not_applicable", "no_capital_exposure"),
+    ]
+    status_codes = np.select(
+        conditions,
+        [_STATUS_CODE[status] for status, _ in outcomes],
+        default=_STATUS_CODE["undefined"],
+    ).astype(np.int8)
+    reason_codes = np.select(
+        conditions,
+        [_REASON_CODE[reason] for _, reason in outcomes],
+        default=_REASON_CODE["zero_exposure_with_cashflow"],
+    ).astype(np.int8)
+
+    invalid = np.flatnonzero(status_codes == _STATUS_CODE["undefined"])
+    return LinkedTwrChain(
+        period_returns=period_returns,
+        period_factors=period_factors,
+        cumulative_factor=np.cumprod(period_factors),
+        status_codes=status_codes,
+        reason_codes=reason_codes,
+        first_invalid_index=int(invalid[0]) if invalid.size else None,
+    )
+
+
+def _chain_annotations(
+    chain: LinkedTwrChain,
+    dates: list[Optional[str]],
+) -> tuple[dict[str, list[Optional[str]]], TwrReliability]:
+    """Expand period codes (row 0 is the baseline) into per-row TWR annotations."""
+    status_codes = chain.status_codes.copy()
+    reason_codes = chain.reason_codes.copy()
+    status_codes[0] = _STATUS_CODE["not_applicable"]
+    reason_codes[0] = _REASON_CODE["baseline"]
+
+    undefined = status_codes == _STATUS_CODE["undefined"]
+    undefined[0] = False
+    invalid_rows = np.flatnonzero(undefined)
+    first_invalid = int(invalid_rows[0]) if invalid_rows.size else len(dates)
+    ok_seen = np.logical_or.accumulate(status_codes == _STATUS_CODE["ok"])
+
+    row_index = np.arange(len(dates))
+    chain_status = np.where(
+        row_index >= first_invalid,
+        _STATUS_CODE["undefined"],
+        np.where(ok_seen, _STATUS_CODE["ok"], _STATUS_CODE["not_applicable"]),
+    )
+    invalid_reason = (
+        TWR_PERIOD_REASONS[reason_codes[first_invalid]] or "undefined_period"
+        if first_invalid < len(dates)
+        else None
+    )
+    invalid_since = dates[first_invalid] if first_invalid < len(dates) else None
+
+    statuses = [TWR_PERIOD_STATUSES[code] for code in chain_status.tolist()]
+    reasons: list[Optional[str]] = []
+    for status in statuses:
+        if status == "undefined":
+            reasons.append(invalid_reason)
+        elif status == "ok":
+            reasons.append(None)
+        else:
+            reasons.append("no_return_periods")
+
+    annotations = {
+        "twr_period_status": [TWR_PERIOD_STATUSES[code] for code in status_codes.tolist()],
+        "twr_period_reason": [TWR_PERIOD_REASONS[code] for code in reason_codes.tolist()],
+        "twr_status": statuses,
+        "twr_reason": reasons,
+        "twr_invalid_since": [
+            invalid_since if index >= first_invalid else None
+            for index in range(len(dates))
+        ],
+    }
+    return annotations, TwrReliability(statuses[-1], reasons[-1], annotations["twr_invalid_since"][-1])
+
+
+def _history_twr_chain(values: Any, published_net_cashflows: Any) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Derive period begin/end/Dietz-flow arrays from consecutive history rows."""
+    ending = np.asarray(values, dtype=np.float64)
+    beginning = np.concatenate(([0.0], ending[:-1]))
+    # History stores user-facing net cash flow with the opposite sign from the
+    # Dietz external-flow convention used by the calculator.
+    flows = -np.asarray(published_net_cashflows, dtype=np.float64)
+    return beginning, ending, flows
+
+
 def annotate_twr_history(
     history: list[dict[str, Any]],
     *,
@@ -140,94 +335,314 @@ def annotate_twr_history(
     if not history:
         return TwrReliability("not_applicable", "no_history", None)
 
-    chain_status = "not_applicable"
-    chain_reason: Optional[str] = "no_return_periods"
-    invalid_since: Optional[str] = None
+    def finite_or_nan(value: Any) -> float:
+        numeric = _finite_float(value)
+        return math.nan if numeric is None else numeric
+
+    chain = link_twr_chain(
+        *_history_twr_chain(
+            [
+                finite_or_nan(row.get("_raw_total_value", row.get("total_value", 0.0)))
+                for row in history
+            ],
+            [
+                finite_or_nan(
+                    row.get("_raw_net_cashflow_twd", row.get("net_cashflow_twd", 0.0))
+                )
+                for row in history
+            ],
+        ),
+        epsilon=epsilon,
+    )
+    annotations, reliability = _chain_annotations(
+        chain,
+        [str(row.get("date") or "") or None for row in history],
+    )
+    for index, row in enumerate(history):
+        for name, column in annotations.items():
+            row[name] = column[index]
+    return reliability
 
-    first = history[0]
-    first["twr_period_status"] = "not_applicable"
-    first["twr_period_reason"] = "baseline"
-    first["twr_status"] = chain_status
-    first["twr_reason"] = chain_reason
-    first["twr_invalid_since"] = None
 
-    for index in range(1, len(history)):
-        previous = history[index - 1]
-        current = history[index]
-        period_date = str(current.get("date") or "") or None
+def link_twr_columns(
+    history: HistoryColumns,
+    *,
+    epsilon: float = 1e-9,
+) -> TwrReliability:
+    """Fill ``twr_factor`` and TWR annotations of calculator history from one chain."""
+    if len(history) == 0:
+        return TwrReliability("not_applicable", "no_history", None)
+
+    chain = link_twr_chain(
+        *_history_twr_chain(history.total_value, history.net_cashflow_twd),
+        epsilon=epsilon,
+    )
+    history.twr_factor = chain.cumulative_factor
+    annotations, reliability = _chain_annotations(chain, history.date_strings())
+    history.twr_annotations = annotations
+    return reliability
+
+
+RISK_ANNUALIZATION_PERIODS = 252
+ROLLING_RISK_WINDOW = 63
 
-        beginning = _finite_float(
-            previous.get("_raw_total_value", previous.get("total_value", 0.0))
-        )
-        ending = _finite_float(
-            current.get("_raw_total_value", current.get("total_value", 0.0))
-        )
-        published_net_cashflow = _finite_float(
-            current.get(
-                "_raw_net_cashflow_twd",
-                current.get("net_cashflow_twd", 0.0),
-            )
-        )
 
-        if beginning is None or ending is None:
-            period_status = "undefined"
-            period_reason = "invalid_valuation"
-        elif published_net_cashflow is None:
-            period_status = "undefined"
-            period_reason = "invalid_cashflow"
-        elif beginning < -epsilon:
-            period_status = "undefined"
-            period_reason = "negative_beginning_value"
+@dataclass(frozen=True)
+class RiskMetrics:
+    """Whole-period and latest-window risk statistics of a linked TWR history.
+
+    Percent fields are annualized except drawdown; ratios are annualized and use a
+    zero risk-free rate. A statistic whose denominator is zero stays ``None``.
+    """
+
+    status: str
+    reason: Optional[str]
+    periods: int
+    volatility_percent: Optional[float] = None
+    rolling_volatility_percent: Optional[float] = None
+    max_drawdown_percent: Optional[float] = None
+    max_drawdown_peak_date: Optional[str] = None
+    max_drawdown_trough_date: Optional[str] = None
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+    beta: Optional[float] = None
+    correlation: Optional[float] = None
+    tracking_error_percent: Optional[float] = None
+
+
+def trailing_volatility(returns: Any, window: int = ROLLING_RISK_WINDOW) -> Optional[float]:
+    """Annualized sample volatility (fraction) of the last ``window`` returns.
+
+    Fewer than ``window`` returns, or a window shorter than two, give ``None``.
+    """
+    values = np.asarray(returns, dtype=np.float64)
+    if window < 2 or values.size < window:
+        return None
+    return float(values[-window:].std(ddof=1)) * math.sqrt(RISK_ANNUALIZATION_PERIODS)
+
+
+def _rounded(value: float, digits: int) -> Optional[float]:
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def calculate_risk_metrics(
+    history: HistoryColumns,
+    reliability: TwrReliability,
+    *,
+    window: int = ROLLING_RISK_WINDOW,
+) -> RiskMetrics:
+    """Derive risk statistics from the daily period returns of linked TWR history.
+
+    Returns start at the first ``ok`` TWR period; earlier rows carry no capital and
+    their neutral factors are not observations. The benchmark return of a period is
+    the ratio of consecutive ``1 + benchmark_twr / 100`` factors. An undefined TWR
+    chain yields ``undefined`` metrics instead of statistics of unreliable returns.
+    """
+    if reliability.status == "undefined":
+        return RiskMetrics("undefined", "twr_undefined", 0)
+
+    statuses = (history.twr_annotations or {}).get("twr_status") or []
+    first_ok = next((index for index, status in enumerate(statuses) if status == "ok"), None)
+    if first_ok is None:
+        return RiskMetrics("not_applicable", "no_return_periods", 0)
+
+    start = max(first_ok, 1)
+    factors = history.twr_factor[start - 1:]
+    benchmark_factors = 1.0 + history.benchmark_twr[start - 1:] / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = factors[1:] / factors[:-1] - 1.0
+        benchmark_returns = benchmark_factors[1:] / benchmark_factors[:-1] - 1.0
+    periods = int(returns.size)
+    if periods < 2 or not np.isfinite(returns).all():
+        return RiskMetrics("not_applicable", "insufficient_periods", periods)
+
+    annualizer = math.sqrt(RISK_ANNUALIZATION_PERIODS)
+    mean = float(returns.mean())
+    deviation = float(returns.std(ddof=1))
+    downside = float(np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2)))
+
+    running_peak = np.maximum.accumulate(factors)
+    drawdowns = factors / running_peak - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(factors[:trough + 1]))
+    dates = history.date_strings()[start - 1:]
+    has_drawdown = drawdowns[trough] < 0.0
+
+    beta = correlation = tracking_error = math.nan
+    if np.isfinite(benchmark_returns).all():
+        benchmark_deviation = float(benchmark_returns.std(ddof=1))
+        if benchmark_deviation > 0.0:
+            covariance = float(np.cov(returns, benchmark_returns, ddof=1)[0, 1])
+            beta = covariance / benchmark_deviation ** 2
+            if deviation > 0.0:
+                correlation = covariance / (deviation * benchmark_deviation)
+        tracking_error = float((returns - benchmark_returns).std(ddof=1)) * annualizer * 100.0
+
+    trailing = trailing_volatility(returns, window)
+    return RiskMetrics(
+        status="ok",
+        reason=None,
+        periods=periods,
+        volatility_percent=_rounded(deviation * annualizer * 100.0, 2),
+        rolling_volatility_percent=_rounded(trailing * 100.0, 2) if trailing is not None else None,
+        max_drawdown_percent=_rounded(float(drawdowns[trough]) * 100.0, 2),
+        max_drawdown_peak_date=dates[peak] if has_drawdown else None,
+        max_drawdown_trough_date=dates[trough] if has_drawdown else None,
+        sharpe_ratio=_rounded(mean / deviation * annualizer, 4) if deviation > 0.0 else None,
+        sortino_ratio=_rounded(mean / downside * annualizer, 4) if downside > 0.0 else None,
+        beta=_rounded(beta, 4),
+        correlation=_rounded(correlation, 4),
+        tracking_error_percent=_rounded(tracking_error, 2),
+    )
+
+
+STANDARD_PERIODS = ("1D", "1W", "MTD", "QTD", "YTD", "1Y", "3Y", "ITD")
+
+
+@dataclass(frozen=True)
+class PeriodPrefixes:
+    """Prefix arrays of one group's history for constant-time period queries.
+
+    ``twr_factor`` and ``benchmark_factor`` are cumulative growth factors, so a
+    period's return is the ratio of its end and base entries. ``net_cashflow_twd``
+    and ``undefined_periods`` are running sums of the published daily net cash flow
+    and of undefined TWR periods.
+    """
+
+    dates: np.ndarray
+    total_value: np.ndarray
+    twr_factor: np.ndarray
+    benchmark_factor: np.ndarray
+    net_cashflow_twd: np.ndarray
+    undefined_periods: np.ndarray
+
+
+@dataclass(frozen=True)
+class PeriodReturn:
+    """Performance from the close of ``start_date`` to the close of ``end_date``."""
+
+    start_date: str
+    end_date: str
+    twr_percent: Optional[float]
+    benchmark_twr_percent: Optional[float]
+    excess_twr_percent: Optional[float]
+    pnl_twd: float
+    net_cashflow_twd: float
+    twr_status: str
+
+
+def build_period_prefixes(history: HistoryColumns) -> PeriodPrefixes:
+    """Build prefix arrays from history whose ``twr_factor`` is already linked."""
+    period_statuses = (history.twr_annotations or {}).get("twr_period_status")
+    undefined = (
+        np.asarray([status == "undefined" for status in period_statuses], dtype=np.int64)
+        if period_statuses is not None
+        else np.zeros(len(history), dtype=np.int64)
+    )
+    return PeriodPrefixes(
+        dates=history.dates.astype("datetime64[D]"),
+        total_value=history.total_value,
+        twr_factor=history.twr_factor,
+        benchmark_factor=1.0 + history.benchmark_twr / 100.0,
+        net_cashflow_twd=np.cumsum(history.net_cashflow_twd),
+        undefined_periods=np.cumsum(undefined),
+    )
+
+
+def period_return(prefixes: PeriodPrefixes, start_index: int, end_index: int) -> PeriodReturn:
+    """Return the performance of rows ``(start_index, end_index]`` in O(1).
+
+    P&L follows ``daily_pnl_formula_twd``: value change plus the published net cash
+    flow, which carries the opposite sign of external contributions. TWR is
+    ``None`` when any period in the range is undefined.
+    """
+    if not 0 <= start_index <= end_index < len(prefixes.dates):
+        raise IndexError("period indexes are outside the history")
+    twr_defined = prefixes.undefined_periods[end_index] == prefixes.undefined_periods[start_index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        twr = (prefixes.twr_factor[end_index] / prefixes.twr_factor[start_index] - 1.0) * 100.0
+        benchmark = (
+            prefixes.benchmark_factor[end_index] / prefixes.benchmark_factor[start_index] - 1.0
+        ) * 100.0
+    net_cashflow = float(prefixes.net_cashflow_twd[end_index] - prefixes.net_cashflow_twd[start_index])
+    pnl = float(prefixes.total_value[end_index] - prefixes.total_value[start_index]) + net_cashflow
+    twr_percent = _rounded(float(twr), 2) if twr_defined else None
+    benchmark_percent = _rounded(float(benchmark), 2)
+    return PeriodReturn(
+        start_date=str(prefixes.dates[start_index]),
+        end_date=str(prefixes.dates[end_index]),
+        twr_percent=twr_percent,
+        benchmark_twr_percent=benchmark_percent,
+        excess_twr_percent=(
+            round(twr_percent - benchmark_percent, 2)
+            if twr_percent is not None and benchmark_percent is not None
+            else None
+        ),
+        pnl_twd=round(pnl, 0),
+        net_cashflow_twd=round(net_cashflow, 0),
+        twr_status="ok" if twr_percent is not None else "undefined",
+    )
+
+
+def query_period_return(prefixes: PeriodPrefixes, start_date: Any, end_date: Any) -> Optional[PeriodReturn]:
+    """Return performance between the last valuations on/before two dates.
+
+    Dates resolve by binary search, then the period itself is constant time.
+    ``None`` means no valuation exists on or before ``start_date``.
+    """
+    start, end = _normalize_date(start_date), _normalize_date(end_date)
+    if start > end:
+        raise ValueError("period start is after its end")
+    start_index, end_index = (
+        int(np.searchsorted(prefixes.dates, np.datetime64(value, "D"), side="right")) - 1
+        for value in (start, end)
+    )
+    if start_index < 0:
+        return None
+    return period_return(prefixes, start_index, end_index)
+
+
+def _standard_period_base(label: str, end: date) -> Optional[date]:
+    """Return the last calendar date before the period, or ``None`` for ITD/1D."""
+    if label == "1W":
+        return end - timedelta(days=7)
+    if label == "MTD":
+        return end.replace(day=1) - timedelta(days=1)
+    if label == "QTD":
+        return end.replace(month=3 * ((end.month - 1) // 3) + 1, day=1) - timedelta(days=1)
+    if label == "YTD":
+        return end.replace(month=1, day=1) - timedelta(days=1)
+    if label in ("1Y", "3Y"):
+        return (pd.Timestamp(end) - pd.DateOffset(years=int(label[0]))).date()
+    return None
+
+
+def standard_period_table(prefixes: PeriodPrefixes) -> list[dict[str, Any]]:
+    """Return the published 1D/1W/MTD/QTD/YTD/1Y/3Y/ITD rows ending at the last valuation.
+
+    ``coverage`` is ``since_inception`` when the history starts inside the period,
+    in which case the row measures from the first history row.
+    """
+    length = len(prefixes.dates)
+    if length < 2:
+        return []
+    end_index = length - 1
+    end = prefixes.dates[end_index].astype(date)
+    rows = []
+    for label in STANDARD_PERIODS:
+        coverage = "full"
+        if label == "1D":
+            start_index = end_index - 1
+        elif label == "ITD":
+            start_index = 0
         else:
-            # History stores user-facing net cash flow with the opposite sign from
-            # the Dietz external-flow convention used by the calculator.
-            dietz_cashflow = -published_net_cashflow
-
-            if beginning > epsilon:
-                metric = calculate_modified_dietz_metric(
-                    beginning,
-                    ending,
-                    [dietz_cashflow] if abs(dietz_cashflow) > epsilon else [],
-                    epsilon=epsilon,
-                )
-                period_status = metric.status
-                period_reason = metric.reason
-            elif ending > epsilon:
-                if dietz_cashflow > epsilon:
-                    bootstrap_factor = ending / dietz_cashflow
-                    if math.isfinite(bootstrap_factor) and bootstrap_factor >= 0.0:
-                        period_status = "ok"
-                        period_reason = None
-                    else:
-                        period_status = "undefined"
-                        period_reason = "invalid_bootstrap_factor"
-                else:
-                    period_status = "undefined"
-                    period_reason = "unfunded_value_from_zero"
-            elif abs(dietz_cashflow) <= epsilon:
-                period_status = "not_applicable"
-                period_reason = "no_capital_exposure"
-            else:
-                period_status = "undefined"
-                period_reason = "zero_exposure_with_cashflow"
-
-        current["twr_period_status"] = period_status
-        current["twr_period_reason"] = period_reason
-
-        if chain_status != "undefined":
-            if period_status == "undefined":
-                chain_status = "undefined"
-                chain_reason = period_reason or "undefined_period"
-                invalid_since = period_date
-            elif period_status == "ok":
-                chain_status = "ok"
-                chain_reason = None
-
-        current["twr_status"] = chain_status
-        current["twr_reason"] = chain_reason
-        current["twr_invalid_since"] = invalid_since
-
-    return TwrReliability(chain_status, chain_reason, invalid_since)
+            base = np.datetime64(_standard_period_base(label, end), "D")
+            start_index = int(np.searchsorted(prefixes.dates, base, side="right")) - 1
+            if start_index < 0:
+                start_index, coverage = 0, "since_inception"
+        result = period_return(prefixes, start_index, end_index)
+        rows.append({"period": label, "coverage": coverage, **asdict(result)})
+    return rows
 
 
 def _normalize_date(value: Any) -> date:
@@ -332,7 +747,10 @@ def calculate_xirr_metric(
             conventional,
         )
 
-    solve = solver or pyxirr_xirr
+    solve = solver
+    if solve is None:
+        # Imported here so engine startup does not load the native solver.
+        from pyxirr import xirr as solve
     try:
         rate = solve(dates, amounts)
     except Exception:
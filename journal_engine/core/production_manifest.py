@@ -69,14 +69,14 @@ def _window_market_frame(
     if not isinstance(frame, pd.DataFrame) or frame.empty:
         raise ProductionManifestError(f"market provenance missing required symbol: {symbol}")
 
-    work = frame.copy(deep=True)
+    work = frame.copy(deep=False)
     index = pd.to_datetime(work.index, errors="coerce")
     if index.isna().any():
         raise ProductionManifestError(f"market provenance has invalid date index: {symbol}")
     if index.tz is not None:
         index = index.tz_localize(None)
     work.index = index.normalize()
-    return work.loc[(work.index >= start_date) & (work.index <= end_date)].copy(deep=True)
+    return work.loc[(work.index >= start_date) & (work.index <= end_date)]
 
 
 def _window_fx_series(
@@ -88,14 +88,14 @@ def _window_fx_series(
 ) -> pd.Series:
     if not isinstance(series, pd.Series):
         raise ProductionManifestError(f"FX provenance missing required currency: {currency}")
-    work = series.copy(deep=True)
+    work = series.copy(deep=False)
     index = pd.to_datetime(work.index, errors="coerce")
     if index.isna().any():
         raise ProductionManifestError(f"FX provenance has invalid date index: {currency}")
     if index.tz is not None:
         index = index.tz_localize(None)
     work.index = index.normalize()
-    return work.loc[(work.index >= start_date) & (work.index <= end_date)].copy(deep=True)
+    return work.loc[(work.index >= start_date) & (work.index <= end_date)]
 
 
 def _realtime_fx_currencies_used_by_calculation(
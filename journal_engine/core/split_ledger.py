@@ -60,7 +60,7 @@ def build_split_adjusted_validation_ledger(
     if not hasattr(market_client, "get_transaction_multiplier"):
         raise SplitLedgerError("market client does not provide split multipliers")
 
-    adjusted = transactions_df.copy(deep=True)
+    adjusted = transactions_df.copy(deep=False)
 
     for index, row in adjusted.iterrows():
         transaction_type = str(row["Type"]).strip().upper()
@@ -141,7 +141,7 @@ def validate_adjusted_ledger_parity(
             )
 
     def relevant_rows(frame: pd.DataFrame) -> pd.DataFrame:
-        rows = frame.copy(deep=True)
+        rows = frame.copy(deep=False)
         rows["Type"] = rows["Type"].astype(str).str.strip().str.upper()
         return rows[rows["Type"].isin({"BUY", "SELL"})]
 
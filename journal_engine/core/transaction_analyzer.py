@@ -27,7 +27,7 @@ class TransactionAnalyzer:
     """交易分析引擎（金融級 - 完整實作）"""
 
     def __init__(self, transactions_df: pd.DataFrame):
-        self.df = transactions_df.copy()
+        self.df = transactions_df.copy(deep=False)
         self.df['Date'] = pd.to_datetime(self.df['Date'])
         if '_sequence' not in self.df.columns:
             self.df['_sequence'] = range(len(self.df))
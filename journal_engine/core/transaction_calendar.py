@@ -153,7 +153,7 @@ def ensure_transaction_dates_in_market_calendar(
         if symbol not in market_data or market_data[symbol] is None:
             raise TransactionCalendarError(f"{symbol} has no downloaded market data")
 
-        symbol_df = market_data[symbol].copy()
+        symbol_df = market_data[symbol].copy(deep=False)
         if symbol_df.empty:
             raise TransactionCalendarError(f"{symbol} market data is empty")
 
@@ -2,11 +2,13 @@
 
 import logging
 import math
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
 
+import numpy as np
 import pandas as pd
 
 from ..models import PortfolioSnapshot
+from .history_columns import HistoryColumns
 
 
 logger = logging.getLogger(__name__)
@@ -47,24 +49,30 @@ class PortfolioValidator:
         return True
 
     @staticmethod
-    def validate_twr_calculation(history_data: List[Dict[str, Any]]) -> bool:
+    def validate_twr_calculation(
+        history_data: Union[List[Dict[str, Any]], HistoryColumns],
+    ) -> bool:
         """Flag unusually large single-period TWR movements."""
         if len(history_data) < 2:
             return True
 
-        suspicious_jumps = []
-        for index in range(1, len(history_data)):
-            previous_twr = history_data[index - 1].get("twr", 0)
-            current_twr = history_data[index].get("twr", 0)
-            if abs(current_twr - previous_twr) > 50:
-                suspicious_jumps.append(
-                    {
-                        "date": history_data[index].get("date"),
-                        "prev_twr": previous_twr,
-                        "curr_twr": current_twr,
-                        "jump": current_twr - previous_twr,
-                    }
-                )
+        if isinstance(history_data, HistoryColumns):
+            dates = history_data.date_strings()
+            published_twr = history_data.published_twr()
+        else:
+            dates = [row.get("date") for row in history_data]
+            published_twr = [row.get("twr", 0) for row in history_data]
+
+        twr = np.asarray(published_twr, dtype=np.float64)
+        suspicious_jumps = [
+            {
+                "date": dates[index],
+                "prev_twr": published_twr[index - 1],
+                "curr_twr": published_twr[index],
+                "jump": published_twr[index] - published_twr[index - 1],
+            }
+            for index in (np.flatnonzero(np.abs(np.diff(twr)) > 50) + 1).tolist()
+        ]
 
         if suspicious_jumps:
             for jump in suspicious_jumps:
@@ -145,6 +153,93 @@ class PortfolioValidator:
 
         return True
 
+    @staticmethod
+    def validate_price_data_batch(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.Timestamp]:
+        """Run :meth:`validate_price_data` over many symbols in one long array.
+
+        Every numeric ``Close_Adjusted`` column is concatenated with a symbol code
+        per row, so the NaN, non-positive and extreme-move checks are a handful of
+        ``bincount`` calls. Log lines match the per-symbol method and follow the
+        order of ``frames``; frames the long array cannot represent exactly (no or
+        non-numeric ``Close_Adjusted``, duplicate index labels) use that method.
+        Returns the earliest normalized price date of each symbol that passed.
+        """
+        symbols = list(frames)
+        batched = [
+            "Close_Adjusted" in frames[symbol].columns
+            and frames[symbol]["Close_Adjusted"].dtype.kind in "fiu"
+            and frames[symbol].index.is_unique
+            for symbol in symbols
+        ]
+        batch_frames = [frames[symbol] for symbol, ok in zip(symbols, batched) if ok]
+        lengths = np.asarray([len(frame) for frame in batch_frames], dtype=np.int64)
+        codes = np.repeat(np.arange(len(batch_frames)), lengths)
+        prices = (
+            np.concatenate([
+                frame["Close_Adjusted"].to_numpy(dtype=np.float64)
+                for frame in batch_frames
+            ])
+            if batch_frames
+            else np.empty(0, dtype=np.float64)
+        )
+        splits = np.concatenate([
+            (frame["Stock Splits"] != 0).to_numpy(dtype=bool)
+            if "Stock Splits" in frame.columns
+            else np.zeros(len(frame), dtype=bool)
+            for frame in batch_frames
+        ]) if batch_frames else np.zeros(0, dtype=bool)
+
+        count = len(batch_frames)
+        nan_counts = np.bincount(codes, weights=np.isnan(prices), minlength=count)
+        non_positive_counts = np.bincount(codes, weights=prices <= 0, minlength=count)
+        # pct_change within each symbol: the first row of every symbol has no return.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            daily_return = prices[1:] / prices[:-1] - 1
+        extreme = np.zeros(len(prices), dtype=bool)
+        extreme[1:] = (codes[1:] == codes[:-1]) & (np.abs(daily_return) > 0.3)
+        extreme_non_split_counts = np.bincount(
+            codes,
+            weights=extreme & ~splits,
+            minlength=count,
+        )
+
+        first_dates: Dict[str, pd.Timestamp] = {}
+        batch_position = 0
+        for symbol, ok in zip(symbols, batched):
+            frame = frames[symbol]
+            if not ok:
+                if not PortfolioValidator.validate_price_data(symbol, frame):
+                    continue
+            else:
+                position = batch_position
+                batch_position += 1
+                if nan_counts[position]:
+                    logger.error(
+                        "[%s] %s NaN prices detected",
+                        symbol,
+                        int(nan_counts[position]),
+                    )
+                    continue
+                if non_positive_counts[position]:
+                    logger.error(
+                        "[%s] %s zero or negative prices detected",
+                        symbol,
+                        int(non_positive_counts[position]),
+                    )
+                    continue
+                if extreme_non_split_counts[position]:
+                    logger.warning(
+                        "[%s] %s days with >30%% price moves (not split-related)",
+                        symbol,
+                        int(extreme_non_split_counts[position]),
+                    )
+            if len(frame):
+                index = frame.index
+                if not isinstance(index, pd.DatetimeIndex):
+                    index = pd.to_datetime(index)
+                first_dates[symbol] = index.tz_localize(None).normalize().min()
+        return first_dates
+
     @staticmethod
     def validate_holdings_consistency(
         holdings: Dict[str, Any],
@@ -167,12 +262,11 @@ class PortfolioValidator:
             )
             return False
 
-        normalized = transactions_df.copy(deep=True)
-        normalized["Symbol"] = normalized["Symbol"].astype(str).str.strip().str.upper()
-        normalized["Type"] = normalized["Type"].astype(str).str.strip().str.upper()
-        normalized["Qty"] = pd.to_numeric(normalized["Qty"], errors="coerce")
+        symbols = transactions_df["Symbol"].astype(str).str.strip().str.upper()
+        types = transactions_df["Type"].astype(str).str.strip().str.upper()
+        quantities = pd.to_numeric(transactions_df["Qty"], errors="coerce")
 
-        if normalized["Qty"].isna().any() or not normalized["Qty"].map(math.isfinite).all():
+        if not np.isfinite(quantities.to_numpy(dtype=np.float64, na_value=np.nan)).all():
             logger.error("Holdings validation contains a non-finite transaction quantity")
             return False
 
@@ -184,18 +278,21 @@ class PortfolioValidator:
                 return False
             normalized_holdings[symbol] = holding
 
-        transaction_symbols = set(normalized["Symbol"].dropna()) - {""}
+        # One aggregation for every symbol; rows are only re-selected for the
+        # (rare) mismatching symbols that need a date range in the log line.
+        quantity_by_type = quantities.groupby([symbols, types]).sum().unstack(fill_value=0.0)
+        buy_by_symbol = quantity_by_type["BUY"].to_dict() if "BUY" in quantity_by_type else {}
+        sell_by_symbol = quantity_by_type["SELL"].to_dict() if "SELL" in quantity_by_type else {}
+        rows_by_symbol = symbols.value_counts().to_dict()
+
+        transaction_symbols = set(rows_by_symbol) - {""}
         all_symbols = sorted(transaction_symbols | set(normalized_holdings))
         valid = True
+        positions_by_symbol = None
 
         for symbol in all_symbols:
-            symbol_txns = normalized[normalized["Symbol"] == symbol]
-            buy_qty = float(
-                symbol_txns[symbol_txns["Type"] == "BUY"]["Qty"].sum()
-            )
-            sell_qty = float(
-                symbol_txns[symbol_txns["Type"] == "SELL"]["Qty"].sum()
-            )
+            buy_qty = float(buy_by_symbol.get(symbol, 0.0))
+            sell_qty = float(sell_by_symbol.get(symbol, 0.0))
             expected_qty = buy_qty - sell_qty
             actual_qty = float(normalized_holdings.get(symbol, {}).get("qty", 0.0))
 
@@ -207,17 +304,18 @@ class PortfolioValidator:
             if abs(actual_qty - expected_qty) <= tolerance:
                 continue
 
-            if "Date" in symbol_txns.columns and not symbol_txns.empty:
-                parsed_dates = pd.to_datetime(symbol_txns["Date"], errors="coerce").dropna()
+            row_count = rows_by_symbol.get(symbol, 0)
+            date_range = "unavailable"
+            if "Date" in transactions_df.columns and row_count:
+                if positions_by_symbol is None:
+                    positions_by_symbol = symbols.groupby(symbols).indices
+                symbol_dates = transactions_df["Date"].take(positions_by_symbol[symbol])
+                parsed_dates = pd.to_datetime(symbol_dates, errors="coerce").dropna()
                 if not parsed_dates.empty:
                     date_range = (
                         f"{parsed_dates.min().strftime('%Y-%m-%d')}.."
                         f"{parsed_dates.max().strftime('%Y-%m-%d')}"
                     )
-                else:
-                    date_range = "unavailable"
-            else:
-                date_range = "unavailable"
 
             logger.error(
                 "[%s] Holdings quantity mismatch: Buy=%.4f, Sell=%.4f, "
@@ -227,7 +325,7 @@ class PortfolioValidator:
                 sell_qty,
                 expected_qty,
                 actual_qty,
-                len(symbol_txns),
+                row_count,
                 date_range,
             )
             valid = False
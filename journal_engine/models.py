@@ -1,8 +1,21 @@
-from pydantic import BaseModel, ConfigDict, Field, StrictBool, computed_field, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    InstanceOf,
+    PlainSerializer,
+    PrivateAttr,
+    StrictBool,
+    computed_field,
+    field_validator,
+    model_validator,
+)
 from datetime import date, datetime
-from typing import Optional, List, Dict, Any, Literal
+from typing import Annotated, Optional, List, Dict, Any, Literal, Union
 
 from .core.calculation_manifest import DeterministicCalculationIdentity
+from .core.daily_pnl_attribution import GroupEndState
+from .core.history_columns import HistoryColumns
 from .core.input_provenance import (
     EffectiveFxInputsIdentity,
     EffectiveMarketInputsIdentity,
@@ -55,6 +68,21 @@ class PortfolioSummary(BaseModel):
     xirr_cashflow_conventional: Optional[StrictBool] = None
     realized_pnl: float
     benchmark_twr: float
+    # Risk statistics of the linked daily TWR returns (performance_metrics.RiskMetrics).
+    # Optional preserves compatibility with snapshots published before they existed.
+    risk_status: Optional[str] = None
+    risk_reason: Optional[str] = None
+    risk_periods: Optional[int] = None
+    volatility_percent: Optional[float] = None
+    rolling_volatility_percent: Optional[float] = None
+    max_drawdown_percent: Optional[float] = None
+    max_drawdown_peak_date: Optional[str] = None
+    max_drawdown_trough_date: Optional[str] = None
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+    beta: Optional[float] = None
+    correlation: Optional[float] = None
+    tracking_error_percent: Optional[float] = None
 
     # ✅ 當日損益（TWD）：總和（台股分量 + 海外分量）
     daily_pnl_twd: float = 0.0
@@ -116,15 +144,54 @@ class DividendRecord(BaseModel):
     record_id: Optional[int] = None
 
 
+def _serialize_history(value: Any) -> Any:
+    if isinstance(value, HistoryColumns):
+        return value.to_records()
+    return value
+
+
+# Snapshot `history`: calculator output stays columnar and the per-day dicts are
+# built only when the snapshot is dumped; snapshots read back carry the dicts.
+HistoryField = Annotated[
+    Union[InstanceOf[HistoryColumns], List[Dict[str, Any]]],
+    PlainSerializer(_serialize_history),
+]
+
+
 class PortfolioGroupData(BaseModel):
     """單一策略群組的完整投資組合數據"""
     summary: PortfolioSummary
     holdings: List[HoldingPosition]
-    history: List[Dict[str, Any]]
+    history: HistoryField
     pending_dividends: List[DividendRecord] = []
     day_ledger: List[Dict[str, Any]] = []
     lot_ledger: List[Dict[str, Any]] = []
     anomalies: List[Dict[str, Any]] = []
+    # Standard 1D/1W/MTD/QTD/YTD/1Y/3Y/ITD rows from performance_metrics.standard_period_table.
+    period_returns: List[Dict[str, Any]] = []
+
+    # Calculator end state reused by the Daily P&L reconciler; not serialized.
+    _end_state: Optional[GroupEndState] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_history_columns(
+        cls,
+        history_columns: HistoryColumns,
+        *,
+        end_state: Optional[GroupEndState] = None,
+        **data: Any,
+    ) -> "PortfolioGroupData":
+        group = cls(history=history_columns, **data)
+        group._end_state = end_state
+        return group
+
+    @property
+    def history_columns(self) -> Optional[HistoryColumns]:
+        return self.history if isinstance(self.history, HistoryColumns) else None
+
+    @property
+    def end_state(self) -> Optional[GroupEndState]:
+        return self._end_state
 
 
 class CalculationManifest(BaseModel):
@@ -188,7 +255,7 @@ class PortfolioSnapshot(BaseModel):
     # 向下相容欄位 (代表 'all' 群組的總體數據)
     summary: PortfolioSummary
     holdings: List[HoldingPosition]
-    history: List[Dict[str, Any]]
+    history: HistoryField
     pending_dividends: List[DividendRecord] = []
     
     # ✅ 新增：多群組資料字典 {group_name: PortfolioGroupData}
@@ -0,0 +1,149 @@
+"""Process-wide run metrics rendered in the Prometheus text exposition format.
+
+The engine, market clients and runners record into :data:`RUN_METRICS`. One-shot
+runners export it once at the end of the process; the daemon exports after every
+job, so its counters accumulate over the process lifetime. Only the
+metric names declared in :data:`METRIC_DEFINITIONS` are accepted, and label values
+are fixed categories (stage names, error codes, endpoints, valuation sources), so
+the exposition never carries user identifiers.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Tuple
+
+import requests
+
+from .tracing import TRACER
+
+METRIC_PREFIX = "journal_engine_"
+
+# name -> (Prometheus type, help text)
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str]] = {
+    "run_timestamp_seconds": ("gauge", "Unix time at which the run metrics were exported."),
+    "run_failed": ("gauge", "1 when the run ended with the labelled safe error code."),
+    "stage_duration_seconds_total": ("counter", "Wall-clock seconds spent in each run stage."),
+    "users_total": ("counter", "Users by outcome and safe error code."),
+    "market_symbols": ("gauge", "Tickers (holdings, benchmarks and SPY) requested from the market provider."),
+    "price_refetch_total": ("counter", "Fresh re-fetches after a selected-price NaN (SELECTED_PRICE_REFETCH_ATTEMPTS)."),
+    "semantic_recovered_rows_total": ("counter", "Provider daily rows recovered from exact-date intraday evidence."),
+    "synthetic_valuation_rows": ("gauge", "Non-market valuation rows in the calculation calendar by Valuation_Source."),
+    "market_cache_requests_total": ("counter", "Warm market cache lookups by result."),
+    "market_cache_hit_ratio": ("gauge", "Share of warm market cache lookups served without a download."),
+    "record_mirror_records_total": ("counter", "Records pulled into the local record mirror by sync mode."),
+    "record_mirror_drift": ("gauge", "1 when the last full verification found the record mirror out of date."),
+    "worker_requests_total": ("counter", "Worker API requests by endpoint."),
+    "worker_request_errors_total": ("counter", "Worker API requests that failed or returned non-200."),
+    "worker_request_seconds_sum": ("counter", "Total Worker API request latency in seconds."),
+    "worker_request_seconds_max": ("gauge", "Slowest Worker API request in seconds."),
+    "worker_request_bytes_total": ("counter", "Request body bytes sent to the Worker API (snapshot payloads for portfolio)."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class RunMetrics:
+    """Thread-safe per-run registry of labelled metric samples."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict[Labels, float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Mapping[str, object]) -> Labels:
+        if name not in METRIC_DEFINITIONS:
+            raise KeyError(f"undeclared run metric: {name}")
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def clear(self, name: str) -> None:
+        """Drop every labelled sample of ``name``."""
+        self._key(name, {})
+        with self._lock:
+            self._samples.pop(name, None)
+
+    def set(self, name: str, value: float, **labels: object) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._samples.setdefault(name, {})[key] = float(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            series = self._samples.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + float(amount)
+
+    def set_max(self, name: str, value: float, **labels: object) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            series = self._samples.setdefault(name, {})
+            series[key] = max(series.get(key, float(value)), float(value))
+
+    def value(self, name: str, **labels: object) -> float:
+        key = self._key(name, labels)
+        with self._lock:
+            return self._samples.get(name, {}).get(key, 0.0)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Add the wall-clock time of the ``with`` block to ``stage``'s duration."""
+        started = time.perf_counter()
+        try:
+            with TRACER.span(stage, "stage"):
+                yield
+        finally:
+            self.inc("stage_duration_seconds_total", time.perf_counter() - started, stage=stage)
+
+    def render(self) -> str:
+        """Return the registry in the Prometheus text exposition format."""
+        with self._lock:
+            samples = {name: dict(series) for name, series in self._samples.items()}
+        lines = []
+        for name in sorted(samples):
+            metric_type, help_text = METRIC_DEFINITIONS[name]
+            full_name = METRIC_PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for labels, value in sorted(samples[name].items()):
+                label_text = ",".join(
+                    f'{key}="{_escape_label_value(label_value)}"'
+                    for key, label_value in labels
+                )
+                selector = f"{full_name}{{{label_text}}}" if label_text else full_name
+                lines.append(f"{selector} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path: str) -> None:
+        """Atomically replace ``path`` so collectors never read a partial file."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        temporary.write_text(self.render(), encoding="utf-8")
+        os.replace(temporary, target)
+
+    def push(self, url: str, timeout: float = 10.0) -> None:
+        """PUT the exposition to a Pushgateway-compatible grouping URL."""
+        response = requests.put(
+            url,
+            data=self.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+
+
+RUN_METRICS = RunMetrics()
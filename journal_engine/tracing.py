@@ -0,0 +1,161 @@
+"""Opt-in nested span tracing written as Chrome trace-event JSON.
+
+The engine wraps its stages, per-user steps, calculator groups, day-loop phases
+and market downloads in :meth:`Tracer.span`. Tracing is off by default and a
+disabled span is a shared no-op context manager, so production runs pay one
+attribute check per span. ``tools/run_portfolio_update.py --profile`` turns it
+on and writes the events for ``chrome://tracing`` or https://ui.perfetto.dev.
+Span arguments must be categories or counts, never user identifiers.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_DISABLED_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_category", "_args", "_started_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._started_ns = 0
+
+    def __enter__(self) -> "_Span":
+        self._started_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ended_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self._args["error"] = exc_type.__name__
+        self._tracer._record(self._name, self._category, self._started_ns, ended_ns, self._args)
+
+
+class _PhaseSequence:
+    """Back-to-back spans for loop phases that cannot each be a ``with`` block."""
+
+    __slots__ = ("_tracer", "_category", "_args", "_open")
+
+    def __init__(self, tracer: "Tracer", category: str, args: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._category = category
+        self._args = args
+        self._open: Optional[tuple] = None
+
+    def begin(self, name: str) -> None:
+        """End the open phase, if any, and start ``name``."""
+        self.end()
+        self._open = (name, time.perf_counter_ns())
+
+    def end(self) -> None:
+        if self._open is None:
+            return
+        name, started_ns = self._open
+        self._open = None
+        self._tracer._record(name, self._category, started_ns, time.perf_counter_ns(), dict(self._args))
+
+
+class _DisabledPhaseSequence:
+    __slots__ = ()
+
+    def begin(self, name: str) -> None:
+        return None
+
+    def end(self) -> None:
+        return None
+
+
+_DISABLED_PHASES = _DisabledPhaseSequence()
+
+
+class Tracer:
+    """Collect complete ("X") trace events from every thread while enabled."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._thread_names: Dict[int, str] = {}
+        self._origin_ns = 0
+        self.enabled = False
+
+    def start(self) -> None:
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+            self._origin_ns = time.perf_counter_ns()
+            self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def span(self, name: str, category: str = "engine", **args: Any):
+        """Time the ``with`` block as one nested span on the current thread."""
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, name, category, args)
+
+    def phases(self, category: str = "phase", **args: Any):
+        """Return a sequence whose ``begin(name)`` calls emit consecutive spans."""
+        if not self.enabled:
+            return _DISABLED_PHASES
+        return _PhaseSequence(self, category, args)
+
+    def _record(
+        self,
+        name: str,
+        category: str,
+        started_ns: int,
+        ended_ns: int,
+        args: Dict[str, Any],
+    ) -> None:
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (started_ns - self._origin_ns) / 1000.0,
+            "dur": (ended_ns - started_ns) / 1000.0,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": ident,
+                    "args": {"name": name},
+                }
+                for ident, name in sorted(self._thread_names.items())
+            ]
+            return metadata + sorted(self._events, key=lambda event: event["ts"])
+
+    def write(self, path: Path, metadata: Optional[Dict[str, Any]] = None) -> None:
+        document = {
+            "traceEvents": self.events(),
+            "displayTimeUnit": "ms",
+            "otherData": dict(metadata or {}),
+        }
+        Path(path).write_text(json.dumps(document), encoding="utf-8")
+
+
+TRACER = Tracer()
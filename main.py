@@ -1,24 +1,48 @@
+import hashlib
 import logging
 import math
 import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import infer_dtype
 
-from journal_engine.clients.api_client import CloudflareClient
+from journal_engine.clients.api_client import SNAPSHOT_UPLOAD_ENCODINGS, CloudflareClient
+from journal_engine.clients.market_data import VALUATION_SOURCE_COLUMN
+from journal_engine.clients.record_columns import RecordColumns
+from journal_engine.clients.record_mirror import RecordMirror
 from journal_engine.clients.semantic_market_data import SemanticMarketDataClient as MarketDataClient
-from journal_engine.config import API_KEY
+from journal_engine.config import (
+    API_KEY,
+    DAILY_PNL_RECONCILIATION_MODE,
+    RECORD_MIRROR_PATH,
+    RECORD_MIRROR_VERIFY_SECONDS,
+    SNAPSHOT_UPLOAD_ENCODING,
+    SWEEP_SHARD_COUNT,
+    SWEEP_SHARD_INDEX,
+)
+from journal_engine.core.account_daily_pnl_preview import PortfolioSnapshotWithAccountPreviews
+from journal_engine.core.account_value_history import attach_account_value_history
 from journal_engine.core.account_value_preview import attach_account_value_preview
 from journal_engine.core.calculation_manifest import (
     CalculationManifestError,
+    build_source_records_identity,
     resolve_engine_source_commit,
 )
 from journal_engine.core.calculator import PortfolioCalculator
 from journal_engine.core.cash_ledger import build_shadow_cash_ledger
 from journal_engine.core.currency_detector import CurrencyDetector
-from journal_engine.core.daily_pnl_reconciler import reconcile_snapshot_daily_pnl
+from journal_engine.core.daily_pnl_reconciler import (
+    RECONCILIATION_MODES,
+    reconcile_snapshot_daily_pnl,
+)
 from journal_engine.core.ledger_integrity import validate_transaction_prefix_integrity
 from journal_engine.core.production_manifest import (
     ProductionManifestError,
@@ -31,6 +55,8 @@ from journal_engine.core.split_ledger import (
 )
 from journal_engine.core.transaction_calendar import ensure_transaction_dates_in_market_calendar
 from journal_engine.core.validator import PortfolioValidator
+from journal_engine.run_metrics import RUN_METRICS
+from journal_engine.tracing import TRACER
 
 
 SUPPORTED_TRANSACTION_TYPES = {"BUY", "SELL", "DIV"}
@@ -42,6 +68,14 @@ SHADOW_TRANSACTION_METADATA_COLUMNS = (
 )
 LEGACY_DAILY_PNL_MISMATCH_PREFIX = "Daily PnL formula/aggregation mismatch:"
 PRODUCTION_OVERSELL_POLICY = "CLAMP"
+# Bounded Worker read concurrency; must stay within the client's session pool.
+USER_PREFETCH_MAX_WORKERS = 8
+# Validated snapshots waiting for upload are multi-megabyte objects, so the
+# upload queue stays small and applies backpressure to the calculation loop.
+SNAPSHOT_UPLOAD_WORKERS = 2
+SNAPSHOT_UPLOAD_QUEUE_SIZE = 2
+
+MarketLoader = Callable[[List[str], pd.Timestamp], MarketDataClient]
 
 
 class PortfolioUpdateError(RuntimeError):
@@ -82,6 +116,133 @@ class LegacyDailyPnLMismatchCapture(logging.Filter):
         return True
 
 
+class UserInputPrefetch:
+    """Fetch independent per-user Worker reads concurrently on a bounded pool.
+
+    Benchmark settings are authoritative and fail closed: the first failure in
+    user order is re-raised to the runner. Cash events are non-authoritative
+    shadow evidence; their futures are handed to ``observe_shadow_cash_ledger``,
+    which keeps its existing fail-open handling when a future raises.
+    """
+
+    def __init__(
+        self,
+        api_client,
+        user_ids: Sequence[str],
+        max_workers: int = USER_PREFETCH_MAX_WORKERS,
+    ) -> None:
+        self._api_client = api_client
+        self._user_ids = list(user_ids)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(self._user_ids))),
+            thread_name_prefix="user-prefetch",
+        )
+        self._cash_event_futures: Dict[str, Future] = {}
+
+    def fetch_benchmarks(self, known: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+        """Resolve every user's benchmark; cash-event reads are queued behind them.
+
+        Users in ``known`` (durable calculation-job benchmarks) skip the settings read.
+        """
+        known = known or {}
+        benchmark_futures = {
+            user_id: self._executor.submit(self._api_client.get_user_benchmark, user_id)
+            for user_id in self._user_ids
+            if user_id not in known
+        }
+        # Cash events are not needed until the per-user stage, so they keep running
+        # while the caller downloads market data.
+        for user_id in self._user_ids:
+            self._cash_event_futures[user_id] = self._executor.submit(
+                self._api_client.fetch_cash_events,
+                user_id,
+            )
+        try:
+            return {
+                user_id: (
+                    known[user_id]
+                    if user_id in known
+                    else benchmark_futures[user_id].result()
+                )
+                for user_id in self._user_ids
+            }
+        except Exception:
+            self.close()
+            raise
+
+    def cash_events_future(self, user_id: str) -> Optional[Future]:
+        return self._cash_event_futures.get(user_id)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SnapshotUploadPipeline:
+    """Serialize and upload validated snapshots on background workers.
+
+    The calculation loop hands each snapshot over after ``validate_before_upload``
+    and continues with the next user. ``submit`` blocks while the bounded queue is
+    full. A user counts as successful only after ``drain`` reports that the Worker
+    confirmed that user's upload with ``success=true``.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        api_client,
+        workers: int = SNAPSHOT_UPLOAD_WORKERS,
+        queue_size: int = SNAPSHOT_UPLOAD_QUEUE_SIZE,
+    ) -> None:
+        self._api_client = api_client
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, queue_size))
+        self._results: Dict[str, Optional[Exception]] = {}
+        self._results_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                name=f"snapshot-upload-{index}",
+                daemon=True,
+            )
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user_id: str, snapshot) -> None:
+        self._queue.put((user_id, snapshot))
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                user_id, snapshot = item
+                error: Optional[Exception] = None
+                try:
+                    # upload_portfolio performs model_dump(mode="json") on this thread.
+                    with TRACER.span("snapshot_upload", "upload"):
+                        uploaded = self._api_client.upload_portfolio(snapshot, target_user_id=user_id)
+                    if uploaded is not True:
+                        raise PortfolioUpdateError("Worker 未明確確認上傳成功")
+                except Exception as exc:
+                    error = exc
+                with self._results_lock:
+                    self._results[user_id] = error
+            finally:
+                self._queue.task_done()
+
+    def drain(self) -> Dict[str, Optional[Exception]]:
+        """Wait for every submitted upload and return ``user_id -> error or None``."""
+        for _thread in self._threads:
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+        with self._results_lock:
+            return dict(self._results)
+
+
 def setup_logging() -> None:
     logging.basicConfig(
         level=logging.INFO,
@@ -91,11 +252,19 @@ def setup_logging() -> None:
     )
 
 
-def observe_shadow_cash_ledger(api_client, user_id: str, raw_user_df: pd.DataFrame):
+def observe_shadow_cash_ledger(
+    api_client,
+    user_id: str,
+    raw_user_df: pd.DataFrame,
+    cash_events_future: Optional[Future] = None,
+):
     """Collect privacy-safe, non-authoritative cash completeness evidence."""
     logger = logging.getLogger("main")
     try:
-        cash_events = api_client.fetch_cash_events(user_id)
+        if cash_events_future is not None:
+            cash_events = cash_events_future.result()
+        else:
+            cash_events = api_client.fetch_cash_events(user_id)
     except Exception as exc:  # Shadow observation must never block the securities snapshot.
         logger.warning(
             "Cash shadow evidence unavailable [stage=feed,error=%s]",
@@ -146,14 +315,92 @@ def get_benchmark_from_env() -> Tuple[str, str]:
     return custom_benchmark, target_user_id
 
 
-def prepare_transactions(records: list, target_user_id: str = "") -> Tuple[pd.DataFrame, List[str]]:
-    """Normalize records and enforce optional target-user isolation."""
-    if not isinstance(records, list):
+def user_shard(user_id: str, shard_count: int) -> int:
+    """Return a user's stable shard: SHA-256 of the stripped, case-folded id."""
+    key = str(user_id or "").strip().casefold().encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % shard_count
+
+
+def resolve_shard(shard_index=None, shard_count=None) -> Tuple[int, int]:
+    """Validate an explicit shard or the SWEEP_SHARD_* environment defaults."""
+    try:
+        index = int(SWEEP_SHARD_INDEX if shard_index is None else shard_index)
+        count = int(SWEEP_SHARD_COUNT if shard_count is None else shard_count)
+    except (TypeError, ValueError):
+        index, count = -1, 0
+    if count < 1 or not 0 <= index < count:
+        raise PortfolioUpdateError("環境變數 SWEEP_SHARD_INDEX/SWEEP_SHARD_COUNT 無效")
+    return index, count
+
+
+def select_shard_users(
+    df: pd.DataFrame,
+    user_list: List[str],
+    shard_index: int,
+    shard_count: int,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Keep only this shard's users; market data then covers only their symbols."""
+    if shard_count == 1:
+        return df, user_list
+    shard_users = [
+        user_id for user_id in user_list if user_shard(user_id, shard_count) == shard_index
+    ]
+    shard_df = df[df["user_id"].isin(shard_users)].reset_index(drop=True)
+    return shard_df, shard_users
+
+
+class UserLedgerPartition:
+    """Per-user row positions of the normalized ledger, grouped in one pass.
+
+    Replaces a ``df[df["user_id"] == user_id]`` scan per user and per stage.
+    ``frame`` takes a user's rows in ledger order with their original index, so
+    it is interchangeable with the boolean-mask selection.
+    """
+
+    def __init__(self, ledger: pd.DataFrame) -> None:
+        self.ledger = ledger
+        grouped = ledger.groupby("user_id", sort=False)
+        self.positions: Dict[str, np.ndarray] = dict(grouped.indices)
+        self.first_dates: Dict[str, pd.Timestamp] = grouped["Date"].min().to_dict()
+        self.symbols: Dict[str, frozenset] = {
+            user_id: frozenset(symbols)
+            for user_id, symbols in grouped["Symbol"].unique().items()
+        }
+
+    def frame(self, user_id: str) -> pd.DataFrame:
+        positions = self.positions.get(user_id)
+        if positions is None:
+            return self.ledger.iloc[0:0]
+        return self.ledger.take(positions)
+
+
+def _normalize_labels(series: pd.Series, normalize: Callable[[str], str]) -> pd.Series:
+    """Return ``series.astype(str)`` with ``normalize`` applied once per distinct value.
+
+    Ledgers repeat a few thousand user ids, symbols and types across every row, so
+    factorizing first turns per-row string work into per-category work.
+    """
+    if infer_dtype(series, skipna=False) != "string":
+        series = series.astype(str)
+    codes, uniques = pd.factorize(series)
+    labels = np.array([normalize(value) for value in uniques], dtype=object)
+    return pd.Series(labels.take(codes), index=series.index, name=series.name)
+
+
+def prepare_transactions(
+    records: Union[RecordColumns, list],
+    target_user_id: str = "",
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Normalize records and enforce optional target-user isolation.
+
+    ``records`` is the pager's column accumulation or a list of record dicts.
+    """
+    if not isinstance(records, (RecordColumns, list)):
         raise PortfolioUpdateError("交易紀錄 API 回傳格式錯誤")
     if not records:
         raise PortfolioUpdateError("交易紀錄 API 回傳零筆資料，拒絕產生空快照")
 
-    df = pd.DataFrame(records)
+    df = records.to_frame() if isinstance(records, RecordColumns) else pd.DataFrame(records)
     required_columns = {"user_id", "txn_date", "symbol", "txn_type", "qty", "price"}
     missing_columns = sorted(required_columns - set(df.columns))
     if missing_columns:
@@ -163,14 +410,14 @@ def prepare_transactions(records: list, target_user_id: str = "") -> Tuple[pd.Da
 
     if df["user_id"].isna().any():
         raise PortfolioUpdateError("交易紀錄包含空白 user_id")
-    df["user_id"] = df["user_id"].astype(str).str.strip()
+    df["user_id"] = _normalize_labels(df["user_id"], str.strip)
     if (df["user_id"] == "").any():
         raise PortfolioUpdateError("交易紀錄包含空白 user_id")
 
     if target_user_id:
         target_key = target_user_id.strip().casefold()
-        user_keys = df["user_id"].str.casefold()
-        df = df[user_keys == target_key].copy()
+        user_keys = _normalize_labels(df["user_id"], str.casefold)
+        df = df[user_keys == target_key]
         if df.empty:
             raise PortfolioUpdateError(
                 f"找不到目標使用者 {mask_user_id(target_user_id)} 的交易紀錄"
@@ -221,8 +468,14 @@ def prepare_transactions(records: list, target_user_id: str = "") -> Tuple[pd.Da
 
     if df["Date"].isna().any():
         raise PortfolioUpdateError("交易紀錄包含空白日期")
-    for column in ("Qty", "Price", "Commission", "Tax"):
-        if df[column].isna().any() or not df[column].map(math.isfinite).all():
+    numeric_columns = ("Qty", "Price", "Commission", "Tax")
+    # One isfinite mask over all numeric columns (NaN is not finite); columns are
+    # reported in the order above.
+    finite_columns = np.isfinite(
+        df.loc[:, list(numeric_columns)].to_numpy(dtype=float)
+    ).all(axis=0)
+    for column, finite in zip(numeric_columns, finite_columns):
+        if not finite:
             raise PortfolioUpdateError(f"交易紀錄欄位 {column} 包含非有限數值")
 
     # Keep the batch runner's domain contract aligned with the Worker write boundary.
@@ -233,8 +486,8 @@ def prepare_transactions(records: list, target_user_id: str = "") -> Tuple[pd.Da
     if (df["Price"] < 0).any():
         raise PortfolioUpdateError("交易紀錄欄位 Price 不得小於 0")
 
-    df["Symbol"] = df["Symbol"].astype(str).str.strip().str.upper()
-    df["Type"] = df["Type"].astype(str).str.strip().str.upper()
+    df["Symbol"] = _normalize_labels(df["Symbol"], lambda value: value.strip().upper())
+    df["Type"] = _normalize_labels(df["Type"], lambda value: value.strip().upper())
     if (df["Symbol"] == "").any() or (df["Type"] == "").any():
         raise PortfolioUpdateError("交易紀錄包含空白 Symbol 或 Type")
 
@@ -249,20 +502,98 @@ def prepare_transactions(records: list, target_user_id: str = "") -> Tuple[pd.Da
         sort_columns.append("id")
     df = df.sort_values(sort_columns, kind="stable").reset_index(drop=True)
 
-    users = list(dict.fromkeys(df["user_id"].tolist()))
+    users = df["user_id"].unique().tolist()
     if target_user_id and len(users) != 1:
         raise PortfolioUpdateError("目標使用者篩選後仍包含多個使用者")
     return df, users
 
 
+def resolve_record_mirror_verify_seconds() -> float:
+    try:
+        seconds = float(RECORD_MIRROR_VERIFY_SECONDS)
+    except ValueError as exc:
+        raise PortfolioUpdateError("環境變數 RECORD_MIRROR_VERIFY_SECONDS 無效") from exc
+    if not math.isfinite(seconds) or seconds < 0:
+        raise PortfolioUpdateError("環境變數 RECORD_MIRROR_VERIFY_SECONDS 無效")
+    return seconds
+
+
+def load_mirrored_records(
+    api_client,
+    mirror: RecordMirror,
+    verify_seconds: float,
+    now: Optional[float] = None,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Sync the record mirror from the Worker and return every record, prepared.
+
+    Inserts, edits and deletes arrive through the ``after_change`` feed. When the
+    last full verification is older than ``verify_seconds`` the complete record set
+    is pulled as well, its source-records identity is compared with the synced
+    mirror's, and the mirror is rebuilt from the complete pull either way. The
+    complete pull is normalized once and serves both the comparison and the run.
+    """
+    logger = logging.getLogger("main")
+    now = time.time() if now is None else now
+    changes = api_client.fetch_record_changes(mirror.change_position())
+    mirror.apply_changes(changes)
+    RUN_METRICS.inc("record_mirror_records_total", len(changes), mode="incremental")
+
+    verified_at = mirror.last_verified_at()
+    if verified_at is not None and now - verified_at < verify_seconds:
+        logger.info(
+            "交易紀錄鏡像增量同步: 變更 %s 筆，共 %s 筆",
+            len(changes),
+            mirror.record_count(),
+        )
+        return prepare_transactions(mirror.load())
+
+    complete = api_client.fetch_records()
+    RUN_METRICS.inc("record_mirror_records_total", len(complete), mode="full")
+    mirrored = mirror.load()
+    prepared = prepare_transactions(complete)
+    drift = True
+    if len(mirrored) and len(complete):
+        mirrored_identity = build_source_records_identity(prepare_transactions(mirrored)[0])
+        drift = mirrored_identity != build_source_records_identity(prepared[0])
+    RUN_METRICS.set("record_mirror_drift", float(drift))
+    if drift:
+        logger.warning(
+            "交易紀錄鏡像與 Worker 不一致，已以完整資料重建 [mirrored=%s,worker=%s]",
+            len(mirrored),
+            len(complete),
+        )
+    else:
+        logger.info("交易紀錄鏡像完整驗證通過: 共 %s 筆", len(complete))
+    mirror.replace_all(
+        complete.to_records() if isinstance(complete, RecordColumns) else complete,
+        verified_at=now,
+    )
+    return prepared
+
+
+def refresh_mirrored_user(user_id: str, records) -> None:
+    """Replace one user's mirrored rows after a complete targeted pull."""
+    if not RECORD_MIRROR_PATH:
+        return
+    with RecordMirror(RECORD_MIRROR_PATH) as mirror:
+        mirror.replace_user(
+            user_id,
+            records.to_records() if isinstance(records, RecordColumns) else records,
+        )
+
+
+def _normalized_timestamp(value) -> pd.Timestamp:
+    target = pd.Timestamp(value)
+    if getattr(target, "tzinfo", None) is not None:
+        target = target.tz_localize(None)
+    return target.normalize()
+
+
 def _has_positive_asof(series: pd.Series, required_date) -> bool:
     """Return whether a positive finite observation exists on/before required_date."""
     if series is None or series.empty:
         return False
-    target = pd.Timestamp(required_date)
-    if getattr(target, "tzinfo", None) is not None:
-        target = target.tz_localize(None)
-    target = target.normalize()
+    target = _normalized_timestamp(required_date)
     try:
         value = float(series.asof(target))
     except Exception:
@@ -292,23 +623,28 @@ def validate_required_market_data(
     normalized_tickers = sorted(
         {str(ticker).strip().upper() for ticker in required_tickers if ticker}
     )
+    frames = {}
     for symbol in normalized_tickers:
         frame = market_data.get(symbol)
         if frame is None or not isinstance(frame, pd.DataFrame) or frame.empty:
             missing.append(symbol)
             continue
-        if not PortfolioValidator.validate_price_data(symbol, frame):
+        frames[symbol] = frame
+
+    # Every price of a symbol that passes is finite and positive, so it covers a
+    # required date exactly when its earliest price date is on or before it.
+    first_price_dates = PortfolioValidator.validate_price_data_batch(frames)
+    for symbol in frames:
+        first_price_date = first_price_dates.get(symbol)
+        if first_price_date is None:
             invalid.append(symbol)
             continue
 
         required_date = required_dates.get(symbol)
-        if required_date is not None:
-            prices = pd.to_numeric(frame["Close_Adjusted"], errors="coerce")
-            prices.index = pd.to_datetime(frame.index).tz_localize(None).normalize()
-            if not _has_positive_asof(prices, required_date):
-                price_coverage.append(
-                    f"{symbol}@{required_date.strftime('%Y-%m-%d')}"
-                )
+        if required_date is not None and first_price_date > _normalized_timestamp(required_date):
+            price_coverage.append(
+                f"{symbol}@{required_date.strftime('%Y-%m-%d')}"
+            )
 
     details = []
     if missing:
@@ -343,6 +679,18 @@ def validate_required_market_data(
         raise PortfolioUpdateError(f"必要市場資料驗證失敗（{'；'.join(details)}）")
 
 
+def count_synthetic_valuation_rows(market_client) -> Dict[str, int]:
+    """Count non-market valuation rows per Valuation_Source across the calendar."""
+    counts: Dict[str, int] = {}
+    for frame in getattr(market_client, "market_data", {}).values():
+        if frame is None or VALUATION_SOURCE_COLUMN not in frame.columns:
+            continue
+        sources = frame[VALUATION_SOURCE_COLUMN].fillna("market").astype(str)
+        for source, count in sources[sources != "market"].value_counts().items():
+            counts[source] = counts.get(source, 0) + int(count)
+    return counts
+
+
 def validate_before_upload(snapshot, user_df: pd.DataFrame) -> None:
     """Block upload when the calculator or snapshot validator emits an error."""
     validator_logger = logging.getLogger("journal_engine.core.validator")
@@ -359,12 +707,83 @@ def validate_before_upload(snapshot, user_df: pd.DataFrame) -> None:
         )
 
 
-def run_update() -> None:
+def _prepare_target_transactions(
+    logger: logging.Logger,
+    api_client,
+    targets: Mapping[str, str],
+    user_outcomes: Optional[Dict[str, Optional[Exception]]],
+) -> Tuple[pd.DataFrame, List[str], Dict[str, str], List[str]]:
+    """Fetch and normalize each target user's records independently.
+
+    A target whose records cannot be read or validated fails on its own without
+    blocking the others. Returns the combined ledger, prepared users, their
+    durable benchmarks and the masked ids of failed targets.
+    """
+    frames = []
+    user_list: List[str] = []
+    durable_benchmarks: Dict[str, str] = {}
+    failed_users: List[str] = []
+    for target_user_id, benchmark in targets.items():
+        masked_user = mask_user_id(target_user_id)
+        try:
+            records = api_client.fetch_records(target_user_id=target_user_id)
+            refresh_mirrored_user(target_user_id, records)
+            user_df, users = prepare_transactions(records, target_user_id)
+        except Exception as exc:
+            failed_users.append(masked_user)
+            if user_outcomes is not None:
+                user_outcomes[target_user_id] = exc
+            logger.exception("使用者 %s 處理失敗: %s", masked_user, exc)
+            continue
+        frames.append(user_df)
+        user_list.extend(users)
+        durable_benchmarks[users[0]] = benchmark
+
+    if not frames:
+        raise PortfolioUpdateError(
+            f"本次更新有 {len(failed_users)} 位使用者失敗；成功 0 位"
+        )
+    df = pd.concat(frames, ignore_index=True)
+    sort_columns = ["Date"]
+    if "id" in df.columns:
+        sort_columns.append("id")
+    df = df.sort_values(sort_columns, kind="stable").reset_index(drop=True)
+    return df, user_list, durable_benchmarks, failed_users
+
+
+def run_update(
+    *,
+    api_client: Optional[CloudflareClient] = None,
+    market_loader: Optional[MarketLoader] = None,
+    targets: Optional[Mapping[str, str]] = None,
+    user_outcomes: Optional[Dict[str, Optional[Exception]]] = None,
+    shard_index: Optional[int] = None,
+    shard_count: Optional[int] = None,
+) -> None:
+    """Run one calculation batch.
+
+    ``market_loader`` lets a long-running caller supply already-downloaded market
+    data: it receives the sorted ticker universe and fetch start date and returns
+    the market client the batch must use. Without it a fresh client is downloaded.
+
+    ``targets`` maps user ids to durable calculation-job benchmarks and restricts
+    the batch to those users; ``user_outcomes`` then receives each user's final
+    error (``None`` on a confirmed upload).
+
+    All-user runs process only the users of shard ``shard_index`` of
+    ``shard_count`` (defaults: ``SWEEP_SHARD_*``); targeted runs ignore sharding.
+    """
     logger = logging.getLogger("main")
     logger.info("=== 啟動交易日誌更新程序 (PR-04 canonical Daily PnL) ===")
 
-    if not API_KEY:
+    if api_client is None and not API_KEY:
         raise PortfolioUpdateError("環境變數中找不到 API_KEY")
+    if SNAPSHOT_UPLOAD_ENCODING not in SNAPSHOT_UPLOAD_ENCODINGS:
+        raise PortfolioUpdateError("環境變數 SNAPSHOT_UPLOAD_ENCODING 無效")
+    if DAILY_PNL_RECONCILIATION_MODE not in RECONCILIATION_MODES:
+        raise PortfolioUpdateError("環境變數 DAILY_PNL_RECONCILIATION_MODE 無效")
+    shard_index, shard_count = resolve_shard(shard_index, shard_count)
+    mirror_verify_seconds = resolve_record_mirror_verify_seconds()
 
     try:
         calculation_now = resolve_calculation_context()
@@ -381,29 +800,110 @@ def run_update() -> None:
         mask_user_id(target_user_id),
     )
 
-    api_client = CloudflareClient()
-    market_client = MarketDataClient()
+    if api_client is None:
+        api_client = CloudflareClient()
+    market_client = MarketDataClient() if market_loader is None else None
 
     logger.info("正在從 Cloudflare 獲取原始交易紀錄")
-    records = api_client.fetch_records(target_user_id=target_user_id or None)
-    df, user_list = prepare_transactions(records, target_user_id)
+    durable_benchmarks: Dict[str, str] = {}
+    prior_failures: List[str] = []
+    if targets:
+        with RUN_METRICS.stage("records"):
+            df, user_list, durable_benchmarks, prior_failures = _prepare_target_transactions(
+                logger,
+                api_client,
+                targets,
+                user_outcomes,
+            )
+    else:
+        with RUN_METRICS.stage("records"):
+            if RECORD_MIRROR_PATH and not target_user_id:
+                with RecordMirror(RECORD_MIRROR_PATH) as mirror:
+                    df, user_list = load_mirrored_records(api_client, mirror, mirror_verify_seconds)
+            else:
+                records = api_client.fetch_records(target_user_id=target_user_id or None)
+                if target_user_id:
+                    refresh_mirrored_user(target_user_id, records)
+                df, user_list = prepare_transactions(records, target_user_id)
+        if not target_user_id and shard_count > 1:
+            all_user_count = len(user_list)
+            df, user_list = select_shard_users(df, user_list, shard_index, shard_count)
+            RUN_METRICS.inc(
+                "users_total",
+                all_user_count - len(user_list),
+                outcome="skipped",
+                error_code="",
+            )
+            logger.info(
+                "使用者分片 %s/%s: 本分片 %s 位使用者",
+                shard_index,
+                shard_count,
+                len(user_list),
+            )
+            if not user_list:
+                logger.info("=== 本分片沒有使用者，略過計算 ===")
+                return
 
     logger.info("本次將處理 %s 位使用者", len(user_list))
+    prefetch = UserInputPrefetch(api_client, user_list)
+    try:
+        _run_prepared_update(
+            logger,
+            api_client,
+            market_client,
+            prefetch,
+            df,
+            user_list,
+            fallback_benchmark=fallback_benchmark,
+            calculation_now=calculation_now,
+            engine_source_commit=engine_source_commit,
+            market_loader=market_loader,
+            durable_benchmarks=durable_benchmarks,
+            user_outcomes=user_outcomes,
+            prior_failures=prior_failures,
+        )
+    finally:
+        prefetch.close()
+
+
+def _run_prepared_update(
+    logger: logging.Logger,
+    api_client,
+    market_client,
+    prefetch: UserInputPrefetch,
+    df: pd.DataFrame,
+    user_list: List[str],
+    *,
+    fallback_benchmark: str,
+    calculation_now,
+    engine_source_commit: str,
+    market_loader: Optional[MarketLoader] = None,
+    durable_benchmarks: Optional[Mapping[str, str]] = None,
+    user_outcomes: Optional[Dict[str, Optional[Exception]]] = None,
+    prior_failures: Sequence[str] = (),
+) -> None:
+    durable_benchmarks = durable_benchmarks or {}
     user_benchmarks = {}
-    all_tickers = set(df["Symbol"].unique().tolist())
+    partition = UserLedgerPartition(df)
+    all_tickers = set().union(*partition.symbols.values())
     required_dates_by_ticker = {
-        str(symbol): group["Date"].min()
-        for symbol, group in df.groupby("Symbol")
+        str(symbol): first_date
+        for symbol, first_date in df.groupby("Symbol")["Date"].min().items()
     }
 
+    fetched_benchmarks = prefetch.fetch_benchmarks(known=durable_benchmarks)
     for user_id in user_list:
-        benchmark = api_client.get_user_benchmark(user_id)
-        if benchmark == "SPY" and fallback_benchmark != "SPY":
+        benchmark = fetched_benchmarks[user_id]
+        if (
+            user_id not in durable_benchmarks
+            and benchmark == "SPY"
+            and fallback_benchmark != "SPY"
+        ):
             benchmark = fallback_benchmark
         user_benchmarks[user_id] = benchmark
         all_tickers.add(benchmark)
 
-        user_first_date = df.loc[df["user_id"] == user_id, "Date"].min()
+        user_first_date = partition.first_dates.get(user_id, pd.NaT)
         benchmark_required_date = user_first_date - timedelta(days=1)
         existing_required = required_dates_by_ticker.get(benchmark)
         if existing_required is None or benchmark_required_date < existing_required:
@@ -415,32 +915,45 @@ def run_update() -> None:
     fetch_start_date = earliest_transaction_date - timedelta(days=90)
     logger.info("最早交易日期: %s", earliest_transaction_date.strftime("%Y-%m-%d"))
     logger.info("開始下載市場數據，標的數: %s", len(all_tickers))
-    market_client.download_data(sorted(all_tickers), fetch_start_date)
-
-    inserted_dates = ensure_transaction_dates_in_market_calendar(
-        market_client,
-        df,
-        allow_leading_transaction_seed=True,
-        as_of_date=calculation_now,
-    )
-    if inserted_dates:
-        inserted_count = sum(len(dates) for dates in inserted_dates.values())
-        logger.info(
-            "已加入 %s 個缺失交易估值日期，涵蓋 %s 個標的",
-            inserted_count,
-            len(inserted_dates),
+    RUN_METRICS.set("market_symbols", len(all_tickers))
+    with RUN_METRICS.stage("market_download"):
+        if market_loader is None:
+            market_client.download_data(sorted(all_tickers), fetch_start_date)
+        else:
+            market_client = market_loader(sorted(all_tickers), fetch_start_date)
+
+    with RUN_METRICS.stage("market_calendar"):
+        inserted_dates = ensure_transaction_dates_in_market_calendar(
+            market_client,
+            df,
+            allow_leading_transaction_seed=True,
+            as_of_date=calculation_now,
         )
+        if inserted_dates:
+            inserted_count = sum(len(dates) for dates in inserted_dates.values())
+            logger.info(
+                "已加入 %s 個缺失交易估值日期，涵蓋 %s 個標的",
+                inserted_count,
+                len(inserted_dates),
+            )
 
-    validate_required_market_data(
-        market_client,
-        all_tickers,
-        required_dates_by_ticker=required_dates_by_ticker,
-    )
+        validate_required_market_data(
+            market_client,
+            all_tickers,
+            required_dates_by_ticker=required_dates_by_ticker,
+        )
+    for source, count in count_synthetic_valuation_rows(market_client).items():
+        RUN_METRICS.set("synthetic_valuation_rows", count, valuation_source=source)
 
-    failed_users: List[str] = []
+    failed_users: List[str] = list(prior_failures)
     successful_users = 0
+    submitted_users: List[str] = []
+    uploader = SnapshotUploadPipeline(api_client)
+    calculation_started = time.perf_counter()
+    user_spans = TRACER.phases("user")
 
     for user_id in user_list:
+        user_spans.begin("user")
         masked_user = mask_user_id(user_id)
         benchmark = user_benchmarks[user_id]
         validator_logger = logging.getLogger("journal_engine.core.validator")
@@ -449,20 +962,28 @@ def run_update() -> None:
 
         try:
             logger.info("正在處理使用者 %s (Benchmark: %s)", masked_user, benchmark)
-            raw_user_df = df[df["user_id"] == user_id].copy(deep=True)
+            raw_user_df = partition.frame(user_id)
             if raw_user_df.empty:
                 raise PortfolioUpdateError("使用者交易資料意外為空")
 
-            cash_report = observe_shadow_cash_ledger(api_client, user_id, raw_user_df)
+            with TRACER.span("shadow_cash_ledger"):
+                cash_report = observe_shadow_cash_ledger(
+                    api_client,
+                    user_id,
+                    raw_user_df,
+                    cash_events_future=prefetch.cash_events_future(user_id),
+                )
 
-            validation_df = build_split_adjusted_validation_ledger(
-                raw_user_df,
-                market_client,
-            )
-            integrity_audit = validate_transaction_prefix_integrity(
-                validation_df,
-                user_label=masked_user,
-            )
+            with TRACER.span("split_validation_ledger"):
+                validation_df = build_split_adjusted_validation_ledger(
+                    raw_user_df,
+                    market_client,
+                )
+            with TRACER.span("prefix_integrity"):
+                integrity_audit = validate_transaction_prefix_integrity(
+                    validation_df,
+                    user_label=masked_user,
+                )
             logger.info(
                 "交易 prefix integrity 通過: user=%s rows=%s scopes=%s symbol_scopes=%s",
                 masked_user,
@@ -472,7 +993,7 @@ def run_update() -> None:
             )
 
             calculator = PortfolioCalculator(
-                raw_user_df.copy(deep=True),
+                raw_user_df,
                 market_client,
                 benchmark_ticker=benchmark,
                 api_client=api_client,
@@ -483,7 +1004,8 @@ def run_update() -> None:
             legacy_mismatch_capture = LegacyDailyPnLMismatchCapture()
             calculator_logger.addFilter(legacy_mismatch_capture)
             try:
-                snapshot = calculator.run()
+                with TRACER.span("calculator", rows=len(raw_user_df)):
+                    snapshot = calculator.run()
             finally:
                 calculator_logger.removeFilter(legacy_mismatch_capture)
 
@@ -495,11 +1017,13 @@ def run_update() -> None:
                     f"計算期間 validator 回報 {len(calculation_capture.messages)} 項錯誤"
                 )
 
-            reconciliation_results = reconcile_snapshot_daily_pnl(
-                snapshot,
-                calculator.df,
-                calculator,
-            )
+            with TRACER.span("daily_pnl_reconciliation"):
+                reconciliation_results = reconcile_snapshot_daily_pnl(
+                    snapshot,
+                    calculator.df,
+                    calculator,
+                    independent=DAILY_PNL_RECONCILIATION_MODE == "independent",
+                )
             reconciled_groups = sum(
                 result.get("status") == "reconciled"
                 for result in reconciliation_results
@@ -523,6 +1047,9 @@ def run_update() -> None:
                 )
                 fx_context = {}
 
+            all_group = snapshot.groups.get("all")
+            all_history = all_group.history_columns if all_group is not None else None
+
             try:
                 snapshot = attach_account_value_preview(
                     snapshot,
@@ -547,32 +1074,88 @@ def run_update() -> None:
                     type(exc).__name__,
                 )
 
+            if isinstance(snapshot, PortfolioSnapshotWithAccountPreviews):
+                try:
+                    with TRACER.span("account_value_history"):
+                        snapshot = attach_account_value_history(
+                            snapshot,
+                            history=all_history,
+                            cash_report=cash_report,
+                            fx_rates_by_currency=getattr(market_client, "fx_rates_by_currency", None),
+                        )
+                    account_history = snapshot.account_value_history
+                    logger.info(
+                        "Account value history [status=%s,days=%s,currencies=%s,reason=%s,missing_fx=%s]",
+                        account_history.status,
+                        len(account_history.dates),
+                        [series.currency for series in account_history.cash_series],
+                        account_history.reason,
+                        account_history.missing_cash_fx_currencies,
+                    )
+                except Exception as exc:
+                    # Additive like the current preview: never block the snapshot.
+                    logger.warning(
+                        "Account value history unavailable [stage=assemble,error=%s]",
+                        type(exc).__name__,
+                    )
+
             try:
-                snapshot.calculation_manifest = build_production_calculation_manifest(
-                    raw_user_df=raw_user_df,
-                    market_client=market_client,
-                    benchmark=benchmark,
-                    calculation_now=calculation_now,
-                    engine_source_commit=engine_source_commit,
-                    oversell_policy=PRODUCTION_OVERSELL_POLICY,
-                )
+                with TRACER.span("calculation_manifest"):
+                    snapshot.calculation_manifest = build_production_calculation_manifest(
+                        raw_user_df=raw_user_df,
+                        market_client=market_client,
+                        benchmark=benchmark,
+                        calculation_now=calculation_now,
+                        engine_source_commit=engine_source_commit,
+                        oversell_policy=PRODUCTION_OVERSELL_POLICY,
+                    )
             except ProductionManifestError as exc:
                 raise PortfolioUpdateError(
                     f"calculation manifest assembly failed: {exc}"
                 ) from exc
 
-            validate_before_upload(snapshot, validation_df)
-            if api_client.upload_portfolio(snapshot, target_user_id=user_id) is not True:
-                raise PortfolioUpdateError("Worker 未明確確認上傳成功")
-
-            successful_users += 1
-            logger.info("使用者 %s 處理成功", masked_user)
+            with TRACER.span("validate_before_upload"):
+                validate_before_upload(snapshot, validation_df)
+            uploader.submit(user_id, snapshot)
+            submitted_users.append(user_id)
         except Exception as exc:
             failed_users.append(masked_user)
+            if user_outcomes is not None:
+                user_outcomes[user_id] = exc
             logger.exception("使用者 %s 處理失敗: %s", masked_user, exc)
         finally:
             validator_logger.removeHandler(calculation_capture)
+    user_spans.end()
+
+    RUN_METRICS.inc(
+        "stage_duration_seconds_total",
+        time.perf_counter() - calculation_started,
+        stage="calculation",
+    )
+    with RUN_METRICS.stage("upload_drain"):
+        upload_results = uploader.drain()
+    for user_id in submitted_users:
+        masked_user = mask_user_id(user_id)
+        upload_error = upload_results.get(
+            user_id,
+            PortfolioUpdateError("Worker 未明確確認上傳成功"),
+        )
+        if user_outcomes is not None:
+            user_outcomes[user_id] = upload_error
+        if upload_error is not None:
+            failed_users.append(masked_user)
+            logger.error(
+                "使用者 %s 處理失敗: %s",
+                masked_user,
+                upload_error,
+                exc_info=upload_error,
+            )
+            continue
+        successful_users += 1
+        logger.info("使用者 %s 處理成功", masked_user)
 
+    RUN_METRICS.inc("users_total", successful_users, outcome="succeeded", error_code="")
+    api_client.log_endpoint_latency()
     if failed_users:
         raise PortfolioUpdateError(
             f"本次更新有 {len(failed_users)} 位使用者失敗；成功 {successful_users} 位"
@@ -0,0 +1,72 @@
+-- Additive record change feed for incremental engine record mirrors.
+--
+-- This migration does not change the canonical schema compatibility version.
+-- Only the GET /api/records?after_change= feed depends on it; deployment must
+-- apply migrations before the engine enables RECORD_MIRROR_PATH.
+--
+-- Every insert, update and delete of a record takes the next value of one
+-- monotonically increasing change sequence. Live rows carry it in
+-- records.change_seq; a deleted row leaves a tombstone carrying it. Triggers
+-- assign the sequence, so every write path is covered: record create/update/
+-- delete, metadata enrichment, dividend events and journal restores.
+
+CREATE TABLE IF NOT EXISTS record_change_sequence (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  value INTEGER NOT NULL CHECK (value >= 0)
+);
+
+ALTER TABLE records ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+
+-- Existing rows take their AUTOINCREMENT id as their change sequence before the
+-- triggers exist; the counter continues above every backfilled value.
+UPDATE records SET change_seq = id;
+
+INSERT OR IGNORE INTO record_change_sequence (id, value)
+SELECT 1, COALESCE(MAX(id), 0) FROM records;
+
+CREATE TABLE IF NOT EXISTS record_tombstones (
+  record_id INTEGER PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  change_seq INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_records_change_seq
+  ON records (change_seq);
+
+CREATE INDEX IF NOT EXISTS idx_records_user_change_seq
+  ON records (user_id, change_seq);
+
+CREATE INDEX IF NOT EXISTS idx_record_tombstones_change_seq
+  ON record_tombstones (change_seq);
+
+CREATE INDEX IF NOT EXISTS idx_record_tombstones_user_change_seq
+  ON record_tombstones (user_id, change_seq);
+
+CREATE TRIGGER IF NOT EXISTS trg_records_change_insert
+AFTER INSERT ON records
+BEGIN
+  UPDATE record_change_sequence SET value = value + 1 WHERE id = 1;
+  UPDATE records
+  SET change_seq = (SELECT value FROM record_change_sequence WHERE id = 1)
+  WHERE id = NEW.id;
+  DELETE FROM record_tombstones WHERE record_id = NEW.id;
+END;
+
+-- The WHEN guard skips the trigger's own change_seq write, so it never recurses.
+CREATE TRIGGER IF NOT EXISTS trg_records_change_update
+AFTER UPDATE ON records
+WHEN NEW.change_seq IS OLD.change_seq
+BEGIN
+  UPDATE record_change_sequence SET value = value + 1 WHERE id = 1;
+  UPDATE records
+  SET change_seq = (SELECT value FROM record_change_sequence WHERE id = 1)
+  WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_records_change_delete
+AFTER DELETE ON records
+BEGIN
+  UPDATE record_change_sequence SET value = value + 1 WHERE id = 1;
+  INSERT OR REPLACE INTO record_tombstones (record_id, user_id, change_seq)
+  VALUES (OLD.id, OLD.user_id, (SELECT value FROM record_change_sequence WHERE id = 1));
+END;
@@ -0,0 +1,197 @@
+"""Benchmark peak per-user allocations of the engine's ledger stages.
+
+Builds a synthetic multi-user ledger through ``main.prepare_transactions`` and
+runs each user through the frame-heavy stages that precede the calculator: user
+selection, the split-adjusted validation ledger, prefix integrity, ledger parity
+and the Daily P&L attribution table. ``tracemalloc`` records the peak allocation
+of every stage and of the whole per-user pass.
+
+Two modes are compared in one process:
+
+* ``cow``: the engine as shipped, with pandas copy-on-write enabled.
+* ``eager``: copy-on-write disabled and every stage handed a deep copy of its
+  input, reproducing the defensive-copy discipline the engine used before.
+
+No network or market data is used; split multipliers are all 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import pandas as pd
+
+import main as runner
+from journal_engine.core.daily_pnl_attribution import build_daily_attribution
+from journal_engine.core.ledger_integrity import validate_transaction_prefix_integrity
+from journal_engine.core.split_ledger import (
+    build_split_adjusted_validation_ledger,
+    validate_adjusted_ledger_parity,
+)
+
+
+# Tags are per symbol so every tag scope is itself a valid (never oversold) ledger.
+SYMBOL_TAGS = {
+    "AAPL": "core,tech",
+    "MSFT": "tech",
+    "NVDA": "tech",
+    "VOO": "",
+    "QQQ": "core",
+    "2330.TW": "core",
+    "0050.TW": "income",
+    "2317.TW": "",
+}
+SYMBOLS = tuple(SYMBOL_TAGS)
+STAGES = ("select", "split_ledger", "prefix_integrity", "ledger_parity", "attribution")
+
+
+class _UnitSplitMarket:
+    """Market stand-in whose split multiplier is always 1."""
+
+    def get_transaction_multiplier(self, symbol, transaction_date):
+        return 1.0
+
+
+def synthetic_records(users: int, rows_per_user: int, seed: int = 7) -> list[dict]:
+    """Return Worker-shaped records that never sell more than is held."""
+    rng = random.Random(seed)
+    records: list[dict] = []
+    record_id = 1
+    start = pd.Timestamp("2020-01-02")
+    for user in range(users):
+        held: dict[str, int] = {}
+        offsets = sorted(rng.randint(0, 2000) for _ in range(rows_per_user))
+        for offset in offsets:
+            symbol = rng.choice(SYMBOLS)
+            txn_type = "BUY"
+            if held.get(symbol, 0) > 5 and rng.random() < 0.3:
+                txn_type = "SELL"
+            elif held.get(symbol, 0) > 0 and rng.random() < 0.05:
+                txn_type = "DIV"
+            qty = rng.randint(1, 5)
+            if txn_type == "BUY":
+                held[symbol] = held.get(symbol, 0) + qty
+            elif txn_type == "SELL":
+                held[symbol] -= qty
+            records.append(
+                {
+                    "id": record_id,
+                    "user_id": f"user{user:05d}@example.com",
+                    "txn_date": (start + pd.Timedelta(days=offset)).strftime("%Y-%m-%d"),
+                    "symbol": symbol,
+                    "txn_type": txn_type,
+                    "qty": qty,
+                    "price": round(20 + rng.random() * 300, 4),
+                    "fee": 1.0,
+                    "tax": 0.0,
+                    "tag": SYMBOL_TAGS[symbol],
+                    "currency": "TWD" if symbol.endswith(".TW") else "USD",
+                }
+            )
+            record_id += 1
+    records.sort(key=lambda record: (record["txn_date"], record["id"]))
+    return records
+
+
+def _measure(stage: Callable[[], object]) -> tuple[object, int, int]:
+    """Run ``stage`` and return its result, stage peak and absolute traced peak."""
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = stage()
+    peak = tracemalloc.get_traced_memory()[1]
+    return result, peak - baseline, peak
+
+
+def run_mode(df: pd.DataFrame, user_list: list[str], eager: bool) -> dict[str, float]:
+    """Return mean per-stage peak KiB plus the max per-user peak and wall time."""
+    hand = (lambda frame: frame.copy(deep=True)) if eager else (lambda frame: frame)
+    market = _UnitSplitMarket()
+    totals = {stage: 0 for stage in STAGES}
+    max_user_peak = 0
+    started = time.perf_counter()
+
+    with pd.option_context("mode.copy_on_write", not eager):
+        tracemalloc.start()
+        try:
+            for user_id in user_list:
+                user_baseline = tracemalloc.get_traced_memory()[0]
+                peaks: list[int] = []
+
+                def record(stage: str, measured: tuple[object, int, int]) -> object:
+                    result, stage_peak, absolute_peak = measured
+                    totals[stage] += stage_peak
+                    peaks.append(absolute_peak)
+                    return result
+
+                raw = record("select", _measure(lambda: hand(df[df["user_id"] == user_id])))
+                validation = record(
+                    "split_ledger",
+                    _measure(lambda: build_split_adjusted_validation_ledger(hand(raw), market)),
+                )
+                record(
+                    "prefix_integrity",
+                    _measure(lambda: validate_transaction_prefix_integrity(hand(validation))),
+                )
+                record(
+                    "ledger_parity",
+                    _measure(
+                        lambda: validate_adjusted_ledger_parity(hand(raw), hand(validation))
+                    ),
+                )
+                base_date = raw["Date"].max().date()
+                record(
+                    "attribution",
+                    _measure(lambda: build_daily_attribution(hand(raw), base_date)),
+                )
+                max_user_peak = max(max_user_peak, max(peaks) - user_baseline)
+                del raw, validation
+        finally:
+            tracemalloc.stop()
+
+    count = max(1, len(user_list))
+    result = {stage: totals[stage] / count / 1024.0 for stage in STAGES}
+    result["max_user_peak"] = max_user_peak / 1024.0
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--rows-per-user", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    records = synthetic_records(max(1, args.users), max(1, args.rows_per_user))
+    df, user_list = runner.prepare_transactions(records)
+
+    results = {
+        "eager": run_mode(df, user_list, eager=True),
+        "cow": run_mode(df, user_list, eager=False),
+    }
+
+    print(f"users={len(user_list)} rows={len(df)} (mean per-user peak KiB per stage)")
+    print(f"{'stage':<20}{'eager':>12}{'cow':>12}{'ratio':>8}")
+    for stage in (*STAGES, "max_user_peak"):
+        eager_kib = results["eager"][stage]
+        cow_kib = results["cow"][stage]
+        ratio = cow_kib / eager_kib if eager_kib else 0.0
+        print(f"{stage:<20}{eager_kib:>12.1f}{cow_kib:>12.1f}{ratio:>8.2f}")
+    print(
+        f"{'seconds':<20}{results['eager']['seconds']:>12.2f}"
+        f"{results['cow']['seconds']:>12.2f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Benchmark ``main.prepare_transactions`` at growing record counts.
+
+Builds synthetic multi-user Worker records (2,000 per user) and times the
+normalizer on both input shapes it accepts: a list of record dicts and the
+records pager's ``RecordColumns``. Each size reports the best of ``--repeat``
+runs and rows per second. No network is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import main as runner
+from benchmark_engine_memory import synthetic_records
+from journal_engine.clients.api_client import RECORD_PAGE_LIMIT
+from journal_engine.clients.record_columns import RecordColumns
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+ROWS_PER_USER = 2_000
+
+
+def _best_seconds(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _as_columns(records: list[dict]) -> RecordColumns:
+    columns = RecordColumns()
+    for start in range(0, len(records), RECORD_PAGE_LIMIT):
+        columns.append_page(records[start:start + RECORD_PAGE_LIMIT])
+    return columns
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10}{'list s':>10}{'columns s':>12}{'rows/s (columns)':>20}")
+    for size in args.sizes:
+        users = max(1, size // ROWS_PER_USER)
+        records = synthetic_records(users, max(1, size // users))
+        columns = _as_columns(records)
+        list_seconds = _best_seconds(lambda: runner.prepare_transactions(records), args.repeat)
+        column_seconds = _best_seconds(lambda: runner.prepare_transactions(columns), args.repeat)
+        print(
+            f"{len(records):>10}{list_seconds:>10.3f}{column_seconds:>12.3f}"
+            f"{len(records) / column_seconds:>20,.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
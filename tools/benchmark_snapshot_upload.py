@@ -0,0 +1,162 @@
+"""Benchmark snapshot upload payload size and latency per Content-Encoding.
+
+Reads one snapshot JSON document (for example the ``data`` object returned by
+``GET /api/portfolio``) and, for each supported encoding, reports the encoded body
+size, encode time and upload round-trip latency. Uploads go to ``--url`` when given;
+otherwise to an in-process stand-in that decodes the body the way the Worker
+``POST /api/portfolio`` handler does. No production endpoint is contacted by default.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import http.server
+import json
+import statistics
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from journal_engine.clients.api_client import (
+    SNAPSHOT_UPLOAD_ENCODINGS,
+    build_worker_session,
+    encode_snapshot_payload,
+)
+
+
+# Mirrors the Worker's MAX_JSON_BYTES decoded-body limit.
+STAND_IN_MAX_JSON_BYTES = 1_048_576
+
+
+class _WorkerStandInHandler(http.server.BaseHTTPRequestHandler):
+    """Accept a portfolio upload, decode it like the Worker and parse the JSON."""
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa: N802 - BaseHTTPRequestHandler API
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        encoding = (self.headers.get("Content-Encoding") or "identity").strip().lower()
+        try:
+            if encoding == "gzip":
+                raw = gzip.decompress(raw)
+            elif encoding == "deflate":
+                raw = zlib.decompress(raw)
+            elif encoding != "identity":
+                self._reply(415, {"success": False, "error": "unsupported encoding"})
+                return
+            payload = json.loads(raw.decode("utf-8"))
+        except (OSError, zlib.error, UnicodeDecodeError, ValueError):
+            self._reply(400, {"success": False, "error": "malformed body"})
+            return
+        if not isinstance(payload, dict) or not isinstance(payload.get("data"), dict):
+            self._reply(400, {"success": False, "error": "data must be an object"})
+            return
+        stored = json.dumps(payload["data"]).encode("utf-8")
+        self._reply(
+            200,
+            {
+                "success": True,
+                "within_worker_limit": len(stored) <= STAND_IN_MAX_JSON_BYTES,
+            },
+        )
+
+
+def start_worker_stand_in() -> http.server.ThreadingHTTPServer:
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _WorkerStandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(snapshot: dict, url: str, repeats: int) -> list[dict]:
+    payload = {"target_user_id": "benchmark@example.invalid", "data": snapshot}
+    session = build_worker_session()
+    results = []
+    for encoding in SNAPSHOT_UPLOAD_ENCODINGS:
+        encode_seconds = []
+        upload_seconds = []
+        body = b""
+        for _ in range(repeats):
+            started = time.perf_counter()
+            body = encode_snapshot_payload(payload, encoding)
+            encode_seconds.append(time.perf_counter() - started)
+
+            headers = {"Content-Type": "application/json"}
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+            started = time.perf_counter()
+            response = session.post(url, data=body, headers=headers, timeout=(5.0, 60.0))
+            upload_seconds.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"{encoding} upload failed [status={response.status_code}]"
+                )
+        results.append(
+            {
+                "encoding": encoding,
+                "bytes": len(body),
+                "encode_ms": statistics.median(encode_seconds) * 1000.0,
+                "upload_ms": statistics.median(upload_seconds) * 1000.0,
+            }
+        )
+    session.close()
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshot", type=Path, help="snapshot JSON file")
+    parser.add_argument(
+        "--url",
+        default="",
+        help="upload endpoint; defaults to an in-process Worker stand-in",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    snapshot = json.loads(args.snapshot.read_text(encoding="utf-8"))
+    if isinstance(snapshot, dict) and isinstance(snapshot.get("data"), dict):
+        snapshot = snapshot["data"]
+    if not isinstance(snapshot, dict):
+        parser.error("snapshot file must contain a JSON object")
+
+    server = None
+    url = args.url
+    if not url:
+        server = start_worker_stand_in()
+        url = f"http://127.0.0.1:{server.server_port}/api/portfolio"
+    try:
+        results = benchmark(snapshot, url, max(1, args.repeats))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    identity_bytes = results[0]["bytes"]
+    print(f"{'encoding':<10}{'bytes':>12}{'ratio':>8}{'encode_ms':>12}{'upload_ms':>12}")
+    for row in results:
+        print(
+            f"{row['encoding']:<10}{row['bytes']:>12}"
+            f"{row['bytes'] / identity_bytes:>8.3f}"
+            f"{row['encode_ms']:>12.1f}{row['upload_ms']:>12.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""Serve calculation jobs from a long-running process with warm market data.
+
+A cold ``run_portfolio_update.py`` run imports the engine, downloads every ticker
+and FX series, then calculates. This daemon keeps the engine imported, one Worker
+session open and the last market download (prices, FX and benchmark series) in
+memory, so a single-user job only pays for its records, settings and calculation.
+
+Jobs are JSON files in a spool directory that stands in for the Worker job table:
+``pending/`` holds queued jobs, a job is claimed by an atomic rename into
+``running/``, and its final ``succeeded``/``failed`` status with a safe error code
+is written to ``done/``. A job is either ``{"calculation_job_id": "job_..."}``,
+resolved through the Worker exactly like a hosted run, or a local
+``{"target_user_id": ..., "benchmark": ...}`` request; ``{}`` runs every user.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import pandas as pd
+
+import main as runner
+import run_portfolio_update as job_runner
+from journal_engine.clients.api_client import CloudflareClient
+from journal_engine.run_metrics import RUN_METRICS
+
+
+DEFAULT_REFRESH_SECONDS = 300.0
+DEFAULT_POLL_SECONDS = 1.0
+QUEUE_STATES = ("pending", "running", "done")
+JOB_CONTEXT_ENV_KEYS = (
+    "CALCULATION_JOB_ID",
+    "TARGET_USER_ID",
+    "CUSTOM_BENCHMARK",
+    job_runner.VERIFIED_JOB_CONTEXT_ENV,
+)
+
+
+def _job_view(client):
+    """Return a per-job view that shares frames but not the symbol mapping.
+
+    Calendar insertion replaces ``market_data[symbol]`` with a new frame for the
+    job's transaction dates; a private mapping keeps those synthetic rows out of
+    the warm generation and out of later jobs.
+    """
+    view = copy.copy(client)
+    view.market_data = dict(client.market_data)
+    return view
+
+
+class WarmMarketCache:
+    """Keep one downloaded market generation and hand out isolated job views.
+
+    The warm universe only grows: a job that needs a ticker the generation lacks,
+    or an earlier start date, triggers a download of the union. Jobs therefore
+    see the same frames an all-user run over that universe would download.
+    ``refresh`` replaces the generation in the background; running jobs keep
+    the view they were given.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], object] = runner.MarketDataClient,
+        *,
+        max_age_seconds: float = 2 * DEFAULT_REFRESH_SECONDS,
+    ) -> None:
+        self._client_factory = client_factory
+        self._max_age_seconds = max_age_seconds
+        self._state_lock = threading.Lock()
+        self._download_lock = threading.Lock()
+        self._client = None
+        self._tickers: frozenset = frozenset()
+        self._start_date: Optional[pd.Timestamp] = None
+        self._loaded_at = 0.0
+        self.generation = 0
+        self.logger = logging.getLogger("calculation_daemon")
+
+    def _covers(self, tickers: Iterable[str], start_date: pd.Timestamp) -> bool:
+        if self._client is None or self._start_date is None:
+            return False
+        if time.monotonic() - self._loaded_at > self._max_age_seconds:
+            return False
+        if start_date < self._start_date:
+            return False
+        downloaded = self._client.market_data
+        return all(downloaded.get(ticker) is not None for ticker in tickers)
+
+    def _download(self, tickers: frozenset, start_date: pd.Timestamp) -> None:
+        client = self._client_factory()
+        started = time.perf_counter()
+        client.download_data(sorted(tickers), start_date)
+        with self._state_lock:
+            self._client = client
+            self._tickers = tickers
+            self._start_date = start_date
+            self._loaded_at = time.monotonic()
+            self.generation += 1
+            generation = self.generation
+        self.logger.info(
+            "Market generation %s loaded [tickers=%s,start=%s,seconds=%.1f]",
+            generation,
+            len(tickers),
+            start_date.strftime("%Y-%m-%d"),
+            time.perf_counter() - started,
+        )
+
+    def load(self, tickers: List[str], start_date: pd.Timestamp):
+        """``main.run_update`` market loader backed by the warm generation."""
+        start = pd.Timestamp(start_date)
+        with self._state_lock:
+            if self._covers(tickers, start):
+                RUN_METRICS.inc("market_cache_requests_total", result="hit")
+                return _job_view(self._client)
+
+        with self._download_lock:
+            with self._state_lock:
+                if self._covers(tickers, start):
+                    RUN_METRICS.inc("market_cache_requests_total", result="hit")
+                    return _job_view(self._client)
+                universe = self._tickers.union(tickers)
+                if self._start_date is not None:
+                    start = min(start, self._start_date)
+            RUN_METRICS.inc("market_cache_requests_total", result="miss")
+            self._download(universe, start)
+            with self._state_lock:
+                return _job_view(self._client)
+
+    def refresh(self) -> None:
+        """Re-download the current universe and swap it in as a new generation.
+
+        Histories are re-fetched whole rather than appended: split factors are
+        back-propagated from later splits and price-source selection and semantic
+        recovery look at the full frame, so appending rows could change earlier
+        valuations silently.
+        """
+        with self._download_lock:
+            with self._state_lock:
+                tickers = self._tickers
+                start = self._start_date
+            if not tickers or start is None:
+                return
+            self._download(tickers, start)
+
+
+class FileJobQueue:
+    """Spool-directory job queue standing in for the Worker job table."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.dirs = {state: self.root / state for state in QUEUE_STATES}
+        for path in self.dirs.values():
+            path.mkdir(parents=True, exist_ok=True)
+
+    def requeue_interrupted(self) -> int:
+        """Return jobs left running by a previous process to the pending queue.
+
+        Snapshot uploads replace the whole tenant snapshot, so re-running an
+        interrupted job is safe.
+        """
+        count = 0
+        for path in sorted(self.dirs["running"].glob("*.json")):
+            path.replace(self.dirs["pending"] / path.name)
+            count += 1
+        return count
+
+    def claim(self) -> Optional[Path]:
+        """Atomically move the oldest pending job into ``running/``."""
+        pending = sorted(
+            self.dirs["pending"].glob("*.json"),
+            key=lambda path: (path.stat().st_mtime, path.name),
+        )
+        for path in pending:
+            running = self.dirs["running"] / path.name
+            try:
+                path.replace(running)
+            except FileNotFoundError:
+                continue
+            return running
+        return None
+
+    def complete(self, running: Path, error_code: str) -> None:
+        if error_code and error_code not in job_runner.SAFE_FAILURE_CODES:
+            raise ValueError("unsafe calculation error code")
+        result = {
+            "status": "failed" if error_code else "succeeded",
+            "error_code": error_code or None,
+            "completed_at": time.time(),
+        }
+        done = self.dirs["done"] / running.name
+        temporary = done.with_suffix(".tmp")
+        temporary.write_text(json.dumps(result), encoding="utf-8")
+        temporary.replace(done)
+        running.unlink(missing_ok=True)
+
+
+def parse_job(path: Path) -> Dict[str, str]:
+    """Read a job file into the environment overrides of one calculation."""
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(payload, dict):
+        raise ValueError("calculation job must be a JSON object")
+    values = {}
+    for key in ("calculation_job_id", "target_user_id", "benchmark"):
+        value = payload.get(key, "")
+        if not isinstance(value, str):
+            raise ValueError(f"calculation job field {key} must be a string")
+        values[key] = value.strip()
+    return {
+        "CALCULATION_JOB_ID": values["calculation_job_id"],
+        "TARGET_USER_ID": "" if values["calculation_job_id"] else values["target_user_id"],
+        "CUSTOM_BENCHMARK": values["benchmark"].upper(),
+    }
+
+
+class CalculationDaemon:
+    """Run queued jobs one at a time against a shared client and warm market data."""
+
+    def __init__(
+        self,
+        job_queue: FileJobQueue,
+        cache: WarmMarketCache,
+        api_client=None,
+        *,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+    ) -> None:
+        self.job_queue = job_queue
+        self.cache = cache
+        self.api_client = api_client if api_client is not None else CloudflareClient()
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger("calculation_daemon")
+
+    def _refresh_loop(self) -> None:
+        while not self.stop_event.wait(self.refresh_seconds):
+            try:
+                self.cache.refresh()
+            except Exception as exc:
+                # The previous generation stays in service; jobs that outlive its
+                # max age force a synchronous download that fails closed.
+                self.logger.warning(
+                    "Market refresh failed; keeping generation %s [error=%s]",
+                    self.cache.generation,
+                    type(exc).__name__,
+                )
+
+    def run_job(self, overrides: Dict[str, str]) -> str:
+        """Run one calculation with job-scoped environment; return its error code."""
+        saved = {key: os.environ.get(key) for key in JOB_CONTEXT_ENV_KEYS}
+        try:
+            for key, value in overrides.items():
+                os.environ[key] = value
+            return job_runner.run_calculation(
+                api_client=self.api_client,
+                market_loader=self.cache.load,
+            )
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    def process_one(self) -> bool:
+        running = self.job_queue.claim()
+        if running is None:
+            return False
+
+        started = time.perf_counter()
+        try:
+            error_code = self.run_job(parse_job(running))
+        except (OSError, ValueError) as exc:
+            self.logger.error(
+                "Calculation job %s is malformed [error=%s]",
+                running.stem,
+                type(exc).__name__,
+            )
+            error_code = job_runner.CONFIGURATION_FAILED
+
+        self.job_queue.complete(running, error_code)
+        job_runner.export_run_metrics(error_code)
+        self.logger.info(
+            "Calculation job %s finished [status=%s,error_code=%s,seconds=%.1f,generation=%s]",
+            running.stem,
+            "failed" if error_code else "succeeded",
+            error_code or "-",
+            time.perf_counter() - started,
+            self.cache.generation,
+        )
+        return True
+
+    def serve(self, *, once: bool = False) -> None:
+        requeued = self.job_queue.requeue_interrupted()
+        if requeued:
+            self.logger.warning("Re-queued %s interrupted calculation jobs", requeued)
+
+        refresher = None
+        if not once:
+            refresher = threading.Thread(
+                target=self._refresh_loop,
+                name="market-refresh",
+                daemon=True,
+            )
+            refresher.start()
+        try:
+            while not self.stop_event.is_set():
+                if self.process_one():
+                    continue
+                if once:
+                    break
+                self.stop_event.wait(self.poll_seconds)
+        finally:
+            self.stop_event.set()
+            if refresher is not None:
+                refresher.join(timeout=1.0)
+            self.api_client.log_endpoint_latency()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("queue_dir", type=Path, help="job spool directory")
+    parser.add_argument(
+        "--refresh-seconds",
+        type=float,
+        default=DEFAULT_REFRESH_SECONDS,
+        help="background market refresh interval",
+    )
+    parser.add_argument(
+        "--max-age-seconds",
+        type=float,
+        default=None,
+        help="oldest market generation a job may use (default: 2x refresh)",
+    )
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS)
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="drain the pending queue and exit",
+    )
+    args = parser.parse_args(argv)
+    if args.refresh_seconds <= 0 or args.poll_seconds <= 0:
+        parser.error("intervals must be positive")
+    max_age = args.max_age_seconds
+    if max_age is None:
+        max_age = 2 * args.refresh_seconds
+
+    runner.setup_logging()
+    daemon = CalculationDaemon(
+        FileJobQueue(args.queue_dir),
+        WarmMarketCache(max_age_seconds=max_age),
+        refresh_seconds=args.refresh_seconds,
+        poll_seconds=args.poll_seconds,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop_event.set())
+    try:
+        daemon.serve(once=args.once)
+    except KeyboardInterrupt:
+        daemon.stop_event.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
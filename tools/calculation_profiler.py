@@ -0,0 +1,405 @@
+"""Profile one calculation run offline and write a Chrome trace of its spans.
+
+``run_portfolio_update.py --profile DIR`` (or this module directly) runs the
+normal ``run_update`` path against local inputs instead of the Worker and Yahoo:
+
+* records come from a JSON export of the Worker records (a list, or an object with
+  ``records`` and optional per-user ``benchmarks`` / ``cash_events``) or from the
+  synthetic multi-user ledger of ``benchmark_engine_memory``;
+* market data is synthetic (a deterministic random walk per ticker, no corporate
+  actions), replayed from a directory written earlier by ``--record-market``, or,
+  with ``--market live --record-market DIR``, downloaded once and saved there;
+* snapshots are serialized like an upload and discarded, or kept with ``--keep-snapshots``.
+
+``DIR/trace.json`` holds the nested spans (stages, users, calculator groups,
+day-loop phases, market batches and per-ticker fetches) for ``chrome://tracing``
+or https://ui.perfetto.dev. ``--cprofile`` adds ``profile.pstats`` and a
+cumulative-time summary of the main thread; ``--sample-interval-ms`` adds
+``samples.folded``, all-thread stacks in the folded format flame graph tools read.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import hashlib
+import io
+import json
+import os
+import pickle
+import pstats
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np
+import pandas as pd
+
+import run_portfolio_update as job_runner
+from benchmark_engine_memory import synthetic_records
+from journal_engine.clients.market_data import load_yfinance
+from journal_engine.clients.semantic_market_data import SemanticMarketDataClient
+from journal_engine.tracing import TRACER
+
+MARKET_MODES = ("synthetic", "replay", "live")
+TRACE_FILE = "trace.json"
+PSTATS_FILE = "profile.pstats"
+PSTATS_SUMMARY_FILE = "profile.txt"
+SAMPLES_FILE = "samples.folded"
+PSTATS_SUMMARY_LINES = 60
+_DAILY_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends", "Stock Splits")
+
+
+class OfflineWorkerClient:
+    """Worker API stand-in serving local records; uploads are serialized, not sent."""
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        *,
+        benchmarks: Optional[Dict[str, str]] = None,
+        cash_events: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        snapshot_dir: Optional[Path] = None,
+    ) -> None:
+        self._records = records
+        self._benchmarks = dict(benchmarks or {})
+        self._cash_events = dict(cash_events or {})
+        self._snapshot_dir = snapshot_dir
+        self._lock = threading.Lock()
+        self.uploaded_bytes = 0
+        self.uploads = 0
+
+    def fetch_records(self, target_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if not target_user_id:
+            return list(self._records)
+        return [record for record in self._records if record.get("user_id") == target_user_id]
+
+    def get_user_benchmark(self, user_email: str) -> str:
+        return self._benchmarks.get(user_email, "SPY")
+
+    def fetch_cash_events(self, target_user_id: str) -> List[Dict[str, Any]]:
+        return list(self._cash_events.get(target_user_id, ()))
+
+    def upload_portfolio(self, snapshot, target_user_id: Optional[str] = None) -> bool:
+        payload = json.dumps(
+            {"target_user_id": target_user_id, "data": snapshot.model_dump(mode="json")},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        with self._lock:
+            self.uploads += 1
+            self.uploaded_bytes += len(payload)
+            sequence = self.uploads
+        if self._snapshot_dir is not None:
+            self._snapshot_dir.mkdir(parents=True, exist_ok=True)
+            (self._snapshot_dir / f"snapshot-{sequence:05d}.json").write_bytes(payload)
+        return True
+
+    def endpoint_latency(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def log_endpoint_latency(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+def _empty_history() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(_DAILY_COLUMNS), dtype=float)
+
+
+class SyntheticTicker:
+    """Deterministic daily bars for one symbol; intraday and quote lookups are empty."""
+
+    fast_info: Dict[str, float] = {}
+
+    def __init__(self, symbol: str, end_date: pd.Timestamp) -> None:
+        self.symbol = symbol
+        self._end_date = pd.Timestamp(end_date).normalize()
+
+    def _level(self) -> float:
+        if self.symbol.endswith("=X"):
+            return 30.0 if self.symbol.startswith("TWD") else 1.0
+        return 50.0
+
+    def history(self, start=None, interval: Optional[str] = None, **_: Any) -> pd.DataFrame:
+        if interval is not None or start is None:
+            return _empty_history()
+        index = pd.bdate_range(pd.Timestamp(start).normalize(), self._end_date)
+        if index.empty:
+            return _empty_history()
+        seed = int(hashlib.sha256(self.symbol.encode("utf-8")).hexdigest()[:8], 16)
+        # Walk from a fixed epoch so any start date sees the same prices for a day.
+        offset = len(pd.bdate_range("2000-01-03", index[0])) - 1
+        steps = np.random.default_rng(seed).normal(0.0002, 0.01, offset + len(index))
+        close = self._level() * np.exp(np.cumsum(steps)[offset:])
+        frame = pd.DataFrame(
+            {
+                "Open": close,
+                "High": close,
+                "Low": close,
+                "Close": close,
+                "Adj Close": close,
+                "Volume": 1_000_000.0,
+                "Dividends": 0.0,
+                "Stock Splits": 0.0,
+            },
+            index=index,
+        )
+        frame.index.name = "Date"
+        return frame
+
+
+def _history_path(directory: Path, symbol: str, kind: str) -> Path:
+    safe = "".join(char if char.isalnum() or char in ".-_" else "_" for char in symbol)
+    return directory / f"{safe}.{kind}.pkl"
+
+
+def _history_kind(interval: Optional[str]) -> str:
+    return "daily" if interval is None else f"intraday-{interval}"
+
+
+class ReplayTicker:
+    """Serve histories saved by :class:`RecordingTicker`; missing ones are empty."""
+
+    fast_info: Dict[str, float] = {}
+
+    def __init__(self, symbol: str, directory: Path) -> None:
+        self.symbol = symbol
+        self._directory = directory
+
+    def history(self, interval: Optional[str] = None, **_: Any) -> pd.DataFrame:
+        path = _history_path(self._directory, self.symbol, _history_kind(interval))
+        if not path.exists():
+            return _empty_history()
+        with path.open("rb") as handle:
+            return pickle.load(handle)
+
+
+class RecordingTicker:
+    """Wrap a provider ticker and save every history it returns for later replay."""
+
+    fast_info: Dict[str, float] = {}
+
+    def __init__(self, ticker, symbol: str, directory: Path) -> None:
+        self._ticker = ticker
+        self.symbol = symbol
+        self._directory = directory
+
+    def history(self, **kwargs: Any) -> pd.DataFrame:
+        frame = self._ticker.history(**kwargs)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = _history_path(self._directory, self.symbol, _history_kind(kwargs.get("interval")))
+        with path.open("wb") as handle:
+            pickle.dump(frame, handle)
+        return frame
+
+
+class ProfilingMarketDataClient(SemanticMarketDataClient):
+    """Production market client whose provider tickers come from ``ticker_factory``."""
+
+    def __init__(self, ticker_factory: Callable[[str], Any]) -> None:
+        super().__init__()
+        self._ticker_factory = ticker_factory
+
+    def _ticker(self, symbol: str):
+        return self._ticker_factory(symbol)
+
+
+def ticker_factory(mode: str, record_dir: Optional[Path], end_date: pd.Timestamp):
+    if mode == "synthetic":
+        return lambda symbol: SyntheticTicker(symbol, end_date)
+    if mode == "replay":
+        return lambda symbol: ReplayTicker(symbol, record_dir)
+    if record_dir is None:
+        return lambda symbol: load_yfinance().Ticker(symbol)
+    return lambda symbol: RecordingTicker(load_yfinance().Ticker(symbol), symbol, record_dir)
+
+
+class StackSampler:
+    """Sample every thread's Python stack on an interval and count folded stacks."""
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                functions = []
+                while frame is not None:
+                    code = frame.f_code
+                    functions.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                thread_name = names.get(ident, str(ident))
+                self.stacks[";".join([thread_name, *reversed(functions)])] += 1
+
+    def write(self, path: Path) -> None:
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+
+
+def load_record_export(path: Path) -> Dict[str, Any]:
+    """Return ``records`` plus optional ``benchmarks`` / ``cash_events`` from a JSON export."""
+    document = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(document, list):
+        document = {"records": document}
+    if not isinstance(document, dict) or not isinstance(document.get("records"), list):
+        raise ValueError("records export must be a list or an object with a records list")
+    return document
+
+
+def _source_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "0" * 40
+
+
+def profile_run(
+    output_dir: Path,
+    *,
+    api_client: OfflineWorkerClient,
+    market_factory: Callable[[str], Any],
+    use_cprofile: bool = False,
+    sample_interval_ms: float = 0.0,
+) -> str:
+    """Run one traced update and return its safe failure code ("" on success)."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # The manifest needs a full commit SHA; an offline run has no GITHUB_SHA.
+    os.environ.setdefault("GITHUB_SHA", _source_commit())
+
+    def market_loader(tickers: List[str], start_date: pd.Timestamp):
+        client = ProfilingMarketDataClient(market_factory)
+        client.download_data(tickers, start_date)
+        return client
+
+    sampler = StackSampler(sample_interval_ms / 1000.0) if sample_interval_ms > 0 else None
+    profiler = cProfile.Profile() if use_cprofile else None
+    started = time.perf_counter()
+    TRACER.start()
+    if sampler is not None:
+        sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        error_code = job_runner.run_calculation(api_client=api_client, market_loader=market_loader)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        TRACER.stop()
+    seconds = time.perf_counter() - started
+
+    TRACER.write(
+        output_dir / TRACE_FILE,
+        metadata={
+            "error_code": error_code,
+            "seconds": round(seconds, 3),
+            "records": len(api_client.fetch_records()),
+            "uploads": api_client.uploads,
+            "uploaded_bytes": api_client.uploaded_bytes,
+        },
+    )
+    if profiler is not None:
+        profiler.dump_stats(str(output_dir / PSTATS_FILE))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PSTATS_SUMMARY_LINES)
+        (output_dir / PSTATS_SUMMARY_FILE).write_text(summary.getvalue(), encoding="utf-8")
+    if sampler is not None:
+        sampler.write(output_dir / SAMPLES_FILE)
+
+    print(
+        f"profile: {seconds:.2f}s error_code={error_code or '-'} uploads={api_client.uploads} "
+        f"trace={output_dir / TRACE_FILE}"
+    )
+    return error_code
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--records", type=Path, default=None, help="JSON export of Worker records")
+    parser.add_argument("--synthetic-users", type=int, default=3)
+    parser.add_argument("--rows-per-user", type=int, default=500)
+    parser.add_argument("--market", choices=MARKET_MODES, default="synthetic")
+    parser.add_argument(
+        "--record-market",
+        type=Path,
+        default=None,
+        help="history directory: written by --market live, read by --market replay",
+    )
+    parser.add_argument("--cprofile", action="store_true", help="also write cProfile output")
+    parser.add_argument(
+        "--sample-interval-ms",
+        type=float,
+        default=0.0,
+        help="also sample all thread stacks every N ms (0 disables)",
+    )
+    parser.add_argument(
+        "--keep-snapshots",
+        action="store_true",
+        help="save each serialized snapshot under DIR/snapshots",
+    )
+
+
+def run_profile(output_dir: Path, args: argparse.Namespace) -> str:
+    if args.market == "replay" and args.record_market is None:
+        raise SystemExit("--market replay needs --record-market DIR")
+    if args.records is not None:
+        export = load_record_export(args.records)
+    else:
+        export = {"records": synthetic_records(max(1, args.synthetic_users), max(1, args.rows_per_user))}
+    api_client = OfflineWorkerClient(
+        export["records"],
+        benchmarks=export.get("benchmarks"),
+        cash_events=export.get("cash_events"),
+        snapshot_dir=output_dir / "snapshots" if args.keep_snapshots else None,
+    )
+    market_factory = ticker_factory(args.market, args.record_market, pd.Timestamp.now().normalize())
+    return profile_run(
+        output_dir,
+        api_client=api_client,
+        market_factory=market_factory,
+        use_cprofile=args.cprofile,
+        sample_interval_ms=args.sample_interval_ms,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output_dir", type=Path)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    job_runner.runner.setup_logging()
+    return 1 if run_profile(args.output_dir, args) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""Drain, coalesce and run queued calculation jobs ahead of the scheduled sweep.
+
+Every user-triggered calculation job used to get its own workflow run that redid
+the whole pipeline. This runner drains all queued jobs from the Worker
+(``GET /api/calculation-jobs``), coalesces jobs for the same user and benchmark,
+and runs them as batches that share one warm market download. Interactive jobs
+run before the optional all-user sweep. Each durable job id is still marked
+``running`` and then ``succeeded``/``failed`` individually; the job that
+dispatched this run (``CALCULATION_JOB_ID``) is acknowledged by the workflow,
+so its safe failure code is written to ``GITHUB_OUTPUT`` instead.
+
+The sweep can run as a matrix: ``--shard-index``/``--shard-count`` (or
+``SWEEP_SHARD_*``) select a stable subset of users, ``--shard-result`` writes the
+shard's counts and code, and ``--aggregate-shards`` collapses those files into
+one safe failure code.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import main as runner
+import run_portfolio_update as job_runner
+from calculation_daemon import WarmMarketCache
+from journal_engine.clients.api_client import CloudflareAPIError, CloudflareClient
+from journal_engine.run_metrics import RUN_METRICS
+
+
+@dataclass(frozen=True)
+class CalculationJob:
+    job_id: str
+    user_id: str
+    benchmark: str
+    created_at: str
+    acknowledge: bool = True
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.user_id.casefold(), self.benchmark
+
+
+@dataclass(frozen=True)
+class JobBatch:
+    """Jobs computed by one engine run; at most one benchmark per user."""
+
+    targets: Dict[str, str]
+    jobs: Tuple[CalculationJob, ...]
+
+
+def plan_batches(jobs: Iterable[CalculationJob]) -> List[JobBatch]:
+    """Coalesce jobs per user+benchmark and spread each user's benchmarks over batches.
+
+    A snapshot holds one benchmark per user, so two benchmarks for the same user
+    cannot share a run. Within a user, the benchmark requested most recently is
+    placed in the latest batch so its snapshot is the one left in place.
+    """
+    ordered = sorted(jobs, key=lambda job: (job.created_at, job.job_id))
+    groups: "OrderedDict[Tuple[str, str], List[CalculationJob]]" = OrderedDict()
+    for job in ordered:
+        groups.setdefault(job.key, []).append(job)
+        groups.move_to_end(job.key)
+
+    per_user: "OrderedDict[str, List[List[CalculationJob]]]" = OrderedDict()
+    for (user_key, _benchmark), group in groups.items():
+        per_user.setdefault(user_key, []).append(group)
+
+    batches = []
+    depth = max((len(user_groups) for user_groups in per_user.values()), default=0)
+    for level in range(depth):
+        targets: Dict[str, str] = {}
+        batch_jobs: List[CalculationJob] = []
+        for user_groups in per_user.values():
+            if level >= len(user_groups):
+                continue
+            group = user_groups[level]
+            targets[group[0].user_id] = group[0].benchmark
+            batch_jobs.extend(group)
+        batches.append(JobBatch(targets=targets, jobs=tuple(batch_jobs)))
+    return batches
+
+
+class CalculationScheduler:
+    """Run coalesced job batches, then the optional sweep, over one market cache."""
+
+    def __init__(self, api_client, cache: Optional[WarmMarketCache] = None) -> None:
+        self.api_client = api_client
+        # One process-lifetime generation: batches and the sweep share downloads
+        # and only fetch again when the ticker universe grows.
+        self.cache = cache if cache is not None else WarmMarketCache(
+            max_age_seconds=float("inf")
+        )
+        self.logger = logging.getLogger("calculation_scheduler")
+
+    def claim_queued_jobs(self, exclude: Iterable[str] = ()) -> List[CalculationJob]:
+        """Mark queued Worker jobs running; jobs the Worker refuses are skipped."""
+        excluded = set(exclude)
+        claimed = []
+        for job in self.api_client.list_queued_calculation_jobs():
+            if job["id"] in excluded:
+                continue
+            if not self.api_client.report_calculation_job_status(job["id"], "running"):
+                self.logger.info("Calculation job %s was claimed elsewhere", job["id"])
+                continue
+            claimed.append(
+                CalculationJob(
+                    job_id=job["id"],
+                    user_id=job["target_user_id"],
+                    benchmark=job["benchmark"],
+                    created_at=job["created_at"],
+                )
+            )
+        return claimed
+
+    def _run_engine(self, **update_kwargs) -> Optional[Exception]:
+        try:
+            runner.run_update(
+                api_client=self.api_client,
+                market_loader=self.cache.load,
+                **update_kwargs,
+            )
+        except Exception as exc:
+            return exc
+        return None
+
+    def run_batch(self, batch: JobBatch) -> Dict[str, str]:
+        """Run one batch and return each job id's safe failure code ("" on success)."""
+        outcomes: Dict[str, Optional[Exception]] = {}
+        privacy_filter = job_runner.VerifiedJobPrivacyFilter(next(iter(batch.targets)))
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(privacy_filter)
+        try:
+            batch_error = self._run_engine(targets=batch.targets, user_outcomes=outcomes)
+        finally:
+            job_runner.remove_verified_job_privacy_filter(privacy_filter)
+
+        job_runner.record_user_failures(exc for exc in outcomes.values() if exc)
+        by_user = {user_id.casefold(): exc for user_id, exc in outcomes.items()}
+        if batch_error is not None:
+            job_runner.record_user_failures(
+                batch_error
+                for user_id in batch.targets
+                if user_id.casefold() not in by_user
+            )
+        codes = {}
+        for job in batch.jobs:
+            user_key = job.user_id.casefold()
+            if user_key in by_user:
+                exc = by_user[user_key]
+                codes[job.job_id] = (
+                    job_runner.classify_failure(exc, per_user=True) if exc else ""
+                )
+            elif batch_error is not None:
+                codes[job.job_id] = job_runner.classify_failure(batch_error)
+            else:
+                codes[job.job_id] = job_runner.UNKNOWN_CALCULATION_FAILED
+        return codes
+
+    def acknowledge(self, job: CalculationJob, error_code: str) -> None:
+        if not job.acknowledge:
+            return
+        status = "failed" if error_code else "succeeded"
+        try:
+            accepted = self.api_client.report_calculation_job_status(
+                job.job_id,
+                status,
+                error_code,
+            )
+        except CloudflareAPIError as exc:
+            # The job stays running; its own queued workflow run recomputes it.
+            self.logger.error(
+                "Calculation job %s acknowledgement failed [error=%s]",
+                job.job_id,
+                type(exc).__name__,
+            )
+            return
+        if not accepted:
+            self.logger.warning(
+                "Calculation job %s rejected status %s",
+                job.job_id,
+                status,
+            )
+
+    def run_jobs(self, jobs: List[CalculationJob]) -> Dict[str, str]:
+        codes: Dict[str, str] = {}
+        batches = plan_batches(jobs)
+        self.logger.info(
+            "Coalesced %s calculation jobs into %s batches",
+            len(jobs),
+            len(batches),
+        )
+        for index, batch in enumerate(batches, start=1):
+            batch_codes = self.run_batch(batch)
+            for job in batch.jobs:
+                self.acknowledge(job, batch_codes[job.job_id])
+            codes.update(batch_codes)
+            self.logger.info(
+                "Calculation batch %s/%s finished [users=%s,jobs=%s,failed=%s]",
+                index,
+                len(batches),
+                len(batch.targets),
+                len(batch.jobs),
+                sum(1 for code in batch_codes.values() if code),
+            )
+        return codes
+
+    def run_sweep(
+        self,
+        shard_index: Optional[int] = None,
+        shard_count: Optional[int] = None,
+    ) -> Tuple[str, Dict[str, Optional[Exception]]]:
+        """Run the all-user (or one shard's) recalculation.
+
+        Returns the safe failure code and each processed user's outcome.
+        """
+        main_logger = logging.getLogger("main")
+        capture = job_runner.UserFailureCapture()
+        main_logger.addHandler(capture)
+        outcomes: Dict[str, Optional[Exception]] = {}
+        try:
+            error = self._run_engine(
+                user_outcomes=outcomes,
+                shard_index=shard_index,
+                shard_count=shard_count,
+            )
+        finally:
+            main_logger.removeHandler(capture)
+        job_runner.record_user_failures(capture.exceptions)
+        if error is None:
+            return "", outcomes
+        return (
+            job_runner.collapse_user_failure_codes(capture.exceptions)
+            or job_runner.classify_failure(error)
+        ), outcomes
+
+
+def write_shard_result(
+    path: Path,
+    shard_index: int,
+    shard_count: int,
+    error_code: str,
+    outcomes: Dict[str, Optional[Exception]],
+) -> None:
+    """Write one shard's aggregatable result; it carries counts, never user ids."""
+    if error_code and error_code not in job_runner.SAFE_FAILURE_CODES:
+        raise ValueError("unsafe calculation error code")
+    failed = sum(1 for exc in outcomes.values() if exc is not None)
+    result = {
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "users": len(outcomes),
+        "succeeded": len(outcomes) - failed,
+        "failed": failed,
+        "error_code": error_code or None,
+    }
+    path.write_text(json.dumps(result, sort_keys=True), encoding="utf-8")
+
+
+def aggregate_shard_results(results: Iterable[dict]) -> str:
+    """Collapse shard results into one safe failure code ("" when all succeeded).
+
+    A missing, duplicated or inconsistent shard fails closed.
+    """
+    results = list(results)
+    counts = {result.get("shard_count") for result in results}
+    if len(counts) != 1:
+        return job_runner.UNKNOWN_CALCULATION_FAILED
+    shard_count = counts.pop()
+    indices = sorted(result.get("shard_index") for result in results)
+    if not isinstance(shard_count, int) or indices != list(range(shard_count)):
+        return job_runner.UNKNOWN_CALCULATION_FAILED
+
+    codes = {result.get("error_code") or "" for result in results} - {""}
+    if not codes:
+        return ""
+    if not codes <= job_runner.SAFE_FAILURE_CODES:
+        return job_runner.UNKNOWN_CALCULATION_FAILED
+    if len(codes) == 1:
+        return codes.pop()
+    return job_runner.MULTIPLE_USER_FAILURES
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="recalculate every user after the queued jobs",
+    )
+    parser.add_argument("--shard-index", type=int, default=None)
+    parser.add_argument("--shard-count", type=int, default=None)
+    parser.add_argument(
+        "--shard-result",
+        type=Path,
+        default=None,
+        help="write this sweep shard's result JSON here",
+    )
+    parser.add_argument(
+        "--aggregate-shards",
+        type=Path,
+        default=None,
+        help="collapse the shard result JSON files in this directory and exit",
+    )
+    args = parser.parse_args(argv)
+
+    runner.setup_logging()
+    logger = logging.getLogger("calculation_runner")
+
+    if args.aggregate_shards is not None:
+        try:
+            results = [
+                json.loads(path.read_text(encoding="utf-8"))
+                for path in sorted(args.aggregate_shards.glob("*.json"))
+            ]
+        except (OSError, ValueError):
+            results = []
+        error_code = aggregate_shard_results(results)
+        job_runner.write_github_output(error_code)
+        if error_code:
+            logger.error("Portfolio update failed [error_code=%s]", error_code)
+            return 1
+        return 0
+
+    # Durable job benchmarks are passed explicitly; never inherit a stale marker.
+    os.environ.pop(job_runner.VERIFIED_JOB_CONTEXT_ENV, None)
+    own_job_id = os.environ.get("CALCULATION_JOB_ID", "").strip()
+
+    try:
+        shard_index, shard_count = runner.resolve_shard(args.shard_index, args.shard_count)
+        api_client = CloudflareClient()
+        jobs: List[CalculationJob] = []
+        if own_job_id:
+            user_id, benchmark = job_runner.resolve_target_context(
+                api_client,
+                calculation_job_id=own_job_id,
+                requested_benchmark=os.environ.get("CUSTOM_BENCHMARK", ""),
+            )
+            # The dispatching job predates every job still queued behind it.
+            jobs.append(
+                CalculationJob(own_job_id, user_id, benchmark, "", acknowledge=False)
+            )
+    except Exception as exc:
+        error_code = job_runner.classify_failure(exc)
+        job_runner.export_run_metrics(error_code)
+        job_runner.write_github_output(error_code)
+        logger.error("Portfolio update failed [error_code=%s]", error_code)
+        return 1
+
+    scheduler = CalculationScheduler(api_client)
+    # Concurrent sweep shards would race for the same queued jobs, so only the
+    # first shard drains the queue.
+    if not (args.sweep and shard_index):
+        try:
+            jobs.extend(scheduler.claim_queued_jobs(exclude=[own_job_id]))
+        except CloudflareAPIError as exc:
+            # Draining is an optimization; queued jobs keep their own workflow runs.
+            logger.warning("Calculation job queue unavailable [error=%s]", type(exc).__name__)
+
+    with RUN_METRICS.stage("total"):
+        codes = scheduler.run_jobs(jobs) if jobs else {}
+        error_code = codes.get(own_job_id, "") if own_job_id else ""
+        if args.sweep:
+            sweep_code, outcomes = scheduler.run_sweep(shard_index, shard_count)
+            error_code = sweep_code or error_code
+            if args.shard_result is not None:
+                write_shard_result(
+                    args.shard_result,
+                    shard_index,
+                    shard_count,
+                    sweep_code,
+                    outcomes,
+                )
+    api_client.log_endpoint_latency()
+
+    job_runner.export_run_metrics(error_code)
+    job_runner.write_github_output(error_code)
+    if error_code:
+        logger.error("Portfolio update failed [error_code=%s]", error_code)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Check that split adjustment never leaks into the published source identity.
+
+Runs one synthetic user through ``main.run_update`` twice, offline: once with
+market data carrying a 4:1 split inside the ledger, once without. The calculator
+back-adjusts Qty/Price in place for the split run; the caller's ``raw_user_df``
+must still hold the Worker's quantities and prices, and the calculation
+manifest's ``source_records.sha256`` must equal both the no-split run and the
+identity the record-mirror verification computes from the raw records.
+
+Exits non-zero on any mismatch.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+os.environ.setdefault("GITHUB_SHA", "0" * 40)
+os.environ.setdefault("API_KEY", "offline-check")
+
+import numpy as np
+import pandas as pd
+import pytz
+
+import main as runner
+from journal_engine.clients.semantic_market_data import SemanticMarketDataClient
+from journal_engine.core.calculation_manifest import build_source_records_identity
+
+USER_ID = "split-check@example.com"
+SPLIT_SYMBOL = "AAPL"
+SPLIT_DATE = pd.Timestamp("2025-06-02")
+SPLIT_RATIO = 4.0
+MARKET_END = pd.Timestamp("2025-12-31")
+CALCULATION_NOW = pytz.timezone("Asia/Taipei").localize(datetime(2026, 1, 2, 10, 0))
+
+
+def _records() -> list[dict]:
+    rows = [
+        ("2025-01-06", "AAPL", "BUY", 10, 200.0),
+        ("2025-02-03", "MSFT", "BUY", 5, 400.0),
+        ("2025-03-03", "AAPL", "BUY", 4, 210.0),
+        ("2025-04-01", "AAPL", "SELL", 2, 220.0),
+        ("2025-09-02", "AAPL", "BUY", 8, 56.0),
+        ("2025-10-01", "MSFT", "SELL", 1, 420.0),
+    ]
+    return [
+        {
+            "id": record_id,
+            "user_id": USER_ID,
+            "txn_date": txn_date,
+            "symbol": symbol,
+            "txn_type": txn_type,
+            "qty": qty,
+            "price": price,
+            "fee": 1.0,
+            "tax": 0.0,
+            "tag": "",
+            "currency": "USD",
+        }
+        for record_id, (txn_date, symbol, txn_type, qty, price) in enumerate(rows, start=1)
+    ]
+
+
+class _SyntheticMarket(SemanticMarketDataClient):
+    """Deterministic split-adjusted closes and a flat USD/TWD rate."""
+
+    def __init__(self, with_split: bool) -> None:
+        super().__init__()
+        self._with_split = with_split
+
+    def download_data(self, tickers, start_date):
+        index = pd.bdate_range(pd.Timestamp(start_date).normalize(), MARKET_END)
+        usd = pd.Series(30.0, index=index).resample("D").ffill()
+        self.fx_rates = usd
+        self.fx_rates_by_currency = {"USD": usd}
+        self.realtime_fx_rate = None
+        self.realtime_fx_rates_by_currency = {}
+        self.price_metadata_by_symbol = {}
+        self.realtime_overlay_symbols = set()
+        for ticker in sorted(set(tickers) | {"SPY"}):
+            seed = int(hashlib.md5(ticker.encode()).hexdigest()[:6], 16)
+            steps = np.random.default_rng(seed).normal(0.0003, 0.01, len(index))
+            close = 50.0 * np.exp(np.cumsum(steps))
+            splits = np.zeros(len(index))
+            if self._with_split and ticker == SPLIT_SYMBOL:
+                splits[index.searchsorted(SPLIT_DATE)] = SPLIT_RATIO
+            history = pd.DataFrame(
+                {
+                    "Open": close,
+                    "High": close,
+                    "Low": close,
+                    "Close": close,
+                    "Adj Close": close,
+                    "Volume": 1e6,
+                    "Dividends": 0.0,
+                    "Stock Splits": splits,
+                },
+                index=index,
+            )
+            prepared = self._prepare_data(ticker, history)
+            self.market_data[ticker] = prepared
+            self.price_metadata_by_symbol[ticker] = dict(prepared.attrs.get("price_provenance") or {})
+        return self.market_data, self.fx_rates
+
+
+class _OfflineApi:
+    def __init__(self, records: list[dict]) -> None:
+        self.records = records
+        self.uploaded = False
+
+    def fetch_records(self, target_user_id=None):
+        return list(self.records)
+
+    def get_user_benchmark(self, user_id):
+        return "SPY"
+
+    def fetch_cash_events(self, user_id):
+        return []
+
+    def upload_portfolio(self, snapshot, target_user_id=None):
+        snapshot.model_dump(mode="json")
+        self.uploaded = True
+        return True
+
+    def log_endpoint_latency(self):
+        pass
+
+    def endpoint_latency(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+def _run(records: list[dict], with_split: bool) -> tuple[pd.DataFrame, str]:
+    """Return the manifest's ``raw_user_df`` and ``source_records.sha256``."""
+    captured: dict = {}
+    build_manifest = runner.build_production_calculation_manifest
+
+    def capture(**kwargs):
+        manifest = build_manifest(**kwargs)
+        captured["raw"] = kwargs["raw_user_df"].copy(deep=True)
+        captured["sha256"] = manifest.deterministic_identity.source_records.sha256
+        return manifest
+
+    def load_market(tickers, start_date):
+        market = _SyntheticMarket(with_split)
+        market.download_data(tickers, start_date)
+        return market
+
+    api = _OfflineApi(records)
+    originals = (runner.build_production_calculation_manifest, runner.resolve_calculation_context)
+    runner.build_production_calculation_manifest = capture
+    runner.resolve_calculation_context = lambda: CALCULATION_NOW
+    try:
+        runner.run_update(api_client=api, market_loader=load_market)
+    finally:
+        runner.build_production_calculation_manifest, runner.resolve_calculation_context = originals
+    if not api.uploaded or "raw" not in captured:
+        raise SystemExit(f"run with_split={with_split} did not upload a snapshot")
+    return captured["raw"], captured["sha256"]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    records = _records()
+    expected = build_source_records_identity(runner.prepare_transactions(records)[0]).sha256
+    split_raw, split_sha = _run(records, with_split=True)
+    plain_raw, plain_sha = _run(records, with_split=False)
+
+    failures = []
+    for column in ("Qty", "Price"):
+        if not split_raw[column].equals(plain_raw[column]):
+            failures.append(f"raw_user_df {column} differs between split and no-split runs")
+    if split_sha != plain_sha:
+        failures.append("source_records.sha256 differs between split and no-split runs")
+    if split_sha != expected:
+        failures.append("source_records.sha256 differs from the raw-record identity")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: source_records.sha256={split_sha}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Local stand-in for a Prometheus Pushgateway that receives engine run metrics.
+
+Runs an HTTP server that accepts ``PUT``/``POST /metrics/job/<job>[/<label>/<value>...]``
+with a text-exposition body (what ``RUN_METRICS_PUSH_URL`` sends), keeps the latest
+push per grouping key, and serves every group on ``GET /metrics`` with the grouping
+labels added to each sample, the way a Pushgateway does. ``DELETE`` on a grouping
+URL drops that group. ``--archive DIR`` also appends every accepted push to
+``DIR/<job>.prom`` with a ``# pushed_at`` header, so trends can be replayed later.
+
+Nothing is forwarded anywhere; point a local Prometheus at ``/metrics`` to scrape it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.server
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+GROUPING_PREFIX = "/metrics/job/"
+MAX_PUSH_BYTES = 1_048_576
+_SAMPLE_RE = re.compile(
+    r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)(?:\s+\d+)?$"
+)
+_LABEL_NAME_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
+Grouping = Tuple[Tuple[str, str], ...]
+
+
+def parse_grouping(path: str) -> Optional[Grouping]:
+    """Return ``(("job", ...), (label, value), ...)`` or None for a bad path."""
+    if not path.startswith(GROUPING_PREFIX):
+        return None
+    parts = [unquote(part) for part in path[len(GROUPING_PREFIX):].split("/")]
+    if not parts[0] or len(parts) % 2 != 1:
+        return None
+    grouping = [("job", parts[0])]
+    for index in range(1, len(parts), 2):
+        name, value = parts[index], parts[index + 1]
+        if not _LABEL_NAME_RE.match(name) or name == "job":
+            return None
+        grouping.append((name, value))
+    return tuple(grouping)
+
+
+def _label_text(grouping: Grouping) -> str:
+    return ",".join(
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in grouping
+    )
+
+
+def parse_exposition(text: str) -> Optional[List[Tuple[str, str]]]:
+    """Return ``(kind, line)`` pairs (kind is ``meta`` or ``sample``), or None if malformed."""
+    lines: List[Tuple[str, str]] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if line.startswith(("# HELP ", "# TYPE ")):
+                lines.append(("meta", line))
+            continue
+        match = _SAMPLE_RE.match(line)
+        if match is None:
+            return None
+        try:
+            float(match.group("value"))
+        except ValueError:
+            return None
+        lines.append(("sample", line))
+    return lines
+
+
+def render_groups(groups: Dict[Grouping, List[Tuple[str, str]]]) -> str:
+    """Merge groups into one exposition with one HELP/TYPE pair per metric."""
+    meta: Dict[str, str] = {}
+    samples: Dict[str, List[str]] = {}
+    for grouping, lines in sorted(groups.items()):
+        extra = _label_text(grouping)
+        for kind, line in lines:
+            if kind == "meta":
+                _, directive, name, *_ = line.split(" ", 3)
+                meta.setdefault(f"{name} {directive}", line)
+                continue
+            match = _SAMPLE_RE.match(line)
+            labels = match.group("labels")
+            merged = f"{extra},{labels}" if labels else extra
+            samples.setdefault(match.group("name"), []).append(
+                f"{match.group('name')}{{{merged}}} {match.group('value')}"
+            )
+
+    output: List[str] = []
+    for name in sorted(samples):
+        for directive in ("HELP", "TYPE"):
+            line = meta.get(f"{name} {directive}")
+            if line:
+                output.append(line)
+        output.extend(samples[name])
+    return "\n".join(output) + "\n" if output else ""
+
+
+class MetricsGateway:
+    """Thread-safe latest-push-per-group store."""
+
+    def __init__(self, archive_dir: Optional[Path] = None) -> None:
+        self._lock = threading.Lock()
+        self._groups: Dict[Grouping, List[Tuple[str, str]]] = {}
+        self._archive_dir = archive_dir
+
+    def push(self, grouping: Grouping, text: str) -> bool:
+        lines = parse_exposition(text)
+        if lines is None:
+            return False
+        with self._lock:
+            self._groups[grouping] = lines
+            if self._archive_dir is not None:
+                self._archive_dir.mkdir(parents=True, exist_ok=True)
+                archive = self._archive_dir / f"{dict(grouping)['job']}.prom"
+                with archive.open("a", encoding="utf-8") as handle:
+                    handle.write(f"# pushed_at {time.time():.3f} {_label_text(grouping)}\n")
+                    handle.write(text if text.endswith("\n") else text + "\n")
+        return True
+
+    def delete(self, grouping: Grouping) -> None:
+        with self._lock:
+            self._groups.pop(grouping, None)
+
+    def render(self) -> str:
+        with self._lock:
+            groups = dict(self._groups)
+        return render_groups(groups)
+
+
+def _handler_for(gateway: MetricsGateway):
+    class _GatewayHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler API
+            return
+
+        def _reply(self, status: int, body: str = "") -> None:
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):  # noqa: N802 - BaseHTTPRequestHandler API
+            if self.path != "/metrics":
+                self._reply(404, "not found\n")
+                return
+            self._reply(200, gateway.render())
+
+        def do_PUT(self):  # noqa: N802 - BaseHTTPRequestHandler API
+            grouping = parse_grouping(self.path)
+            if grouping is None:
+                self._reply(404, "unknown grouping path\n")
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_PUSH_BYTES:
+                self._reply(413, "push too large\n")
+                return
+            try:
+                text = self.rfile.read(length).decode("utf-8")
+            except UnicodeDecodeError:
+                self._reply(400, "body must be UTF-8\n")
+                return
+            if not gateway.push(grouping, text):
+                self._reply(400, "malformed text exposition\n")
+                return
+            self._reply(200)
+
+        do_POST = do_PUT  # noqa: N815 - BaseHTTPRequestHandler API
+
+        def do_DELETE(self):  # noqa: N802 - BaseHTTPRequestHandler API
+            grouping = parse_grouping(self.path)
+            if grouping is None:
+                self._reply(404, "unknown grouping path\n")
+                return
+            gateway.delete(grouping)
+            self._reply(202)
+
+    return _GatewayHandler
+
+
+def start_metrics_gateway(
+    port: int = 0,
+    archive_dir: Optional[Path] = None,
+) -> http.server.ThreadingHTTPServer:
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", port),
+        _handler_for(MetricsGateway(archive_dir)),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9091)
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        default=None,
+        help="append every accepted push to DIR/<job>.prom",
+    )
+    args = parser.parse_args(argv)
+
+    server = start_metrics_gateway(args.port, args.archive)
+    print(
+        f"metrics gateway on http://127.0.0.1:{server.server_port}"
+        f"{GROUPING_PREFIX}<job> (scrape /metrics)"
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Report cold import time of an engine entry point and enforce a startup budget.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter rooted at
+the repository, then prints the slowest top-level packages by cumulative time.
+``--forbid`` fails when a package that the engine loads lazily (for example
+``yfinance`` or ``pyxirr``) is imported eagerly; ``--budget-ms`` fails when the
+total import time exceeds the budget. The forbid check is deterministic and is the
+one CI runs; the timing budget is meant for local comparisons on one machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def measure_imports(module: str) -> dict[str, int]:
+    """Return cumulative import microseconds keyed by fully-qualified module name."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"import {module} failed:\n{completed.stderr.strip()[-2000:]}"
+        )
+
+    cumulative: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, fields = line.partition(":")
+        parts = fields.split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(parts[1]))
+    return cumulative
+
+
+def top_level_totals(cumulative: dict[str, int]) -> dict[str, int]:
+    """Collapse submodules into their top-level package's largest cumulative time."""
+    totals: dict[str, int] = {}
+    for name, micros in cumulative.items():
+        root = name.split(".", 1)[0]
+        totals[root] = max(totals.get(root, 0), micros)
+    return totals
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main", help="module to import")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=0.0,
+        help="fail when the module's cumulative import time exceeds this budget",
+    )
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=[],
+        help="top-level package that must not be imported eagerly (repeatable)",
+    )
+    args = parser.parse_args(argv)
+
+    cumulative = measure_imports(args.module)
+    totals = top_level_totals(cumulative)
+    total_ms = cumulative.get(args.module, 0) / 1000.0
+
+    print(f"{'package':<32}{'cumulative_ms':>14}")
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    for name, micros in ranked[: max(0, args.top)]:
+        print(f"{name:<32}{micros / 1000.0:>14.1f}")
+    print(f"{'total (' + args.module + ')':<32}{total_ms:>14.1f}")
+
+    failed = False
+    eager = sorted(name for name in set(args.forbid) if name in totals)
+    for name in eager:
+        print(f"FAIL: {name} is imported eagerly by {args.module}", file=sys.stderr)
+        failed = True
+    if args.budget_ms > 0 and total_ms > args.budget_ms:
+        print(
+            f"FAIL: import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms",
+            file=sys.stderr,
+        )
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,10 +7,13 @@ exception boundary and writes only a fixed enum to GITHUB_OUTPUT.
 
 from __future__ import annotations
 
+import argparse
 import logging
 import os
 import re
+import sqlite3
 import sys
+import time
 import traceback
 from pathlib import Path
 from typing import Iterable, Optional, Tuple
@@ -21,7 +24,10 @@ if str(REPO_ROOT) not in sys.path:
 
 import main as runner
 from journal_engine.clients.api_client import CloudflareAPIError, CloudflareClient
+from journal_engine.clients.record_mirror import RecordMirrorError
+from journal_engine.config import RUN_METRICS_PATH, RUN_METRICS_PUSH_URL
 from journal_engine.core.daily_pnl_reconciler import DailyPnLReconciliationError
+from journal_engine.run_metrics import RUN_METRICS
 
 
 CONFIGURATION_FAILED = "CONFIGURATION_FAILED"
@@ -214,6 +220,8 @@ def classify_failure(exc: Exception, *, per_user: bool = False) -> str:
     """Map an exception to a fixed, non-sensitive operational category."""
     if isinstance(exc, DailyPnLReconciliationError):
         return RECONCILIATION_FAILED
+    if isinstance(exc, (RecordMirrorError, sqlite3.Error)):
+        return CONFIGURATION_FAILED
 
     message = str(exc)
 
@@ -225,7 +233,13 @@ def classify_failure(exc: Exception, *, per_user: bool = False) -> str:
         return RECORDS_API_FAILED
 
     if isinstance(exc, runner.PortfolioUpdateError):
-        if "API_KEY" in message:
+        if (
+            "API_KEY" in message
+            or "SNAPSHOT_UPLOAD_ENCODING" in message
+            or "DAILY_PNL_RECONCILIATION_MODE" in message
+            or "SWEEP_SHARD" in message
+            or "RECORD_MIRROR" in message
+        ):
             return CONFIGURATION_FAILED
         if (
             message.startswith("交易紀錄")
@@ -268,8 +282,52 @@ def write_github_output(error_code: str, output_path: Optional[str] = None) -> N
         handle.write(f"error_code={error_code}\n")
 
 
-def main() -> int:
-    runner.setup_logging()
+def record_user_failures(exceptions: Iterable[Exception]) -> None:
+    """Count failed users in the run metrics by their safe per-user code."""
+    for exc in exceptions:
+        RUN_METRICS.inc(
+            "users_total",
+            outcome="failed",
+            error_code=classify_failure(exc, per_user=True),
+        )
+
+
+def export_run_metrics(
+    error_code: str,
+    *,
+    metrics_path: str = RUN_METRICS_PATH,
+    push_url: str = RUN_METRICS_PUSH_URL,
+) -> None:
+    """Write and/or push the run metrics; export problems never change the outcome."""
+    if not metrics_path and not push_url:
+        return
+    hits = RUN_METRICS.value("market_cache_requests_total", result="hit")
+    misses = RUN_METRICS.value("market_cache_requests_total", result="miss")
+    if hits + misses:
+        RUN_METRICS.set("market_cache_hit_ratio", hits / (hits + misses))
+    RUN_METRICS.clear("run_failed")
+    RUN_METRICS.set("run_failed", 1 if error_code else 0, error_code=error_code)
+    RUN_METRICS.set("run_timestamp_seconds", time.time())
+
+    logger = logging.getLogger("calculation_runner")
+    if metrics_path:
+        try:
+            RUN_METRICS.write(metrics_path)
+        except OSError as exc:
+            logger.warning("Run metrics write failed [error=%s]", type(exc).__name__)
+    if push_url:
+        try:
+            RUN_METRICS.push(push_url)
+        except Exception as exc:
+            logger.warning("Run metrics push failed [error=%s]", type(exc).__name__)
+
+
+def run_calculation(**update_kwargs) -> str:
+    """Run one engine update and return its safe failure code ("" on success).
+
+    Keyword arguments are forwarded to ``main.run_update`` so long-running callers
+    can reuse a Worker client and warm market data.
+    """
     logger = logging.getLogger("calculation_runner")
     main_logger = logging.getLogger("main")
     capture = UserFailureCapture()
@@ -277,21 +335,47 @@ def main() -> int:
     privacy_filter: Optional[VerifiedJobPrivacyFilter] = None
 
     try:
-        configure_target_context_from_environment()
-        privacy_filter = install_verified_job_privacy_filter()
-        runner.run_update()
+        with RUN_METRICS.stage("total"):
+            configure_target_context_from_environment()
+            privacy_filter = install_verified_job_privacy_filter()
+            runner.run_update(**update_kwargs)
     except Exception as exc:
         user_code = collapse_user_failure_codes(capture.exceptions)
         error_code = user_code or classify_failure(exc)
-        write_github_output(error_code)
         logger.error("Portfolio update failed [error_code=%s]", error_code)
-        return 1
+        return error_code
     finally:
         remove_verified_job_privacy_filter(privacy_filter)
         main_logger.removeHandler(capture)
+        record_user_failures(capture.exceptions)
+    return ""
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="run offline against local inputs and write a trace to DIR (see calculation_profiler.py)",
+    )
+    known, rest = parser.parse_known_args(argv)
+    if known.profile is not None:
+        import calculation_profiler
+
+        calculation_profiler.add_profile_arguments(parser)
+        args = parser.parse_args(argv)
+        runner.setup_logging()
+        return 1 if calculation_profiler.run_profile(args.profile, args) else 0
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
 
-    write_github_output("")
-    return 0
+    runner.setup_logging()
+    error_code = run_calculation()
+    export_run_metrics(error_code)
+    write_github_output(error_code)
+    return 1 if error_code else 0
 
 
 if __name__ == "__main__":
@@ -26,12 +26,15 @@ const DEFAULT_ALLOWED_ORIGINS = [
 const CORS_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS"];
 const CORS_HEADERS = ["Content-Type", "Authorization", "Idempotency-Key"];
 const MAX_JSON_BYTES = 1_048_576;
+const SNAPSHOT_CONTENT_ENCODINGS = new Set(["gzip", "deflate"]);
 const MAX_TOKEN_LENGTH = 8_192;
 const TRIGGER_COOLDOWN_SECONDS = 60;
 const RECORD_PAGE_DEFAULT_LIMIT = 1_000;
 const RECORD_PAGE_MAX_LIMIT = 1_000;
 const RECORD_CURSOR_VERSION = 1;
 const CALCULATION_JOB_TERMINAL_REPLAY_SECONDS = 24 * 60 * 60;
+// Upper bound on queued jobs one runner drains and coalesces per pass.
+const CALCULATION_JOB_QUEUE_LIMIT = 100;
 const CALCULATION_JOB_ID_RE = /^job_[A-Za-z0-9_-]{22}$/;
 const IDEMPOTENCY_KEY_RE = /^[A-Za-z0-9._~-]{16,128}$/;
 const CALCULATION_JOB_ERROR_RE = /^[A-Z0-9_]{1,64}$/;
@@ -72,6 +75,7 @@ const FORBIDDEN_OWNER_FIELDS = new Set([
 
 const ROUTE_PERMISSIONS = Object.freeze({
   "POST /api/trigger-update": new Set(["user"]),
+  "GET /api/calculation-jobs": new Set(["system"]),
   "GET /api/calculation-jobs/:id": new Set(["user", "system"]),
   "POST /api/calculation-jobs/status": new Set(["system"]),
   "GET /api/portfolio": new Set(["user"]),
@@ -133,6 +137,9 @@ export default {
         case "POST /api/trigger-update":
           response = await handleGitHubTrigger(request, env, ctx, principal, requestId);
           break;
+        case "GET /api/calculation-jobs":
+          response = await handleListQueuedCalculationJobs(env, requestId);
+          break;
         case "GET /api/calculation-jobs/:id":
           response = await handleGetCalculationJob(calculationJobMatch[1], env, principal, requestId);
           break;
@@ -317,7 +324,9 @@ async function handleGetPortfolio(env, principal, requestId) {
 
 async function handleUploadPortfolio(request, env, principal, requestId) {
   try {
-    const payload = await readJsonObject(request);
+    const payload = await readJsonObject(request, {
+      contentEncodings: SNAPSHOT_CONTENT_ENCODINGS,
+    });
     const targetUser = normalizeEmail(
       requireString(payload.target_user_id, "target_user_id", 3, 320),
     );
@@ -341,6 +350,9 @@ async function handleUploadPortfolio(request, env, principal, requestId) {
     console.info(`[request_id=${requestId}] System snapshot upload completed`);
     return jsonResponse({ success: true });
   } catch (error) {
+    if (error instanceof UnsupportedContentEncodingError) {
+      return apiError("UNSUPPORTED_CONTENT_ENCODING", error.message, 415, requestId);
+    }
     if (error instanceof RequestValidationError) {
       return apiError("INVALID_REQUEST", error.message, 400, requestId);
     }
@@ -354,16 +366,16 @@ async function handleGetRecords(request, env, principal, requestId) {
     const scope = resolveRecordScope(principal, request.headers.get("X-Target-User"));
     const pagination = await parseRecordPageRequest(new URL(request.url), env.API_SECRET, scope);
     const page = await recordsRepository.listPage(env.DB, scope, pagination, env.API_SECRET);
-    return jsonResponse({
-      success: true,
-      data: page.items,
-      page: {
-        limit: pagination.limit,
-        count: page.items.length,
-        has_more: page.hasMore,
-        next_cursor: page.nextCursor,
-      },
-    });
+    const pageInfo = {
+      limit: pagination.limit,
+      count: page.items.length,
+      has_more: page.hasMore,
+      next_cursor: page.nextCursor,
+    };
+    if (pagination.afterChange !== null) {
+      pageInfo.next_after_change = page.nextAfterChange;
+    }
+    return jsonResponse({ success: true, data: page.items, page: pageInfo });
   } catch (error) {
     if (error instanceof RequestValidationError) {
       return apiError("INVALID_REQUEST", error.message, 400, requestId);
@@ -386,7 +398,28 @@ async function parseRecordPageRequest(url, signingSecret, scope) {
     }
   }
   const rawCursor = url.searchParams.get("cursor");
-  return { limit, cursor: rawCursor ? await decodeRecordCursor(rawCursor, signingSecret, scope) : null };
+  const rawAfterChange = url.searchParams.get("after_change");
+  if (rawAfterChange !== null) {
+    // Change feed for incremental record mirrors (migration 0007): every insert,
+    // update and delete takes the next change_seq, so the last applied sequence
+    // is the keyset position and edits and deletes are seen as well as inserts.
+    if (rawCursor) {
+      throw new RequestValidationError("cursor and after_change cannot be combined");
+    }
+    if (!/^\d+$/.test(rawAfterChange)) {
+      throw new RequestValidationError("after_change must be an integer");
+    }
+    const afterChange = Number(rawAfterChange);
+    if (!Number.isSafeInteger(afterChange)) {
+      throw new RequestValidationError("after_change is out of range");
+    }
+    return { limit, cursor: null, afterChange };
+  }
+  return {
+    limit,
+    cursor: rawCursor ? await decodeRecordCursor(rawCursor, signingSecret, scope) : null,
+    afterChange: null,
+  };
 }
 
 async function encodeRecordCursor(row, signingSecret, scope) {
@@ -480,7 +513,12 @@ function recordCursorBase64Decode(value) {
 
 function publicRecord(row) {
   if (!isPlainObject(row)) throw new Error("InvalidRecordRow");
-  const { create_idempotency_hash: _idempotency, create_payload_hash: _payload, ...record } = row;
+  const {
+    create_idempotency_hash: _idempotency,
+    create_payload_hash: _payload,
+    change_seq: _changeSeq,
+    ...record
+  } = row;
   return record;
 }
 
@@ -682,8 +720,11 @@ const cashEventsRepository = Object.freeze({
 
 const recordsRepository = Object.freeze({
   async listPage(db, scope, pagination, signingSecret) {
-    const { limit, cursor } = pagination;
+    const { limit, cursor, afterChange } = pagination;
     const fetchLimit = limit + 1;
+    if (afterChange !== null) {
+      return this.listChanges(db, scope, afterChange, limit);
+    }
     let statement;
     if (scope.kind === "single-user" && cursor) {
       statement = db.prepare(
@@ -712,6 +753,43 @@ const recordsRepository = Object.freeze({
     return { items: rawItems.map(publicRecord), hasMore, nextCursor };
   },
 
+  async listChanges(db, scope, afterChange, limit) {
+    // Live rows and tombstones are each read in change_seq order; the first
+    // limit + 1 of their merge is the first limit + 1 of the whole feed.
+    const singleUser = scope.kind === "single-user";
+    const [liveResult, deletedResult] = await db.batch([
+      singleUser
+        ? db.prepare(
+          "SELECT * FROM records WHERE user_id = ? AND change_seq > ? ORDER BY change_seq ASC LIMIT ?",
+        ).bind(scope.userId, afterChange, limit + 1)
+        : db.prepare(
+          "SELECT * FROM records WHERE change_seq > ? ORDER BY change_seq ASC LIMIT ?",
+        ).bind(afterChange, limit + 1),
+      singleUser
+        ? db.prepare(
+          "SELECT record_id, change_seq FROM record_tombstones WHERE user_id = ? AND change_seq > ? ORDER BY change_seq ASC LIMIT ?",
+        ).bind(scope.userId, afterChange, limit + 1)
+        : db.prepare(
+          "SELECT record_id, change_seq FROM record_tombstones WHERE change_seq > ? ORDER BY change_seq ASC LIMIT ?",
+        ).bind(afterChange, limit + 1),
+    ]);
+    const live = (Array.isArray(liveResult?.results) ? liveResult.results : []).map((row) => ({
+      change_seq: Number(row.change_seq),
+      id: Number(row.id),
+      record: publicRecord(row),
+    }));
+    const deleted = (Array.isArray(deletedResult?.results) ? deletedResult.results : []).map((row) => ({
+      change_seq: Number(row.change_seq),
+      id: Number(row.record_id),
+      record: null,
+    }));
+    const changes = [...live, ...deleted].sort((left, right) => left.change_seq - right.change_seq);
+    const hasMore = changes.length > limit;
+    const items = hasMore ? changes.slice(0, limit) : changes;
+    const nextAfterChange = hasMore && items.length ? items[items.length - 1].change_seq : null;
+    return { items, hasMore, nextCursor: null, nextAfterChange };
+  },
+
   async insert(db, userId, body, options = {}) {
     const normalizedUser = normalizeEmail(userId);
     const hasIdempotency = options.idempotencyHash !== undefined && options.idempotencyHash !== null;
@@ -1324,6 +1402,22 @@ async function handleGetCalculationJob(jobId, env, principal, requestId) {
   }
 }
 
+async function handleListQueuedCalculationJobs(env, requestId) {
+  try {
+    const jobs = await calculationJobsRepository.listQueued(env.DB, CALCULATION_JOB_QUEUE_LIMIT);
+    return jsonResponse({
+      success: true,
+      jobs: jobs.map((job) => ({
+        ...systemCalculationJobTarget(job),
+        created_at: job.created_at,
+      })),
+    });
+  } catch (error) {
+    console.error(`[request_id=${requestId}] Calculation job queue read failed`, safeErrorName(error));
+    return apiError("DATABASE_ERROR", "Calculation job queue is unavailable", 500, requestId);
+  }
+}
+
 async function handleCalculationJobStatus(request, env, requestId) {
   try {
     const body = await readJsonObject(request);
@@ -1619,6 +1713,19 @@ const calculationJobsRepository = Object.freeze({
     return row ? normalizeCalculationJobRow(row) : null;
   },
 
+  async listQueued(db, limit) {
+    const result = await db.prepare(`
+      SELECT public_id, user_id, status, benchmark, github_run_id, github_run_attempt,
+   attempt_count, error_code, created_at, started_at, completed_at, updated_at
+      FROM calculation_jobs
+      WHERE status = 'queued'
+      ORDER BY created_at ASC, public_id ASC
+      LIMIT ?
+    `).bind(limit).all();
+    const rows = Array.isArray(result?.results) ? result.results : [];
+    return rows.map(normalizeCalculationJobRow);
+  },
+
   async bindDispatchRun(db, publicId, githubRunId) {
     const normalizedPublicId = validateCalculationJobId(publicId);
     const normalizedRunId = validateGitHubRunId(githubRunId);
@@ -2142,18 +2249,35 @@ function rejectOwnerFields(body) {
   }
 }
 
-async function readJsonObject(request, { allowEmpty = false } = {}) {
+async function readJsonObject(
+  request,
+  { allowEmpty = false, contentEncodings = null } = {},
+) {
   const contentType = request.headers.get("Content-Type") || "";
   if (!contentType.toLowerCase().startsWith("application/json")) {
     throw new RequestValidationError("Content-Type must be application/json");
   }
 
+  const contentEncoding = (request.headers.get("Content-Encoding") || "identity")
+    .trim()
+    .toLowerCase();
+  if (
+    contentEncoding !== "identity"
+    && !(contentEncodings && contentEncodings.has(contentEncoding))
+  ) {
+    throw new UnsupportedContentEncodingError(
+      `Content-Encoding ${contentEncoding} is not accepted`,
+    );
+  }
+
   const declaredLength = Number(request.headers.get("Content-Length"));
   if (Number.isFinite(declaredLength) && declaredLength > MAX_JSON_BYTES) {
     throw new RequestValidationError("Request body is too large");
   }
 
-  const text = await request.text();
+  const text = contentEncoding === "identity"
+    ? await request.text()
+    : await readDecodedBodyText(request, contentEncoding);
   if (!text.trim()) {
     if (allowEmpty) return {};
     throw new RequestValidationError("JSON body is required");
@@ -2174,6 +2298,44 @@ async function readJsonObject(request, { allowEmpty = false } = {}) {
   return parsed;
 }
 
+async function readDecodedBodyText(request, contentEncoding) {
+  if (!request.body) return "";
+  // The decoded size limit is enforced while streaming so a small compressed
+  // body cannot expand past MAX_JSON_BYTES in Worker memory.
+  const reader = request.body
+    .pipeThrough(new DecompressionStream(contentEncoding))
+    .getReader();
+  const chunks = [];
+  let total = 0;
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      total += value.byteLength;
+      if (total > MAX_JSON_BYTES) {
+        await reader.cancel();
+        throw new RequestValidationError("Request body is too large");
+      }
+      chunks.push(value);
+    }
+  } catch (error) {
+    if (error instanceof RequestValidationError) throw error;
+    throw new RequestValidationError("Malformed compressed body");
+  }
+
+  const bytes = new Uint8Array(total);
+  let offset = 0;
+  for (const chunk of chunks) {
+    bytes.set(chunk, offset);
+    offset += chunk.byteLength;
+  }
+  try {
+    return new TextDecoder("utf-8", { fatal: true }).decode(bytes);
+  } catch {
+    throw new RequestValidationError("Request body is not valid UTF-8");
+  }
+}
+
 async function verifyGoogleToken(token, audience) {
   if (typeof token !== "string" || token.length < 20 || token.length > MAX_TOKEN_LENGTH) {
     throw new Error("Invalid token");
@@ -2449,6 +2611,13 @@ class RequestValidationError extends Error {
   }
 }
 
+class UnsupportedContentEncodingError extends RequestValidationError {
+  constructor(message) {
+    super(message);
+    this.name = "UnsupportedContentEncodingError";
+  }
+}
+
 export const __test = {
   API_VERSION,
   RELEASE_VERSION,
@@ -2463,6 +2632,7 @@ export const __test = {
   handleDeleteRecord,
   handleUpdateRecord,
   handleGetCashEvents,
+  handleUploadPortfolio,
   handleAddCashEvent,
   handleUpdateCashEvent,
   handleDeleteCashEvent,
@@ -2490,6 +2660,7 @@ export const __test = {
   validateCalculationJobId,
   validateGitHubRunId,
   canTransitionCalculationJob,
+  handleListQueuedCalculationJobs,
   publicCalculationJob,
   systemCalculationJobTarget,
   calculationJobsRepository,